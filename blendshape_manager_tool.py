@@ -1,7 +1,4805 @@
-import maya.cmds as cmds
-import maya.mel as mel
-from maya.api.OpenMaya import MGlobal
-import DashCommand as dash
+try:
+    import maya.cmds as cmds
+    import maya.mel as mel
+    import maya.api.OpenMaya as om
+    import maya.api.OpenMayaAnim as oma
+    import maya.utils
+    from maya.api.OpenMaya import MGlobal
+except ImportError:
+    # Outside of Maya only the in-memory scene is available
+    cmds = mel = om = oma = MGlobal = None
+import numpy as np
+import argparse
+import collections
+import concurrent.futures
+import contextlib
+import copy
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+try:
+    import lz4.frame
+except ImportError:
+    # Libraries can still be compressed with zlib
+    lz4 = None
+
+
+def remap_weights(weights, old_min, old_max, new_min=0.0, new_max=1.0):
+    """
+    Linearly remaps weights from one range to another
+    :param weights: numpy.ndarray, weights to remap
+    :param old_min: float, value mapped to new_min
+    :param old_max: float, value mapped to new_max
+    :param new_min: float, start of the new range
+    :param new_max: float, end of the new range
+    :return numpy.ndarray: remapped weights
+    """
+    if old_max == old_min:
+        return np.full_like(weights, new_min)
+    return new_min + (weights - old_min) * (new_max - new_min) / (old_max - old_min)
+
+
+# Weight map operations, each evaluated on the whole weight array at once.
+# Operands can be numbers or other weight maps
+WEIGHT_OPERATIONS = {
+    "copy": lambda weights: weights,
+    "inverse": lambda weights: 1.0 - weights,
+    "multiply": lambda weights, other: weights * other,
+    "add": lambda weights, other: weights + other,
+    "clamp": lambda weights, low=0.0, high=1.0: np.clip(weights, low, high),
+    "remap": remap_weights,
+}
+
+# Weight transfer methods listed in the UI, as chains of weight operations
+WEIGHT_METHODS = {
+    "Copy Weights": [("copy", ())],
+    "Inverse Mask": [("inverse", ())],
+}
+
+# Deformer types listed in the weight transfer option menus
+WEIGHTED_DEFORMER_TYPES = ["blendShape", "wire", "cluster", "deltaMush", "jiggle"]
+
+
+def selected_channels():
+    """
+    Gets the channels selected in the channel box
+    :return list: names of the selected channels
+    """
+    # DashCommand is only available in interactive sessions
+    import DashCommand as dash
+    return dash.getAllSelectedChannels() or []
+
+
+# Weight of a vertex that a deformer's weight multi doesn't store
+DEFAULT_WEIGHT = 1.0
+
+# Default inputTargetItem index holding a target's full weight shape
+FULL_WEIGHT_ITEM = 6000
+
+# Most changed writes SyncSnapshots keeps between two reports
+SYNC_CHANGES_LIMIT = 10000
+
+# Entries of each kind of mesh data a scene keeps, see SceneAccess.cached
+MESH_CACHE_SIZE = 8
+
+
+def item_weight(item):
+    """
+    :param item: int, inputTargetItem index
+    :return float: target weight the item is reached at
+    """
+    return (item - 5000) / 1000.0
+
+
+def weight_item(weight):
+    """
+    :param weight: float, target weight of an in-between
+    :return int: inputTargetItem index of the weight
+    """
+    return int(round(weight * 1000)) + 5000
+
+
+def inbetween_name(target, item):
+    """
+    :param target: string, name of the target
+    :param item: int, inputTargetItem index
+    :return string: name of the target, with the in-between's weight in 
+        thousandths when it's not the full weight shape
+    """
+    if item == FULL_WEIGHT_ITEM:
+        return target
+    return f"{target}_ib{item - 5000}"
+
+
+class SparseWeights:
+    """
+    Weight map that only stores the vertices whose weight differs from
+        a default value
+    """
+    def __init__(self, size, indices=None, values=None, default=DEFAULT_WEIGHT):
+        """
+        :param size: int, number of vertices the map covers
+        :param indices: list, vertex indices holding a non default weight
+        :param values: list, weights of those vertices
+        :param default: float, weight of every vertex that is not stored
+        """
+        self.size = size
+        self.default = default
+        self.indices = np.asarray(
+            [] if indices is None else indices, dtype=np.int64
+        )
+        self.values = np.asarray(
+            [] if values is None else values, dtype=np.float64
+        )
+
+    @classmethod
+    def from_dense(cls, weights, default=DEFAULT_WEIGHT, tolerance=1e-6):
+        """
+        Builds a sparse map from a dense weight array
+        :param weights: numpy.ndarray, one weight per vertex
+        :param default: float, weight that is left out of the map
+        :param tolerance: float, weights closer than this to the default
+            are treated as the default
+        :return SparseWeights: the sparse weight map
+        """
+        weights = np.asarray(weights, dtype=np.float64)
+        indices = np.flatnonzero(np.abs(weights - default) > tolerance)
+        return cls(len(weights), indices, weights[indices], default=default)
+
+    def to_dense(self):
+        """
+        :return numpy.ndarray: one weight per vertex
+        """
+        weights = np.full(self.size, self.default, dtype=np.float64)
+        weights[self.indices] = self.values
+        return weights
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __repr__(self):
+        return (f"SparseWeights(size={self.size}, stored={len(self)}, "
+               f"default={self.default})")
+
+
+def contiguous_runs(indices, max_gap=0):
+    """
+    Groups sorted indices into runs so each run can be set with one command
+    :param indices: numpy.ndarray, sorted unique indices
+    :param max_gap: int, runs separated by this many indices or less
+        are merged into one
+    :return list: (first, last) inclusive index pairs
+    """
+    if not len(indices):
+        return []
+    breaks = np.flatnonzero(np.diff(indices) > max_gap + 1)
+    firsts = np.concatenate(([indices[0]], indices[breaks + 1]))
+    lasts = np.concatenate((indices[breaks], [indices[-1]]))
+    return list(zip(firsts.tolist(), lasts.tolist()))
+
+
+def component_indices(components):
+    """
+    Expands a component list such as ['vtx[0:3]', 'vtx[7]'] to indices
+    :param components: list, vertex component strings
+    :return numpy.ndarray: vertex indices in the order of the components,
+        None for 'vtx[*]'
+    """
+    indices = []
+    for component in components or []:
+        vertex_range = component[component.index("[") + 1:-1]
+        if vertex_range == "*":
+            return None
+        first, _, last = vertex_range.partition(":")
+        indices.extend(range(int(first), int(last or first) + 1))
+    return np.asarray(indices, dtype=np.int64)
+
+
+def hash_topology(polygon_counts, polygon_connects):
+    """
+    Hashes a mesh's topology so data can be checked against the mesh
+    :param polygon_counts: list, number of vertices of each polygon
+    :param polygon_connects: list, vertex indices of every polygon
+    :return string: hexadecimal digest of the topology
+    """
+    topology_hash = hashlib.blake2b(digest_size=16)
+    topology_hash.update(np.asarray(polygon_counts, dtype=np.int32).tobytes())
+    topology_hash.update(np.asarray(polygon_connects, dtype=np.int32).tobytes())
+    return topology_hash.hexdigest()
+
+
+def content_hash(*arrays):
+    """
+    Hashes the content of arrays, to tell if written data changed
+    :param arrays: numpy.ndarray, arrays hashed in order
+    :return string: hexadecimal digest of the arrays
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        digest.update(str((array.dtype.str, array.shape)).encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+class SceneAccess:
+    """
+    Narrow interface between the tool's operations and the scene.
+    Every operation goes through it, so they run the same against Maya
+        (MayaScene) or an in-memory scene (MemoryScene)
+    """
+    def __init__(self):
+        # Target registries keyed by blendshape, see target_registry
+        self._target_registries = {}
+        self._sync_snapshots = None
+        # Data computed from meshes keyed by kind, see cached
+        self._mesh_caches = {}
+        # Nesting of execution contexts, only the outermost opens a step
+        self._context_depth = 0
+
+    # Messages
+    def info(self, message):
+        """
+        Displays an information message
+        :param message: string, message to display
+        """
+        raise NotImplementedError
+
+    def warning(self, message):
+        """
+        Displays a warning
+        :param message: string, message to display
+        """
+        raise NotImplementedError
+
+    def error(self, message):
+        """
+        Raises an error
+        :param message: string, message of the error
+        """
+        raise NotImplementedError
+
+    # Nodes and attributes
+    def exists(self, node):
+        """
+        :param node: string, name of the node
+        :return bool: True if the node exists
+        """
+        raise NotImplementedError
+
+    def node_type(self, node):
+        """
+        :param node: string, name of the node
+        :return string: type of the node
+        """
+        raise NotImplementedError
+
+    def list_nodes(self, node_types):
+        """
+        :param node_types: list, node types to list
+        :return list: every node of those types
+        """
+        raise NotImplementedError
+
+    def deformers(self, geo):
+        """
+        :param geo: string, deformed geometry
+        :return list: deformers in the geometry's history
+        """
+        raise NotImplementedError
+
+    def create_node(self, node_type, name):
+        """
+        :param node_type: string, type of the new node
+        :param name: string, name of the new node
+        :return string: name the node was created with
+        """
+        raise NotImplementedError
+
+    def delete(self, nodes):
+        """
+        :param nodes: list, nodes to delete
+        """
+        raise NotImplementedError
+
+    def has_attribute(self, node, attribute):
+        """
+        :param node: string, name of the node
+        :param attribute: string, name of the attribute
+        :return bool: True if the node has the attribute
+        """
+        raise NotImplementedError
+
+    def get_attr(self, plug):
+        """
+        :param plug: string, 'node.attribute' of a single value attribute
+        :return: value of the attribute
+        """
+        raise NotImplementedError
+
+    def set_attr(self, plug, value):
+        """
+        :param plug: string, 'node.attribute' of a single value attribute
+        :param value: new value of the attribute
+        """
+        raise NotImplementedError
+
+    def incoming_connection(self, plug):
+        """
+        :param plug: string, 'node.attribute'
+        :return string: plug connected into it, None when not connected
+        """
+        raise NotImplementedError
+
+    def combination_inputs(self, node):
+        """
+        :param node: string, name of a combinationShape node
+        :return list: plugs connected into its input weights, in input 
+            index order
+        """
+        raise NotImplementedError
+
+    def connect(self, source, destination):
+        """
+        :param source: string, plug the connection comes from
+        :param destination: string, plug the connection goes into
+        """
+        raise NotImplementedError
+
+    def user_attributes(self, nodes):
+        """
+        Lists the keyable user defined attributes of many nodes in one pass
+        :param nodes: list, names of the nodes
+        :return dictionary: attribute names keyed by node
+        """
+        raise NotImplementedError
+
+    def delete_attributes(self, nodes, attribute):
+        """
+        Deletes a dynamic attribute from many nodes with one command
+        :param nodes: list, names of the nodes
+        :param attribute: string, dynamic attribute to delete
+        """
+        raise NotImplementedError
+
+    def set_attribute_states(self, nodes, attribute, lock, keyable):
+        """
+        Sets the lock and keyable state of an attribute on many nodes with 
+            one command
+        :param nodes: list, names of the nodes
+        :param attribute: string, name of the attribute
+        :param lock: bool, locks the attribute
+        :param keyable: bool, makes the attribute keyable
+        """
+        raise NotImplementedError
+
+    # Geometry
+    def vertex_count(self, mesh):
+        """
+        :param mesh: string, name of the mesh
+        :return int: number of vertices of the mesh
+        """
+        raise NotImplementedError
+
+    def topology(self, mesh):
+        """
+        :param mesh: string, name of the mesh
+        :return tuple: polygon vertex counts and polygon vertex indices
+        """
+        raise NotImplementedError
+
+    def get_points(self, mesh):
+        """
+        :param mesh: string, name of the mesh
+        :return numpy.ndarray: (vertex_count, 3) deformed object space points
+        """
+        raise NotImplementedError
+
+    def set_points(self, mesh, points):
+        """
+        :param mesh: string, name of the mesh
+        :param points: numpy.ndarray, (vertex_count, 3) object space points
+        """
+        raise NotImplementedError
+
+    def original_points(self, geo):
+        """
+        :param geo: string, deformed geometry
+        :return numpy.ndarray: (vertex_count, 3) points before any deformer
+        """
+        raise NotImplementedError
+
+    def duplicate(self, geo, name, points=None):
+        """
+        Duplicates geometry in its current deformed state
+        :param geo: string, geometry to duplicate
+        :param name: string, name of the new geometry
+        :param points: numpy.ndarray, (vertex_count, 3) points replacing the
+            duplicate's points, intermediate shapes are removed when given
+        :return string: new geometry
+        """
+        raise NotImplementedError
+
+    def bake_geometries(self, geos, names):
+        """
+        Bakes the current deformed state of many geometry without their 
+            history, with a single duplicate
+        :param geos: list, geometry to bake
+        :param names: list, name of each new geometry
+        :return list: new geometry
+        """
+        raise NotImplementedError
+
+    def get_translation(self, node):
+        """
+        :param node: string, name of the transform
+        :return list: local translation
+        """
+        raise NotImplementedError
+
+    def move(self, node, translation):
+        """
+        :param node: string, name of the transform
+        :param translation: list, new local translation
+        """
+        raise NotImplementedError
+
+    # Deformer weights
+    def get_stored_weights(self, deformer, index, vertex_count, node_type=None):
+        """
+        Reads the per vertex weights a deformer actually stores
+        :param deformer: string, name of the deformer
+        :param index: int, index of the blendshape target (only applicable
+            when the deformer type is a blendshape)
+        :param vertex_count: int, number of vertices on the deformed mesh
+        :param node_type: string, type of the deformer, queried when not given
+        :return tuple: stored vertex indices and their weights
+        """
+        raise NotImplementedError
+
+    def set_weight_range(self, deformer, index, first, values, node_type=None):
+        """
+        Writes a run of consecutive per vertex weights in one command
+        :param deformer: string, name of the deformer
+        :param index: int, index of the blendshape target
+        :param first: int, first vertex of the run
+        :param values: numpy.ndarray, weights of the run
+        :param node_type: string, type of the deformer, queried when not given
+        """
+        raise NotImplementedError
+
+    # Blendshapes
+    def blendshape_geometry(self, blendshape):
+        """
+        Finds the geometry a blendshape deforms, through any other deformers
+            further down the chain
+        :param blendshape: string, name of the blendshape
+        :return string: transform of the deformed geometry
+        """
+        raise NotImplementedError
+
+    def rest_points(self, blendshape):
+        """
+        Evaluates the geometry coming into a blendshape once
+        :param blendshape: string, name of the blendshape
+        :return numpy.ndarray: (vertex_count, 3) points before the blendshape
+        """
+        raise NotImplementedError
+
+    def target_indices(self, blendshape):
+        """
+        Maps a blendshape's target names to their logical weight indices
+        :param blendshape: string, name of the blendshape
+        :return dictionary: logical index of each target name
+        """
+        raise NotImplementedError
+
+    def add_target(self, blendshape, name, index=None):
+        """
+        Adds a target without any geometry to a blendshape
+        :param blendshape: string, name of the blendshape
+        :param name: string, name of the new target
+        :param index: int, free logical index to use, the one after the 
+            last target when not given
+        :return int: logical index of the new target
+        """
+        raise NotImplementedError
+
+    def blendshapes(self, objects=None):
+        """
+        Finds the blendshapes deforming objects with one query
+        :param objects: list, deformed objects, every blendshape in the 
+            scene when not given
+        :return list: names of the blendshapes
+        """
+        raise NotImplementedError
+
+    def get_target_weights(self, blendshape):
+        """
+        Reads every target weight of a blendshape at once
+        :param blendshape: string, name of the blendshape
+        :return tuple: logical indices and their weights
+        """
+        raise NotImplementedError
+
+    def set_target_weights(self, blendshape, indices, values):
+        """
+        Writes many target weights, one command per run of indices
+        :param blendshape: string, name of the blendshape
+        :param indices: numpy.ndarray, sorted logical indices
+        :param values: numpy.ndarray, weight of each index
+        """
+        raise NotImplementedError
+
+    def target_states(self, blendshape):
+        """
+        Reads whether each target's weight is connected or locked
+        :param blendshape: string, name of the blendshape
+        :return dictionary: (connected, locked) keyed by logical index
+        """
+        raise NotImplementedError
+
+    def watch_node(self, node, on_change, on_removed):
+        """
+        Calls back when a node's weight multi or data changes, or the 
+            node goes away
+        :param node: string, name of the node
+        :param on_change: function, called with the kind of change, 
+            'targets' when targets are added, removed or renamed, 
+            'connection' or 'lock', the logical index and the new 
+            connected or locked state, or 'data' when weight maps or 
+            target deltas are set
+        :param on_removed: function, called when the node is deleted or 
+            renamed
+        :return: handle passed to unwatch
+        """
+        raise NotImplementedError
+
+    def unwatch(self, handle):
+        """
+        Stops the callbacks of watch_node
+        :param handle: handle returned by watch_node
+        """
+        raise NotImplementedError
+
+    def target_registry(self, blendshape):
+        """
+        Gets the cached target registry of a blendshape, building it the 
+            first time it is asked for
+        :param blendshape: string, name of the blendshape
+        :return TargetRegistry: the blendshape's registry
+        """
+        if blendshape not in self._target_registries:
+            self._target_registries[blendshape] = TargetRegistry(self, blendshape)
+        return self._target_registries[blendshape]
+
+    def sync_snapshots(self):
+        """
+        Gets the snapshots of the data the tool wrote into this scene
+        :return SyncSnapshots: the scene's snapshots
+        """
+        if self._sync_snapshots is None:
+            self._sync_snapshots = SyncSnapshots(self)
+        return self._sync_snapshots
+
+    def close(self):
+        """
+        Removes the callbacks of every registry and snapshot, and forgets 
+            them and the cached mesh data, e.g. when the tool's window 
+            closes or another scene is opened
+        """
+        for registry in list(self._target_registries.values()):
+            registry.close()
+        self._target_registries.clear()
+        if self._sync_snapshots is not None:
+            self._sync_snapshots.close()
+            self._sync_snapshots = None
+        self._mesh_caches.clear()
+
+    def cached(self, kind, key, build):
+        """
+        Gets data computed from this scene's meshes, building it when it 
+            isn't cached. Each kind keeps its MESH_CACHE_SIZE most recently 
+            used entries
+        :param kind: string, kind of data, e.g. 'symmetry'
+        :param key: tuple, hashable key naming the meshes and hashing 
+            their topology and points, so edited meshes miss
+        :param build: function, computes the data from nothing
+        :return: the cached data
+        """
+        cache = self._mesh_caches.setdefault(kind, collections.OrderedDict())
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+        cache[key] = value = build()
+        if len(cache) > MESH_CACHE_SIZE:
+            cache.popitem(last=False)
+        return value
+
+    def get_target_points(self, blendshape, index, item=FULL_WEIGHT_ITEM):
+        """
+        Reads a target item's stored point deltas
+        :param blendshape: string, name of the blendshape
+        :param index: int, logical index of the target
+        :param item: int, inputTargetItem index, 6000 is the full weight shape
+        :return tuple: vertex indices and their (count, 3) deltas
+        """
+        raise NotImplementedError
+
+    def set_target_points(
+        self, blendshape, index, indices, points, item=FULL_WEIGHT_ITEM
+    ):
+        """
+        Writes a target item's point deltas
+        :param blendshape: string, name of the blendshape
+        :param index: int, logical index of the target
+        :param indices: numpy.ndarray, sorted vertex indices that move
+        :param points: numpy.ndarray, (count, 3) deltas of those vertices
+        :param item: int, inputTargetItem index, 6000 is the full weight shape
+        """
+        raise NotImplementedError
+
+    def live_targets(self, blendshape):
+        """
+        Finds the targets that still have geometry connected
+        :param blendshape: string, name of the blendshape
+        :return dictionary: connected geometry keyed by (target index, item)
+        """
+        raise NotImplementedError
+
+    def target_items(self, blendshape):
+        """
+        Lists the inputTargetItem indices of every target, in-betweens 
+            included
+        :param blendshape: string, name of the blendshape
+        :return dictionary: sorted item indices keyed by target index
+        """
+        raise NotImplementedError
+
+    # Skinning
+    def skin_cluster(self, geo):
+        """
+        :param geo: string, deformed geometry
+        :return string: the geometry's skinCluster, None if it isn't skinned
+        """
+        raise NotImplementedError
+
+    def skin_weights(self, skin_cluster, geo):
+        """
+        :param skin_cluster: string, name of the skinCluster
+        :param geo: string, skinned geometry
+        :return tuple: (vertex_count, influence_count) weights and the
+            logical matrix index of each influence
+        """
+        raise NotImplementedError
+
+    def influence_matrices(self, skin_cluster, influence_indices):
+        """
+        :param skin_cluster: string, name of the skinCluster
+        :param influence_indices: list, logical matrix index of each influence
+        :return tuple: (influence_count, 4, 4) bindPreMatrix x matrix of
+            each influence and the (4, 4) geomMatrix
+        """
+        raise NotImplementedError
+
+    # Time
+    def current_time(self):
+        """
+        :return float: current frame
+        """
+        raise NotImplementedError
+
+    def set_current_time(self, frame):
+        """
+        :param frame: float, frame to go to
+        """
+        raise NotImplementedError
+
+    # Execution
+    @contextlib.contextmanager
+    def execution_context(self, name, evaluation=None):
+        """
+        Runs an operation as one step, rolled back if it is cancelled.
+            Scenes without undo or a viewport have nothing to set up
+        :param name: string, name of the operation
+        :param evaluation: string, 'dg' evaluates without the evaluation
+            manager, 'pause' pauses the viewport, left as it is when not given
+        """
+        yield
+
+    def progress_start(self, title, total):
+        """
+        Shows the progress of a long operation
+        :param title: string, title of the operation
+        :param total: int, number of items the operation processes
+        """
+        raise NotImplementedError
+
+    def progress_update(self, done, total):
+        """
+        Updates the progress between two chunks of work
+        :param done: int, number of items processed so far
+        :param total: int, number of items the operation processes
+        :return bool: True if the user asked to cancel
+        """
+        raise NotImplementedError
+
+    def progress_end(self):
+        """
+        Hides the progress of the operation
+        """
+        raise NotImplementedError
+
+
+class MayaScene(SceneAccess):
+    """
+    Scene access through maya.cmds and the Maya Python API 2.0
+    """
+    def __init__(self):
+        super().__init__()
+        self._progress_window = False
+        # Every callback watch_node added, and the ones closing the scene 
+        # access before a new scene is made or opened
+        self._callback_ids = set()
+        self._scene_callback_ids = []
+
+    def close(self):
+        super().close()
+        # Callbacks whose handle was lost are removed all the same
+        om.MMessage.removeCallbacks(
+            list(self._callback_ids) + self._scene_callback_ids
+        )
+        self._callback_ids.clear()
+        self._scene_callback_ids = []
+
+    def info(self, message):
+        MGlobal.displayInfo(message)
+
+    def warning(self, message):
+        cmds.warning(message)
+
+    def error(self, message):
+        cmds.error(message)
+
+    def exists(self, node):
+        return cmds.objExists(node)
+
+    def node_type(self, node):
+        return cmds.nodeType(node)
+
+    def list_nodes(self, node_types):
+        return cmds.ls(type=node_types) or []
+
+    def deformers(self, geo):
+        return cmds.findDeformers(geo) or []
+
+    def create_node(self, node_type, name):
+        return cmds.createNode(node_type, name=name)
+
+    def delete(self, nodes):
+        if nodes:
+            cmds.delete(nodes)
+
+    def has_attribute(self, node, attribute):
+        return cmds.attributeQuery(attribute, node=node, exists=True)
+
+    def get_attr(self, plug):
+        return cmds.getAttr(plug)
+
+    def set_attr(self, plug, value):
+        cmds.setAttr(plug, value)
+
+    def incoming_connection(self, plug):
+        connections = cmds.listConnections(
+            plug,
+            source=True,
+            destination=False,
+            plugs=True,
+            skipConversionNodes=True,
+        )
+        return connections[0] if connections else None
+
+    def combination_inputs(self, node):
+        connections = cmds.listConnections(
+            f"{node}.inputWeight",
+            source=True,
+            destination=False,
+            plugs=True,
+            connections=True,
+            skipConversionNodes=True,
+        ) or []
+        # Destination and source plug pairs, sorted by input index
+        pairs = sorted(
+            zip(connections[::2], connections[1::2]),
+            key=lambda pair: int(pair[0].rsplit("[", 1)[1][:-1]),
+        )
+        return [source for _, source in pairs]
+
+    def connect(self, source, destination):
+        cmds.connectAttr(source, destination)
+
+    def user_attributes(self, nodes):
+        selection = om.MSelectionList()
+        for node in nodes:
+            selection.add(node)
+        attributes = {}
+        for position, node in enumerate(nodes):
+            node_fn = om.MFnDependencyNode(selection.getDependNode(position))
+            attributes[node] = []
+            for index in range(node_fn.attributeCount()):
+                attribute_fn = om.MFnAttribute(node_fn.attribute(index))
+                # Children go away with their compound parent
+                if not attribute_fn.dynamic or not attribute_fn.parent.isNull():
+                    continue
+                if node_fn.findPlug(attribute_fn.object(), False).isKeyable:
+                    attributes[node].append(attribute_fn.name)
+        return attributes
+
+    def delete_attributes(self, nodes, attribute):
+        cmds.deleteAttr(nodes, attribute=attribute)
+
+    def set_attribute_states(self, nodes, attribute, lock, keyable):
+        # setAttr takes one plug, the statements are run as one command
+        mel.eval("".join(
+            f'setAttr -lock {int(lock)} -keyable {int(keyable)} "{node}.{attribute}";'
+            for node in nodes
+        ))
+
+    def _dag_path(self, node):
+        selection = om.MSelectionList()
+        selection.add(node)
+        return selection.getDagPath(0)
+
+    def vertex_count(self, mesh):
+        return cmds.polyEvaluate(mesh, vertex=True)
+
+    def topology(self, mesh):
+        return om.MFnMesh(self._dag_path(mesh)).getVertices()
+
+    def get_points(self, mesh):
+        points = om.MFnMesh(self._dag_path(mesh)).getPoints(om.MSpace.kObject)
+        return np.array(points, dtype=np.float64)[:, :3]
+
+    def set_points(self, mesh, points):
+        om.MFnMesh(self._dag_path(mesh)).setPoints(
+            om.MPointArray(np.asarray(points, dtype=np.float64).tolist()),
+            om.MSpace.kObject,
+        )
+
+    def original_points(self, geo):
+        shapes = cmds.listRelatives(
+            geo, shapes=True, fullPath=True, type="mesh"
+        ) or []
+        for shape in shapes:
+            # The original shape is the intermediate shape nothing deforms
+            if (cmds.getAttr(f"{shape}.intermediateObject")
+                and not cmds.listConnections(
+                    f"{shape}.inMesh", source=True, destination=False
+                )):
+                return self.get_points(shape)
+        return self.get_points(geo)
+
+    def duplicate(self, geo, name, points=None):
+        new_geo = cmds.duplicate(geo, name=name)[0]
+        if points is None:
+            return new_geo
+        intermediate_shapes = cmds.listRelatives(
+            new_geo, shapes=True, fullPath=True, type="mesh"
+        ) or []
+        new_shape = cmds.listRelatives(
+            new_geo, shapes=True, noIntermediate=True, fullPath=True
+        )[0]
+        intermediate_shapes.remove(new_shape)
+        if intermediate_shapes:
+            cmds.delete(intermediate_shapes)
+        self.set_points(new_shape, points)
+        return new_geo
+
+    def bake_geometries(self, geos, names):
+        if not geos:
+            return []
+        # ls sorts and merges its results, each geometry is resolved on 
+        # its own so its path stays paired with its name
+        geo_paths = [self._dag_path(geo).fullPathName() for geo in geos]
+        # Deformed shape of every geometry, from one query
+        shapes = {}
+        for shape in cmds.listRelatives(
+            list(set(geo_paths)), shapes=True, noIntermediate=True, fullPath=True
+        ) or []:
+            shapes.setdefault(shape.rsplit("|", 1)[0], shape)
+        # Instance of each source path, duplicated together in one call 
+        # that returns a root for each instance in the order given
+        object_instances = {
+            path: cmds.instance(shapes[path])[0] for path in dict.fromkeys(geo_paths)
+        }
+        duplicates = cmds.duplicate(
+            list(object_instances.values()), returnRootsOnly=True
+        )
+        cmds.delete(list(object_instances.values()))
+        if len(duplicates) != len(object_instances):
+            self.error("Couldn't bake every geometry")
+        baked = dict(zip(object_instances, duplicates))
+        # Renames through the source paths, a geometry given twice gets a 
+        # copy of its baked geometry
+        new_geos = []
+        for path, name in zip(geo_paths, names):
+            if path in baked:
+                new_geos.append(cmds.rename(baked.pop(path), name))
+            else:
+                new_geos.append(
+                    cmds.duplicate(new_geos[geo_paths.index(path)], name=name)[0]
+                )
+        return new_geos
+
+    def get_translation(self, node):
+        return cmds.xform(node, query=True, translation=True, worldSpace=False)
+
+    def move(self, node, translation):
+        cmds.move(*translation, node)
+
+    def weights_attribute(self, deformer, index=0, node_type=None):
+        """
+        Gets the per vertex weight multi attribute of a deformer
+        :param deformer: string, name of the deformer
+        :param index: int, index of the blendshape target
+        :param node_type: string, type of the deformer, queried when not given
+        :return string: name of the attribute
+        """
+        if node_type is None:
+            node_type = cmds.nodeType(deformer)
+        if node_type == "blendShape":
+            return (f"{deformer}.inputTarget[0]."
+                   f"inputTargetGroup[{index}].targetWeights")
+        return f"{deformer}.weightList[0].weights"
+
+    def get_stored_weights(self, deformer, index, vertex_count, node_type=None):
+        attribute = self.weights_attribute(deformer, index, node_type=node_type)
+        stored_indices = np.asarray(
+            cmds.getAttr(attribute, multiIndices=True) or [], dtype=np.int64
+        )
+        stored_indices = stored_indices[stored_indices < vertex_count]
+        # One query per run of stored vertices
+        values = []
+        for first, last in contiguous_runs(stored_indices):
+            values.extend(np.atleast_1d(
+                cmds.getAttr(f"{attribute}[{first}:{last}]")
+            ).tolist())
+        return stored_indices, np.asarray(values, dtype=np.float64)
+
+    def set_weight_range(self, deformer, index, first, values, node_type=None):
+        attribute = self.weights_attribute(deformer, index, node_type=node_type)
+        last = first + len(values) - 1
+        cmds.setAttr(
+            f"{attribute}[{first}:{last}]",
+            *np.asarray(values, dtype=np.float64).tolist(),
+            size=len(values),
+        )
+
+    def blendshape_geometry(self, blendshape):
+        # Search for the base geometry through the blendshape's connections
+        geo = cmds.listConnections(f"{blendshape}.outputGeometry")[0]
+        # While loop to find the base geo through any extra deformers in the input list
+        while cmds.nodeType(geo) != "transform":
+            geo = cmds.listConnections(f"{geo}.outputGeometry")[0]
+        return geo
+
+    def rest_points(self, blendshape):
+        selection = om.MSelectionList()
+        selection.add(f"{blendshape}.input[0].inputGeometry")
+        points = om.MFnMesh(selection.getPlug(0).asMObject()).getPoints()
+        return np.array(points, dtype=np.float64)[:, :3]
+
+    def target_indices(self, blendshape):
+        aliases = cmds.aliasAttr(blendshape, query=True) or []
+        return {
+            alias: int(plug[plug.index("[") + 1:-1])
+            for alias, plug in zip(aliases[::2], aliases[1::2])
+            if plug.startswith("weight[")
+        }
+
+    def add_target(self, blendshape, name, index=None):
+        if index is None:
+            index = max(self.target_indices(blendshape).values(), default=-1) + 1
+        cmds.setAttr(f"{blendshape}.weight[{index}]", 0)
+        cmds.aliasAttr(name, f"{blendshape}.weight[{index}]")
+        return index
+
+    def blendshapes(self, objects=None):
+        if objects is None:
+            return cmds.ls(type="blendShape") or []
+        if not objects:
+            return []
+        history = cmds.listHistory(objects, pruneDagObjects=True) or []
+        return list(dict.fromkeys(cmds.ls(history, type="blendShape")))
+
+    def get_target_weights(self, blendshape):
+        selection = om.MSelectionList()
+        selection.add(f"{blendshape}.weight")
+        weight_plug = selection.getPlug(0)
+        elements = [
+            weight_plug.elementByPhysicalIndex(physical_index) 
+            for physical_index in range(weight_plug.numElements())
+        ]
+        return (
+            np.array([element.logicalIndex() for element in elements], dtype=np.int64), 
+            np.array([element.asDouble() for element in elements], dtype=np.float64),
+        )
+
+    def set_target_weights(self, blendshape, indices, values):
+        indices = np.asarray(indices, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        position = 0
+        for first, last in contiguous_runs(indices):
+            run_values = values[position:position + last - first + 1].tolist()
+            cmds.setAttr(
+                f"{blendshape}.weight[{first}:{last}]", 
+                *run_values, 
+                size=len(run_values),
+            )
+            position += len(run_values)
+
+    def target_states(self, blendshape):
+        selection = om.MSelectionList()
+        selection.add(f"{blendshape}.weight")
+        weight_plug = selection.getPlug(0)
+        # Walks the existing elements only, sparse indices cost nothing
+        states = {}
+        for physical_index in range(weight_plug.numElements()):
+            element = weight_plug.elementByPhysicalIndex(physical_index)
+            states[element.logicalIndex()] = (
+                element.isDestination, element.isLocked
+            )
+        return states
+
+    def watch_node(self, node, on_change, on_removed):
+        selection = om.MSelectionList()
+        selection.add(node)
+        node_object = selection.getDependNode(0)
+        connection_messages = (
+            om.MNodeMessage.kConnectionMade | om.MNodeMessage.kConnectionBroken
+        )
+        lock_messages = (
+            om.MNodeMessage.kAttributeLocked | om.MNodeMessage.kAttributeUnlocked
+        )
+        target_messages = (
+            om.MNodeMessage.kAttributeArrayAdded 
+            | om.MNodeMessage.kAttributeArrayRemoved
+        )
+
+        def attribute_changed(message, plug, other_plug, client_data):
+            # Target names are aliases, renaming one sets the alias list
+            if message & om.MNodeMessage.kAttributeRenamed or (
+                message & om.MNodeMessage.kAttributeSet 
+                and plug.partialName() == "aal"
+            ):
+                on_change("targets", None, None)
+                return
+            # Apart from the weight multi, only set values matter
+            if not plug.isElement or plug.array().partialName() != "w":
+                if message & om.MNodeMessage.kAttributeSet:
+                    on_change("data", None, None)
+                return
+            if message & connection_messages:
+                # Connections going out of the weight don't drive it
+                if message & om.MNodeMessage.kIncomingDirection:
+                    on_change(
+                        "connection", 
+                        plug.logicalIndex(), 
+                        bool(message & om.MNodeMessage.kConnectionMade),
+                    )
+            elif message & lock_messages:
+                on_change(
+                    "lock", 
+                    plug.logicalIndex(), 
+                    bool(message & om.MNodeMessage.kAttributeLocked),
+                )
+            elif message & target_messages:
+                on_change("targets", plug.logicalIndex(), None)
+
+        if not self._scene_callback_ids:
+            self._scene_callback_ids = [
+                om.MSceneMessage.addCallback(message, lambda *args: self.close())
+                for message in [
+                    om.MSceneMessage.kBeforeNew, om.MSceneMessage.kBeforeOpen
+                ]
+            ]
+        handle = [
+            om.MNodeMessage.addAttributeChangedCallback(
+                node_object, attribute_changed
+            ), 
+            om.MNodeMessage.addNodePreRemovalCallback(
+                node_object, lambda *args: on_removed()
+            ), 
+            om.MNodeMessage.addNameChangedCallback(
+                node_object, lambda *args: on_removed()
+            ),
+        ]
+        self._callback_ids.update(handle)
+        return handle
+
+    def unwatch(self, handle):
+        om.MMessage.removeCallbacks(handle)
+        self._callback_ids.difference_update(handle)
+
+    def _target_item_attribute(self, blendshape, index, item):
+        return (f"{blendshape}.inputTarget[0].inputTargetGroup[{index}]."
+               f"inputTargetItem[{item}]")
+
+    def get_target_points(self, blendshape, index, item=FULL_WEIGHT_ITEM):
+        attribute = self._target_item_attribute(blendshape, index, item)
+        points = cmds.getAttr(f"{attribute}.inputPointsTarget")
+        if not points:
+            return np.zeros(0, dtype=np.int64), np.zeros((0, 3))
+        points = np.asarray(points, dtype=np.float64)[:, :3]
+        indices = component_indices(
+            cmds.getAttr(f"{attribute}.inputComponentsTarget")
+        )
+        if indices is None:
+            indices = np.arange(len(points))
+        return indices, points
+
+    def set_target_points(
+        self, blendshape, index, indices, points, item=FULL_WEIGHT_ITEM
+    ):
+        attribute = self._target_item_attribute(blendshape, index, item)
+        components = [
+            f"vtx[{first}:{last}]" for first, last in contiguous_runs(indices)
+        ]
+        points = [
+            (*point, 1.0)
+            for point in np.asarray(points, dtype=np.float64).tolist()
+        ]
+        cmds.setAttr(
+            f"{attribute}.inputPointsTarget",
+            len(points),
+            *points,
+            type="pointArray",
+        )
+        cmds.setAttr(
+            f"{attribute}.inputComponentsTarget",
+            len(components),
+            *components,
+            type="componentList",
+        )
+
+    def live_targets(self, blendshape):
+        connections = cmds.listConnections(
+            f"{blendshape}.inputTarget",
+            source=True,
+            destination=False,
+            connections=True,
+            plugs=True,
+            shapes=True,
+        ) or []
+        live_targets = {}
+        for destination, source in zip(connections[::2], connections[1::2]):
+            if not destination.endswith((".inputGeomTarget", ".igt")):
+                continue
+            # blendShape1.inputTarget[0].inputTargetGroup[3].inputTargetItem[6000]
+            indices = [
+                int(token.split("]")[0]) for token in destination.split("[")[2:]
+            ]
+            live_targets[tuple(indices[:2])] = source.split(".")[0]
+        return live_targets
+
+    def target_items(self, blendshape):
+        selection = om.MSelectionList()
+        selection.add(f"{blendshape}.inputTarget[0].inputTargetGroup")
+        groups_plug = selection.getPlug(0)
+        item_attribute = om.MFnDependencyNode(groups_plug.node()).attribute(
+            "inputTargetItem"
+        )
+        # Walks the existing groups' item multis, no command per target
+        items = {}
+        for physical_index in range(groups_plug.numElements()):
+            group_plug = groups_plug.elementByPhysicalIndex(physical_index)
+            items[group_plug.logicalIndex()] = sorted(
+                group_plug.child(item_attribute).getExistingArrayAttributeIndices()
+            )
+        return items
+
+    def skin_cluster(self, geo):
+        for deformer_node in self.deformers(geo):
+            if cmds.nodeType(deformer_node) == "skinCluster":
+                return deformer_node
+        return None
+
+    def skin_weights(self, skin_cluster, geo):
+        selection = om.MSelectionList()
+        selection.add(skin_cluster)
+        selection.add(geo)
+        skin_fn = oma.MFnSkinCluster(selection.getDependNode(0))
+        geo_path = selection.getDagPath(1)
+        geo_path.extendToShape()
+        # Component holding every vertex of the geometry
+        components = om.MFnSingleIndexedComponent()
+        components_object = components.create(om.MFn.kMeshVertComponent)
+        components.setCompleteData(om.MFnMesh(geo_path).numVertices)
+        weights, influence_count = skin_fn.getWeights(geo_path, components_object)
+        influence_indices = [
+            skin_fn.indexForInfluenceObject(influence)
+            for influence in skin_fn.influenceObjects()
+        ]
+        return (
+            np.array(weights, dtype=np.float64).reshape(-1, influence_count),
+            influence_indices,
+        )
+
+    def influence_matrices(self, skin_cluster, influence_indices):
+        influence_matrices = np.array([
+            np.reshape(
+                cmds.getAttr(f"{skin_cluster}.bindPreMatrix[{index}]"), (4, 4)
+            ) @ np.reshape(
+                cmds.getAttr(f"{skin_cluster}.matrix[{index}]"), (4, 4)
+            )
+            for index in influence_indices
+        ], dtype=np.float64).reshape(-1, 4, 4)
+        geom_matrix = np.reshape(
+            cmds.getAttr(f"{skin_cluster}.geomMatrix"), (4, 4)
+        )
+        return influence_matrices, geom_matrix
+
+    def current_time(self):
+        return cmds.currentTime(query=True)
+
+    def set_current_time(self, frame):
+        cmds.currentTime(frame)
+
+    @contextlib.contextmanager
+    def execution_context(self, name, evaluation=None):
+        # Operations run by other operations are part of the outer step
+        if self._context_depth:
+            self._context_depth += 1
+            try:
+                yield
+            finally:
+                self._context_depth -= 1
+            return
+        self._context_depth = 1
+        evaluation_mode = None
+        viewport_paused = None
+        cancelled = False
+        cmds.undoInfo(openChunk=True, chunkName=name)
+        cmds.refresh(suspend=True)
+        try:
+            if evaluation == "dg":
+                evaluation_mode = cmds.evaluationManager(query=True, mode=True)[0]
+                cmds.evaluationManager(mode="off")
+            elif evaluation == "pause":
+                viewport_paused = cmds.ogs(query=True, pause=True)
+                # ogs -pause toggles the viewport
+                if not viewport_paused:
+                    cmds.ogs(pause=True)
+            yield
+        except OperationCancelled:
+            cancelled = True
+            raise
+        finally:
+            # Restores everything, even when the operation failed
+            if evaluation_mode is not None:
+                cmds.evaluationManager(mode=evaluation_mode)
+            if viewport_paused is False:
+                cmds.ogs(pause=True)
+            cmds.refresh(suspend=False)
+            cmds.undoInfo(closeChunk=True)
+            self._context_depth = 0
+            # Rolls the cancelled operation back as the single step it was
+            if cancelled:
+                if cmds.undoInfo(query=True, state=True):
+                    cmds.undo()
+                else:
+                    cmds.warning(f"Undo is off, '{name}' can't be rolled back")
+
+    def progress_start(self, title, total):
+        # Batch sessions have no window to show
+        self._progress_window = not cmds.about(batch=True)
+        if self._progress_window:
+            cmds.progressWindow(
+                title=title,
+                progress=0,
+                maxValue=max(total, 1),
+                status=f"0/{total}",
+                isInterruptable=True,
+            )
+
+    def progress_update(self, done, total):
+        if not self._progress_window:
+            return False
+        cmds.progressWindow(edit=True, progress=done, status=f"{done}/{total}")
+        # Lets Maya run its idle queue, and see the cancel, between chunks
+        maya.utils.processIdleEvents()
+        return cmds.progressWindow(query=True, isCancelled=True)
+
+    def progress_end(self):
+        if self._progress_window:
+            cmds.progressWindow(endProgress=True)
+
+
+class MemoryScene(SceneAccess):
+    """
+    Pure python and NumPy scene modelling meshes, blendshapes with their
+        targets and weights, other weighted deformers, skinning and
+        connections. Lets every operation run, and be timed, without Maya
+    """
+    def __init__(self):
+        super().__init__()
+        self.nodes = {}
+        # Source plug of each connected destination plug
+        self.connections = {}
+        self.time = 1.0
+        self.messages = []
+        # Callbacks of each watched node
+        self.watchers = {}
+        # Progress reported by operations, and a simulated cancel
+        self.progress = []
+        self.interrupt_after = None
+
+    # Building the scene
+    def create_mesh(self, name, points, polygon_counts, polygon_connects):
+        """
+        Adds a mesh to the scene
+        :param name: string, name of the mesh
+        :param points: numpy.ndarray, (vertex_count, 3) object space points
+        :param polygon_counts: list, number of vertices of each polygon
+        :param polygon_connects: list, vertex indices of every polygon
+        :return string: name of the mesh
+        """
+        self.nodes[name] = {
+            "type": "mesh",
+            "points": np.array(points, dtype=np.float64),
+            "polygon_counts": np.asarray(polygon_counts, dtype=np.int32),
+            "polygon_connects": np.asarray(polygon_connects, dtype=np.int32),
+            "translation": [0.0, 0.0, 0.0],
+            "deformers": [],
+            "attributes": {},
+        }
+        return name
+
+    def create_deformer(self, node_type, name, geo):
+        """
+        Adds a weighted deformer, e.g. a blendShape or cluster, at the end
+            of a mesh's deformer stack
+        :param node_type: string, type of the deformer
+        :param name: string, name of the deformer
+        :param geo: string, mesh the deformer deforms
+        :return string: name of the deformer
+        """
+        self.nodes[name] = {
+            "type": node_type,
+            "geometry": geo,
+            "envelope": 1.0,
+            # Weight channel value and target name of each logical index
+            "weights": {},
+            "aliases": {},
+            # Dense weights and stored flags of each per vertex weight map
+            "vertex_weights": {},
+            # Vertex indices and deltas of each (target, item)
+            "target_points": {},
+            "live_targets": {},
+            "attributes": {},
+        }
+        self.nodes[geo]["deformers"].append(name)
+        return name
+
+    def create_skin_cluster(
+        self, name, geo, weights, influence_matrices, geom_matrix=None
+    ):
+        """
+        Adds a skinCluster at the end of a mesh's deformer stack
+        :param name: string, name of the skinCluster
+        :param geo: string, mesh the skinCluster deforms
+        :param weights: numpy.ndarray, (vertex_count, influence_count) weights
+        :param influence_matrices: numpy.ndarray, (influence_count, 4, 4)
+            bindPreMatrix x matrix of each influence
+        :param geom_matrix: numpy.ndarray, (4, 4) geomMatrix
+        :return string: name of the skinCluster
+        """
+        self.nodes[name] = {
+            "type": "skinCluster",
+            "geometry": geo,
+            "weights": np.asarray(weights, dtype=np.float64),
+            "influence_matrices": np.asarray(influence_matrices, dtype=np.float64),
+            "geom_matrix": np.eye(4) if geom_matrix is None else geom_matrix,
+            "attributes": {},
+        }
+        self.nodes[geo]["deformers"].append(name)
+        return name
+
+    def _node(self, node):
+        if node not in self.nodes:
+            self.error(f"Object '{node}' does not exist")
+        return self.nodes[node]
+
+    def _split_plug(self, plug):
+        node, attribute = plug.split(".", 1)
+        return self._node(node), attribute
+
+    def _weight_index(self, node, attribute):
+        if attribute in node.get("aliases", {}):
+            return node["aliases"][attribute]
+        if attribute.startswith(("weight[", "w[")):
+            return int(attribute[attribute.index("[") + 1:-1])
+        return None
+
+    def _evaluate(self, mesh, stop=None):
+        """
+        Evaluates a mesh's deformer stack
+        :param mesh: string, name of the mesh
+        :param stop: string, deformer the evaluation stops before
+        :return numpy.ndarray: (vertex_count, 3) deformed points
+        """
+        mesh_node = self._node(mesh)
+        points = mesh_node["points"].copy()
+        for deformer in mesh_node["deformers"]:
+            if deformer == stop:
+                break
+            node = self.nodes[deformer]
+            if node["type"] == "blendShape":
+                points += node["envelope"] * self._blendshape_offsets(
+                    node, len(points)
+                )
+            elif node["type"] == "skinCluster":
+                skin_matrices = blend_skin_matrices(
+                    node["weights"], node["influence_matrices"], node["geom_matrix"]
+                )
+                points = np.einsum(
+                    "ni,nij->nj",
+                    np.column_stack((points, np.ones(len(points)))),
+                    skin_matrices,
+                )[:, :3]
+        return points
+
+    def _blendshape_offsets(self, node, vertex_count):
+        offsets = np.zeros((vertex_count, 3))
+        items = {}
+        for index, item in node["target_points"]:
+            items.setdefault(index, []).append(item)
+        for index, weight in node["weights"].items():
+            if not weight or FULL_WEIGHT_ITEM not in items.get(index, []):
+                continue
+            # Interpolates between the shapes on each side of the weight, 
+            # starting from no delta at weight 0
+            shapes = [(0.0, np.zeros((vertex_count, 3)))]
+            for item in sorted(items[index]):
+                indices, points = node["target_points"][(index, item)]
+                shape = np.zeros((vertex_count, 3))
+                shape[indices] = points
+                shapes.append((item_weight(item), shape))
+            shapes.sort(key=lambda shape: shape[0])
+            weights = [shape_weight for shape_weight, _ in shapes]
+            segment = min(
+                max(int(np.searchsorted(weights, weight)), 1), len(shapes) - 1
+            )
+            (low_weight, low), (high_weight, high) = shapes[segment - 1:segment + 1]
+            blend = (weight - low_weight) / (high_weight - low_weight)
+            target_offsets = low + blend * (high - low)
+            if index in node["vertex_weights"]:
+                target_offsets *= node["vertex_weights"][index][0][:, None]
+            offsets += target_offsets
+        return offsets
+
+    def _notify(self, node, kind, index=None, value=None):
+        for on_change, on_removed in list(self.watchers.get(node, [])):
+            if kind == "removed":
+                on_removed()
+            else:
+                on_change(kind, index, value)
+
+    def _notify_connection(self, destination, connected):
+        node, attribute = destination.split(".", 1)
+        if node in self.nodes:
+            index = self._weight_index(self.nodes[node], attribute)
+            if index is not None:
+                self._notify(node, "connection", index, connected)
+
+    def info(self, message):
+        self.messages.append(("info", message))
+
+    def warning(self, message):
+        self.messages.append(("warning", message))
+
+    def error(self, message):
+        raise RuntimeError(message)
+
+    def exists(self, node):
+        return node in self.nodes
+
+    def node_type(self, node):
+        return self._node(node)["type"]
+
+    def list_nodes(self, node_types):
+        return [
+            name for name, node in self.nodes.items()
+            if node["type"] in node_types
+        ]
+
+    def deformers(self, geo):
+        return list(self._node(geo).get("deformers", []))
+
+    def create_node(self, node_type, name):
+        unique_name = name
+        suffix = 1
+        while unique_name in self.nodes:
+            unique_name = f"{name}{suffix}"
+            suffix += 1
+        self.nodes[unique_name] = {"type": node_type, "attributes": {}}
+        return unique_name
+
+    def delete(self, nodes):
+        for name in nodes:
+            self._notify(name, "removed")
+            node = self.nodes.pop(name)
+            if "geometry" in node and node["geometry"] in self.nodes:
+                self.nodes[node["geometry"]]["deformers"].remove(name)
+            broken = [
+                destination
+                for destination, source in self.connections.items()
+                if destination.split(".")[0] == name
+                or source.split(".")[0] == name
+            ]
+            for destination in broken:
+                del self.connections[destination]
+                self._notify_connection(destination, False)
+
+    def has_attribute(self, node, attribute):
+        node = self._node(node)
+        return (attribute in node["attributes"]
+            or self._weight_index(node, attribute) is not None)
+
+    def get_attr(self, plug):
+        node, attribute = self._split_plug(plug)
+        index = self._weight_index(node, attribute)
+        if index is not None:
+            return node["weights"].get(index, 0.0)
+        if attribute == "envelope" and "envelope" in node:
+            return node["envelope"]
+        if attribute not in node["attributes"]:
+            self.error(f"No attribute '{plug}'")
+        return node["attributes"][attribute]
+
+    def set_attr(self, plug, value):
+        node, attribute = self._split_plug(plug)
+        index = self._weight_index(node, attribute)
+        if index is not None:
+            node["weights"][index] = value
+        elif attribute == "envelope" and "envelope" in node:
+            node["envelope"] = value
+        else:
+            node["attributes"][attribute] = value
+
+    def incoming_connection(self, plug):
+        return self.connections.get(plug)
+
+    def combination_inputs(self, node):
+        prefix = f"{node}.inputWeight["
+        plugs = [plug for plug in self.connections if plug.startswith(prefix)]
+        return [
+            self.connections[plug] 
+            for plug in sorted(plugs, key=lambda plug: int(plug[len(prefix):-1]))
+        ]
+
+    def connect(self, source, destination):
+        self._split_plug(source)
+        self._split_plug(destination)
+        if destination in self.connections:
+            self.error(f"'{destination}' already has an incoming connection")
+        self.connections[destination] = source
+        self._notify_connection(destination, True)
+
+    def user_attributes(self, nodes):
+        return {
+            node: [
+                attribute 
+                for attribute, value in self._node(node)["attributes"].items()
+                if not isinstance(value, str)
+            ]
+            for node in nodes
+        }
+
+    def delete_attributes(self, nodes, attribute):
+        for node in nodes:
+            self._node(node)["attributes"].pop(attribute, None)
+
+    def set_attribute_states(self, nodes, attribute, lock, keyable):
+        for node in nodes:
+            node_data = self._node(node)
+            node_data.setdefault("attribute_states", {})[attribute] = (lock, keyable)
+            index = self._weight_index(node_data, attribute)
+            if index is not None:
+                self._notify(node, "lock", index, lock)
+
+    def vertex_count(self, mesh):
+        return len(self._node(mesh)["points"])
+
+    def topology(self, mesh):
+        node = self._node(mesh)
+        return node["polygon_counts"], node["polygon_connects"]
+
+    def get_points(self, mesh):
+        return self._evaluate(mesh)
+
+    def set_points(self, mesh, points):
+        self._node(mesh)["points"] = np.array(points, dtype=np.float64)
+
+    def original_points(self, geo):
+        return self._node(geo)["points"].copy()
+
+    def duplicate(self, geo, name, points=None):
+        node = self._node(geo)
+        new_geo = self.create_node("mesh", name)
+        self.nodes[new_geo] = {
+            "type": "mesh",
+            "points": self._evaluate(geo) if points is None
+                else np.array(points, dtype=np.float64),
+            "polygon_counts": node["polygon_counts"],
+            "polygon_connects": node["polygon_connects"],
+            "translation": list(node["translation"]),
+            "deformers": [],
+            "attributes": dict(node["attributes"]),
+        }
+        return new_geo
+
+    def bake_geometries(self, geos, names):
+        new_geos = [self.duplicate(geo, name) for geo, name in zip(geos, names)]
+        for new_geo in new_geos:
+            self.nodes[new_geo]["attributes"] = {}
+        return new_geos
+
+    def get_translation(self, node):
+        return list(self._node(node)["translation"])
+
+    def move(self, node, translation):
+        self._node(node)["translation"] = list(translation)
+
+    def get_stored_weights(self, deformer, index, vertex_count, node_type=None):
+        vertex_weights = self._node(deformer)["vertex_weights"].get(index)
+        if vertex_weights is None:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        values, stored = vertex_weights
+        stored_indices = np.flatnonzero(stored[:vertex_count])
+        return stored_indices, values[stored_indices]
+
+    def set_weight_range(self, deformer, index, first, values, node_type=None):
+        node = self._node(deformer)
+        if index not in node["vertex_weights"]:
+            vertex_count = self.vertex_count(node["geometry"])
+            node["vertex_weights"][index] = (
+                np.full(vertex_count, DEFAULT_WEIGHT),
+                np.zeros(vertex_count, dtype=bool),
+            )
+        weights, stored = node["vertex_weights"][index]
+        weights[first:first + len(values)] = values
+        stored[first:first + len(values)] = True
+        self._notify(deformer, "data")
+
+    def blendshape_geometry(self, blendshape):
+        return self._node(blendshape)["geometry"]
+
+    def rest_points(self, blendshape):
+        return self._evaluate(self.blendshape_geometry(blendshape), stop=blendshape)
+
+    def target_indices(self, blendshape):
+        return dict(self._node(blendshape)["aliases"])
+
+    def add_target(self, blendshape, name, index=None):
+        node = self._node(blendshape)
+        if index is None:
+            index = max(node["aliases"].values(), default=-1) + 1
+        node["weights"][index] = 0.0
+        node["aliases"][name] = index
+        self._notify(blendshape, "targets", index, None)
+        return index
+
+    def blendshapes(self, objects=None):
+        if objects is None:
+            return self.list_nodes(["blendShape"])
+        blendshapes = []
+        for object in objects:
+            blendshapes += [
+                deformer 
+                for deformer in self.deformers(object) 
+                if self.nodes[deformer]["type"] == "blendShape" 
+                and deformer not in blendshapes
+            ]
+        return blendshapes
+
+    def get_target_weights(self, blendshape):
+        weights = self._node(blendshape)["weights"]
+        indices = np.array(sorted(weights), dtype=np.int64)
+        return indices, np.array(
+            [weights[index] for index in indices.tolist()], dtype=np.float64
+        )
+
+    def set_target_weights(self, blendshape, indices, values):
+        weights = self._node(blendshape)["weights"]
+        for index, value in zip(np.asarray(indices).tolist(), np.asarray(values).tolist()):
+            weights[index] = value
+
+    def target_states(self, blendshape):
+        node = self._node(blendshape)
+        locks = node.get("attribute_states", {})
+        return {
+            index: (
+                f"{blendshape}.{alias}" in self.connections 
+                or f"{blendshape}.weight[{index}]" in self.connections, 
+                locks.get(alias, (False, True))[0],
+            )
+            for alias, index in node["aliases"].items()
+        }
+
+    def watch_node(self, node, on_change, on_removed):
+        self._node(node)
+        entry = (on_change, on_removed)
+        self.watchers.setdefault(node, []).append(entry)
+        return node, entry
+
+    def unwatch(self, handle):
+        node, entry = handle
+        if entry in self.watchers.get(node, []):
+            self.watchers[node].remove(entry)
+
+    def get_target_points(self, blendshape, index, item=FULL_WEIGHT_ITEM):
+        target_points = self._node(blendshape)["target_points"].get((index, item))
+        if target_points is None:
+            return np.zeros(0, dtype=np.int64), np.zeros((0, 3))
+        return target_points[0].copy(), target_points[1].copy()
+
+    def set_target_points(
+        self, blendshape, index, indices, points, item=FULL_WEIGHT_ITEM
+    ):
+        self._node(blendshape)["target_points"][(index, item)] = (
+            np.array(indices, dtype=np.int64),
+            np.array(points, dtype=np.float64).reshape(-1, 3),
+        )
+        self._notify(blendshape, "data")
+
+    def live_targets(self, blendshape):
+        return dict(self._node(blendshape)["live_targets"])
+
+    def target_items(self, blendshape):
+        node = self._node(blendshape)
+        items = {}
+        for index, item in list(node["target_points"]) + list(node["live_targets"]):
+            items.setdefault(index, set()).add(item)
+        return {index: sorted(index_items) for index, index_items in items.items()}
+
+    def skin_cluster(self, geo):
+        for deformer in self.deformers(geo):
+            if self.nodes[deformer]["type"] == "skinCluster":
+                return deformer
+        return None
+
+    def skin_weights(self, skin_cluster, geo):
+        weights = self._node(skin_cluster)["weights"]
+        return weights.copy(), list(range(weights.shape[1]))
+
+    def influence_matrices(self, skin_cluster, influence_indices):
+        node = self._node(skin_cluster)
+        return (
+            node["influence_matrices"][list(influence_indices)].copy(),
+            node["geom_matrix"].copy(),
+        )
+
+    def current_time(self):
+        return self.time
+
+    def set_current_time(self, frame):
+        self.time = frame
+
+    @contextlib.contextmanager
+    def execution_context(self, name, evaluation=None):
+        if self._context_depth:
+            self._context_depth += 1
+            try:
+                yield
+            finally:
+                self._context_depth -= 1
+            return
+        self._context_depth = 1
+        # Copy of the scene standing in for an undo chunk
+        state = copy.deepcopy((self.nodes, self.connections))
+        try:
+            yield
+        except OperationCancelled:
+            self.nodes, self.connections = state
+            for registry in self._target_registries.values():
+                registry.dirty = True
+            self.sync_snapshots().drop()
+            raise
+        finally:
+            self._context_depth = 0
+
+    def progress_start(self, title, total):
+        self.progress.append((title, 0, total))
+
+    def progress_update(self, done, total):
+        self.progress.append((self.progress[-1][0], done, total))
+        return self.interrupt_after is not None and done >= self.interrupt_after
+
+    def progress_end(self):
+        pass
+
+
+class TargetRegistry:
+    """
+    Cached map between a blendshape's target names and logical indices, 
+        with the connection and lock state of each target. It is built 
+        once and kept current by scene callbacks, so lookups are constant 
+        time and stay right on sparse weight indices
+    """
+    def __init__(self, scene, blendshape):
+        """
+        :param scene: SceneAccess, scene the blendshape is in
+        :param blendshape: string, name of the blendshape
+        """
+        self.scene = scene
+        self.blendshape = blendshape
+        self.indices_by_name = {}
+        self.names_by_index = {}
+        self.states = {}
+        self.dirty = True
+        self.handle = scene.watch_node(blendshape, self._changed, self._removed)
+
+    def _changed(self, kind, index, value):
+        if kind == "data":
+            return
+        if kind == "targets" or self.dirty or index not in self.states:
+            self.dirty = True
+            return
+        # Connection and lock changes only touch one target
+        connected, locked = self.states[index]
+        if kind == "connection":
+            self.states[index] = (value, locked)
+        else:
+            self.states[index] = (connected, value)
+
+    def _removed(self):
+        self.close()
+
+    def close(self):
+        """
+        Removes the callbacks and drops the registry from the scene's cache
+        """
+        if self.handle is not None:
+            self.scene.unwatch(self.handle)
+            self.handle = None
+        registries = self.scene._target_registries
+        if registries.get(self.blendshape) is self:
+            del registries[self.blendshape]
+
+    def refresh(self):
+        """
+        Rebuilds the registry from the node
+        """
+        self.indices_by_name = self.scene.target_indices(self.blendshape)
+        self.names_by_index = {
+            index: name for name, index in self.indices_by_name.items()
+        }
+        self.states = self.scene.target_states(self.blendshape)
+        self.dirty = False
+
+    def _current(self):
+        if self.dirty:
+            self.refresh()
+        return self
+
+    def __contains__(self, name):
+        return self.index(name) is not None
+
+    def __len__(self):
+        return len(self._current().indices_by_name)
+
+    def index(self, name):
+        """
+        :param name: string, name of the target
+        :return int: logical index of the target, None if there is no 
+            such target
+        """
+        return self._current().indices_by_name.get(name)
+
+    def name(self, index):
+        """
+        :param index: int, logical index of the target
+        :return string: name of the target, None if there is no such target
+        """
+        return self._current().names_by_index.get(index)
+
+    def names(self):
+        """
+        :return list: target names in logical index order
+        """
+        names_by_index = self._current().names_by_index
+        return [names_by_index[index] for index in sorted(names_by_index)]
+
+    def indices(self):
+        """
+        :return dictionary: logical index of each target name
+        """
+        return dict(self._current().indices_by_name)
+
+    def is_connected(self, name):
+        """
+        :param name: string, name of the target
+        :return bool: True if the target's weight has an incoming connection
+        """
+        return self._current().states.get(self.index(name), (False, False))[0]
+
+    def is_locked(self, name):
+        """
+        :param name: string, name of the target
+        :return bool: True if the target's weight is locked
+        """
+        return self._current().states.get(self.index(name), (False, False))[1]
+
+    def free_mask(self, indices):
+        """
+        :param indices: numpy.ndarray, logical indices of targets
+        :return numpy.ndarray: True where the target's weight is neither 
+            connected nor locked
+        """
+        states = self._current().states
+        return np.array(
+            [not any(states.get(index, (False, False))) for index in indices], 
+            dtype=bool,
+        )
+
+    def add(self, name):
+        """
+        Adds a target without any geometry to the blendshape
+        :param name: string, name of the new target
+        :return int: logical index of the new target
+        """
+        index = self.scene.add_target(
+            self.blendshape, 
+            name, 
+            index=max(self._current().names_by_index, default=-1) + 1,
+        )
+        # Records the new target rather than rebuilding everything
+        self.dirty = False
+        self.indices_by_name[name] = index
+        self.names_by_index[index] = name
+        self.states[index] = (False, False)
+        return index
+
+
+class SyncSnapshots:
+    """
+    Content hashes of the weight maps and target deltas the tool last 
+        wrote, so writing them again only pushes what changed. A node's 
+        snapshots are dropped as soon as anything else edits it, undo 
+        included
+    """
+    def __init__(self, scene):
+        """
+        :param scene: SceneAccess, scene the snapshots are taken in
+        """
+        self.scene = scene
+        self.weights = {}
+        self.deltas = {}
+        self.handles = {}
+        # Only the latest changed writes are kept, the others are counted
+        self.changes = collections.deque(maxlen=SYNC_CHANGES_LIMIT)
+        self.dropped_changes = 0
+        self.unchanged = 0
+        self.writing = 0
+
+    def _watch(self, node):
+        if node in self.handles:
+            return
+
+        def changed(kind, index, value):
+            # The tool's own writes are recorded after they are made
+            if kind == "data" and not self.writing:
+                self.drop(node)
+
+        def removed():
+            self.drop(node)
+            self.scene.unwatch(self.handles.pop(node))
+
+        self.handles[node] = self.scene.watch_node(node, changed, removed)
+
+    @contextlib.contextmanager
+    def own_write(self):
+        """
+        Context in which the scene changes are the tool's own writes
+        """
+        self.writing += 1
+        try:
+            yield
+        finally:
+            self.writing -= 1
+
+    def close(self):
+        """
+        Removes the callbacks and forgets every snapshot and change
+        """
+        for handle in self.handles.values():
+            self.scene.unwatch(handle)
+        self.handles.clear()
+        self.drop()
+        self.changes.clear()
+        self.dropped_changes = 0
+        self.unchanged = 0
+
+    def drop(self, node=None):
+        """
+        Forgets the snapshots of a node, of every node when not given
+        :param node: string, name of the node
+        """
+        for snapshots in [self.weights, self.deltas]:
+            for key in [key for key in snapshots if node in (None, key[0])]:
+                del snapshots[key]
+
+    def previous_weights(self, deformer, index):
+        """
+        :param deformer: string, name of the deformer
+        :param index: int, index of the blendshape target
+        :return SparseWeights: weights last written, None without a snapshot
+        """
+        snapshot = self.weights.get((deformer, index))
+        return None if snapshot is None else snapshot[1]
+
+    def _record_change(self, change):
+        if not change["written"]:
+            self.unchanged += 1
+            return
+        if len(self.changes) == self.changes.maxlen:
+            self.dropped_changes += 1
+        self.changes.append(change)
+
+    def record_weights(self, deformer, index, weights, written):
+        """
+        :param deformer: string, name of the deformer
+        :param index: int, index of the blendshape target
+        :param weights: SparseWeights, weights now on the deformer
+        :param written: int, number of vertices written
+        """
+        self._watch(deformer)
+        self.weights[(deformer, index)] = (
+            content_hash(weights.indices, weights.values), weights
+        )
+        self._record_change({
+            "node": deformer, 
+            "kind": "weights", 
+            "index": index, 
+            "vertices": written, 
+            "written": written > 0,
+        })
+
+    def deltas_changed(self, blendshape, index, item, digest):
+        """
+        Compares target deltas with the snapshot, or with the scene when 
+            there is no snapshot
+        :param blendshape: string, name of the blendshape
+        :param index: int, logical index of the target
+        :param item: int, inputTargetItem index
+        :param digest: string, content_hash of the stored indices and deltas
+        :return bool: True if the deltas differ
+        """
+        previous = self.deltas.get((blendshape, index, item))
+        if previous is None:
+            indices, points = self.scene.get_target_points(blendshape, index, item=item)
+            previous = content_hash(
+                np.asarray(indices, dtype=np.int64), 
+                np.asarray(points, dtype=np.float64).reshape(-1, 3),
+            )
+        return previous != digest
+
+    def record_deltas(self, blendshape, index, item, digest, vertices, written):
+        """
+        :param blendshape: string, name of the blendshape
+        :param index: int, logical index of the target
+        :param item: int, inputTargetItem index
+        :param digest: string, content_hash of the stored indices and deltas
+        :param vertices: int, number of vertices the target moves
+        :param written: bool, False when the deltas didn't change
+        """
+        self._watch(blendshape)
+        self.deltas[(blendshape, index, item)] = digest
+        self._record_change({
+            "node": blendshape, 
+            "kind": "deltas", 
+            "index": index, 
+            "vertices": vertices, 
+            "written": written,
+        })
+
+    def report(self, clear=True):
+        """
+        Lists what the writes since the last report changed
+        :param clear: bool, starts the next report from now
+        :return dictionary: the latest 'changed' records with the node, 
+            kind, index and vertex count, the number of older changed 
+            records 'dropped' and the number of 'unchanged' writes
+        """
+        report = {
+            "changed": list(self.changes),
+            "dropped": self.dropped_changes,
+            "unchanged": self.unchanged,
+        }
+        if clear:
+            self.changes.clear()
+            self.dropped_changes = 0
+            self.unchanged = 0
+        return report
+
+
+class OperationCancelled(Exception):
+    """
+    Raised when the user cancels a chunked operation
+    """
+
+
+def run_chunked(scene, task, title=None, chunk_size=1, target_seconds=0.1):
+    """
+    Runs a chunked task, adapting the chunk size so each chunk takes about
+        target_seconds, and reporting progress between chunks.
+        A task is a generator that first yields its number of items, then
+        is sent a chunk size and yields how many items it processed,
+        until it returns its result
+    :param scene: SceneAccess, scene the task runs in
+    :param task: generator, the chunked task
+    :param title: string, title of the progress, the task runs in one
+        chunk without progress when not given
+    :param chunk_size: int, size of the first chunk
+    :param target_seconds: float, time each chunk should take
+    :return: result of the task
+    """
+    total = next(task)
+    if title is None:
+        try:
+            while True:
+                task.send(max(total, 1))
+        except StopIteration as stop:
+            return stop.value
+    scene.progress_start(title, total)
+    done = 0
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                done += task.send(chunk_size)
+            except StopIteration as stop:
+                return stop.value
+            elapsed = time.perf_counter() - start
+            # Grows or shrinks the chunk towards the target latency
+            scale = target_seconds / elapsed if elapsed > 0 else 2.0
+            chunk_size = max(1, int(chunk_size * min(max(scale, 0.5), 2.0)))
+            if scene.progress_update(done, total):
+                task.close()
+                raise OperationCancelled(f"'{title}' was cancelled")
+    finally:
+        scene.progress_end()
+
+
+def get_sparse_deformer_weights(
+    scene, deformer, vertex_count, index=0, node_type=None, default=DEFAULT_WEIGHT
+):
+    """
+    Reads the weights a deformer actually stores
+    :param scene: SceneAccess, scene the deformer is in
+    :param deformer: string, name of the deformer
+    :param vertex_count: int, number of vertices on the deformed mesh
+    :param index: int, index of the blendshape target
+    :param node_type: string, type of the deformer, queried when not given
+    :param default: float, weight of the vertices the deformer doesn't store
+    :return SparseWeights: the non default weights of the deformer
+    """
+    stored_indices, values = scene.get_stored_weights(
+        deformer, index, vertex_count, node_type=node_type
+    )
+    # Drops stored weights that are equal to the default
+    keep = np.abs(values - default) > 1e-6
+    return SparseWeights(
+        vertex_count, stored_indices[keep], values[keep], default=default
+    )
+
+
+def set_sparse_deformer_weights(
+    scene, deformer, weights, index=0, node_type=None, previous=None, max_gap=16
+):
+    """
+    Writes a sparse weight map, only touching the vertices whose weight 
+        changed from the previous map
+    :param scene: SceneAccess, scene the deformer is in
+    :param deformer: string, name of the deformer
+    :param weights: SparseWeights, new weights of the deformer
+    :param index: int, index of the blendshape target
+    :param node_type: string, type of the deformer, queried when not given
+    :param previous: SparseWeights, weights currently on the deformer, 
+        the weights last written by the tool or read from the scene when 
+        not given
+    :param max_gap: int, runs of vertices separated by this many default
+        vertices or less are written with one command
+    """
+    run_chunked(
+        scene,
+        set_sparse_deformer_weights_task(
+            scene,
+            deformer,
+            weights,
+            index=index,
+            node_type=node_type,
+            previous=previous,
+            max_gap=max_gap,
+        ),
+    )
+
+
+def set_sparse_deformer_weights_task(
+    scene, deformer, weights, index=0, node_type=None, previous=None, max_gap=16
+):
+    """
+    Chunked task of set_sparse_deformer_weights, see run_chunked.
+        Chunks are counted in written vertices
+    """
+    if node_type is None:
+        node_type = scene.node_type(deformer)
+    snapshots = scene.sync_snapshots()
+    if previous is None:
+        # The weights last written stand in for reading the scene
+        previous = snapshots.previous_weights(deformer, index)
+    if (
+        previous is None 
+        or previous.size != weights.size 
+        or previous.default != weights.default
+    ):
+        previous = get_sparse_deformer_weights(
+            scene,
+            deformer,
+            weights.size,
+            index=index,
+            node_type=node_type,
+            default=weights.default,
+        )
+    # Only the vertices whose weight changed are written
+    dense_weights = weights.to_dense()
+    write_indices = np.flatnonzero(
+        np.abs(dense_weights - previous.to_dense()) > 1e-6
+    )
+    chunk_size = yield len(write_indices)
+    position = 0
+    while position < len(write_indices):
+        chunk_indices = write_indices[position:position + chunk_size]
+        with snapshots.own_write():
+            for first, last in contiguous_runs(chunk_indices, max_gap=max_gap):
+                scene.set_weight_range(
+                    deformer, index, first, dense_weights[first:last + 1], node_type=node_type
+                )
+        position += len(chunk_indices)
+        chunk_size = yield len(chunk_indices)
+    snapshots.record_weights(deformer, index, weights, len(write_indices))
+
+
+def get_deformer_weights(scene, deformer, vertex_count, index=0, node_type=None):
+    """
+    Reads all the vertex weights of a deformer
+    :param scene: SceneAccess, scene the deformer is in
+    :param deformer: string, name of the deformer
+    :param vertex_count: int, number of vertices on the deformed mesh
+    :param index: int, index of the blendshape target
+    :param node_type: string, type of the deformer, queried when not given
+    :return numpy.ndarray: float array with one weight per vertex
+    """
+    return get_sparse_deformer_weights(
+        scene, deformer, vertex_count, index=index, node_type=node_type
+    ).to_dense()
+
+
+def parse_weight_source(token):
+    """
+    Parses a weight map reference such as 'blendShape1[3]' or 'cluster1'
+    :param token: string, deformer name with an optional target index
+    :return tuple: (deformer name, target index)
+    """
+    if token.endswith("]") and "[" in token:
+        deformer, index = token[:-1].split("[", 1)
+        return deformer, int(index)
+    return token, 0
+
+
+def parse_weight_expression(expression):
+    """
+    Parses a chain of weight operations, e.g.
+        'inverse; multiply cluster1; clamp 0 1'
+    :param expression: string, operations separated by ';', each followed
+        by its operands separated by spaces
+    :return list: (operation, operands) tuples, operands are floats or
+        (deformer, index) weight map references
+    """
+    steps = []
+    for step in expression.split(";"):
+        tokens = step.split()
+        if not tokens:
+            continue
+        operation = tokens[0].lower()
+        if operation not in WEIGHT_OPERATIONS:
+            raise ValueError(f"Unknown weight operation '{tokens[0]}'")
+        operands = []
+        for token in tokens[1:]:
+            try:
+                operands.append(float(token))
+            except ValueError:
+                operands.append(parse_weight_source(token))
+        steps.append((operation, tuple(operands)))
+    return steps
+
+
+def weight_step_sources(steps):
+    """
+    Lists the weight maps referenced as operands by a chain of operations
+    :param steps: list, (operation, operands) tuples
+    :return list: unique (deformer, index) weight map references
+    """
+    sources = []
+    for operation, operands in steps:
+        for operand in operands:
+            if isinstance(operand, tuple) and operand not in sources:
+                sources.append(operand)
+    return sources
+
+
+def read_weight_sources(scene, mesh, sources):
+    """
+    Reads several weight maps, each one only once
+    :param scene: SceneAccess, scene the deformers are in
+    :param mesh: string, geometry deformed by the deformers
+    :param sources: list, (deformer, index) weight map references
+    :return dictionary: weight arrays keyed by their weight map reference
+    """
+    vertex_count = scene.vertex_count(mesh)
+    node_types = {}
+    source_weights = {}
+    for deformer, index in sources:
+        if (deformer, index) in source_weights:
+            continue
+        if not scene.exists(deformer):
+            scene.error(f"Deformer '{deformer}' does not exist")
+        # Resolves each deformer's node type once
+        if deformer not in node_types:
+            node_types[deformer] = scene.node_type(deformer)
+        source_weights[(deformer, index)] = get_deformer_weights(
+            scene,
+            deformer,
+            vertex_count,
+            index=index,
+            node_type=node_types[deformer],
+        )
+    return source_weights
+
+
+def evaluate_weight_steps(weights, steps, source_weights):
+    """
+    Evaluates a chain of weight operations in memory
+    :param weights: numpy.ndarray, weights the chain starts from
+    :param steps: list, (operation, operands) tuples
+    :param source_weights: dictionary, weight arrays keyed by the weight
+        map references used as operands
+    :return numpy.ndarray: resulting weights
+    """
+    for operation, operands in steps:
+        values = [
+            source_weights[operand] if isinstance(operand, tuple) else operand
+            for operand in operands
+        ]
+        try:
+            weights = WEIGHT_OPERATIONS[operation](weights, *values)
+        except TypeError:
+            raise ValueError(f"Wrong number of operands for '{operation}'")
+    return weights
+
+
+def transfer_deformer_weights(
+    scene,
+    mesh,
+    source,
+    source_index,
+    target,
+    target_index,
+    method="Copy Weights",
+    steps=None,
+    progress=False,
+    target_mesh=None,
+):
+    """
+    Builds a weight map from one or more source maps and writes it onto
+        a target map, with one read per source and a single write. The
+        target map can be on another mesh of any topology
+    :param scene: SceneAccess, scene the deformers are in
+    :param mesh: string, geometry deformed by all the deformers
+    :param source: string, name of the deformer the chain starts from
+    :param source_index: int, source blendshape target index
+    :param target: string, name of the target deformer
+    :param target_index: int, target blendshape target index
+    :param method: string, key of WEIGHT_METHODS used to build the new weights
+    :param steps: list, (operation, operands) tuples used instead of the method
+    :param progress: bool, writes the weights in cancellable chunks while
+        showing the progress
+    :param target_mesh: string, geometry deformed by the target deformer,
+        the new weights are mapped onto it by closest point when it's
+        not the source geometry
+    :return SparseWeights: new target weights, without the default vertices
+    """
+    if steps is None:
+        if method not in WEIGHT_METHODS:
+            scene.error(f"Unknown weight method '{method}'")
+        steps = WEIGHT_METHODS[method]
+    # Reads every weight map the chain needs up front
+    source_weights = read_weight_sources(
+        scene, mesh, [(source, source_index)] + weight_step_sources(steps)
+    )
+    new_weights = evaluate_weight_steps(
+        source_weights[(source, source_index)], steps, source_weights
+    )
+    if target_mesh is not None and target_mesh != mesh:
+        new_weights = map_values(
+            new_weights, mesh_correspondence(scene, mesh, target_mesh)
+        )
+    # Only writes the vertices that are, or were, different from the default
+    sparse_weights = SparseWeights.from_dense(new_weights)
+    run_chunked(
+        scene,
+        set_sparse_deformer_weights_task(
+            scene, target, sparse_weights, index=target_index
+        ),
+        title="Transferring weights" if progress else None,
+        chunk_size=10000,
+    )
+    return sparse_weights
+
+
+def mesh_topology_hash(scene, mesh):
+    """
+    Hashes the topology of a mesh in the scene
+    :param scene: SceneAccess, scene the mesh is in
+    :param mesh: string, name of the mesh
+    :return string: hexadecimal digest of the topology
+    """
+    return hash_topology(*scene.topology(mesh))
+
+
+def get_target_deltas(
+    scene, blendshape, index, vertex_count, item=FULL_WEIGHT_ITEM
+):
+    """
+    Reads a target's stored point deltas straight from the blendshape
+    :param scene: SceneAccess, scene the blendshape is in
+    :param blendshape: string, name of the blendshape
+    :param index: int, logical index of the target
+    :param vertex_count: int, number of vertices on the deformed mesh
+    :param item: int, inputTargetItem index, 6000 is the full weight shape
+    :return numpy.ndarray: (vertex_count, 3) float32 deltas
+    """
+    deltas = np.zeros((vertex_count, 3), dtype=np.float32)
+    indices, points = scene.get_target_points(blendshape, index, item=item)
+    deltas[indices] = points
+    return deltas
+
+
+def set_target_deltas(
+    scene, blendshape, index, deltas, item=FULL_WEIGHT_ITEM, tolerance=1e-6
+):
+    """
+    Writes a target's point deltas straight into the blendshape, only
+        storing the vertices that move. Targets whose deltas didn't change 
+        are not written
+    :param scene: SceneAccess, scene the blendshape is in
+    :param blendshape: string, name of the blendshape
+    :param index: int, logical index of the target
+    :param deltas: numpy.ndarray, (vertex_count, 3) deltas
+    :param item: int, inputTargetItem index, 6000 is the full weight shape
+    :param tolerance: float, deltas shorter than this are not stored
+    :return bool: True if the target was written
+    """
+    deltas = np.asarray(deltas, dtype=np.float64)
+    indices = np.flatnonzero(np.abs(deltas).max(axis=1) > tolerance)
+    snapshots = scene.sync_snapshots()
+    digest = content_hash(indices.astype(np.int64), deltas[indices])
+    if not snapshots.deltas_changed(blendshape, index, item, digest):
+        snapshots.record_deltas(blendshape, index, item, digest, len(indices), False)
+        return False
+    with snapshots.own_write():
+        scene.set_target_points(blendshape, index, indices, deltas[indices], item=item)
+    snapshots.record_deltas(blendshape, index, item, digest, len(indices), True)
+    return True
+
+
+class TargetLibrary:
+    """
+    Binary file of weight maps and target deltas for one mesh topology.
+    The file is a fixed header, a json table of contents and raw float32 
+        arrays, which are memory mapped so only the records that are 
+        accessed get read from disk. A target's in-betweens are stacked in 
+        one record, with their inputTargetItem indices in its entry.
+    Records can be encoded as the indices of the vertices that differ 
+        from the default and their values, quantized to 16 bits with a 
+        scale per record when that stays within a tolerance, in an 
+        optionally compressed block that is only decoded when the record 
+        is accessed
+    """
+    magic = b"BSTL"
+    # Version 2 adds encoded records, files without any are still written 
+    # as version 1
+    version = 2
+    # Magic, version, vertex count, topology hash, table of contents size
+    header_format = "<4sII16sQ"
+    alignment = 64
+
+    def __init__(self, path):
+        """
+        Opens a library, only reading its header and table of contents
+        :param path: string, path of the library file
+        """
+        self.path = path
+        with open(path, "rb") as library_file:
+            header = library_file.read(struct.calcsize(self.header_format))
+            magic, version, vertex_count, topology_hash, contents_size = (
+                struct.unpack(self.header_format, header)
+            )
+            if magic != self.magic:
+                raise ValueError(f"'{path}' is not a target library")
+            if version > self.version:
+                raise ValueError(
+                    f"'{path}' was written by a newer version ({version})"
+                )
+            self.records = json.loads(library_file.read(contents_size))
+        self.vertex_count = vertex_count
+        self.topology_hash = topology_hash.hex()
+        # Arrays start right after the padded table of contents
+        self.data_start = struct.calcsize(self.header_format) + contents_size
+        self._data = np.memmap(path, dtype=np.uint8, mode="r")
+
+    @staticmethod
+    def compress(data, compression):
+        """
+        :param data: bytes, block to compress
+        :param compression: string, 'zlib', 'lz4' or None
+        :return bytes: compressed block
+        """
+        if compression == "zlib":
+            return zlib.compress(data, 6)
+        if compression == "lz4":
+            if lz4 is None:
+                raise ValueError("lz4 compression needs the lz4 package")
+            return lz4.frame.compress(data)
+        if compression is not None:
+            raise ValueError(f"Unknown compression '{compression}'")
+        return data
+
+    @staticmethod
+    def decompress(data, compression):
+        """
+        :param data: bytes, compressed block
+        :param compression: string, 'zlib', 'lz4' or None
+        :return bytes: decompressed block
+        """
+        if compression == "zlib":
+            return zlib.decompress(data)
+        if compression == "lz4":
+            if lz4 is None:
+                raise ValueError("Reading this library needs the lz4 package")
+            return lz4.frame.decompress(data)
+        return data
+
+    @classmethod
+    def encode(cls, array, compression=None, tolerance=None, default=0.0):
+        """
+        Encodes a weight map or deltas as the vertices that differ from 
+            the default and their offsets from it
+        :param array: numpy.ndarray, (vertex_count,) weights or 
+            (..., vertex_count, 3) deltas
+        :param compression: string, 'zlib', 'lz4' or None
+        :param tolerance: float, largest error allowed on any value. Values 
+            are quantized to 16 bits and vertices closer than it to the 
+            default are dropped when given, the values are kept as float32 
+            when the quantization error goes over it
+        :param default: float, value of the vertices that aren't stored
+        :return tuple: encoded block and its table of contents entry
+        """
+        array = np.asarray(array, dtype=np.float32)
+        if array.ndim == 1:
+            array = array[:, None]
+        offsets = array - np.float32(default)
+        # Largest offset of each vertex over every stacked shape
+        movement = np.abs(offsets).reshape(-1, *array.shape[-2:]).max(axis=(0, 2))
+        indices = np.flatnonzero(movement > (tolerance or 0.0)).astype(np.uint32)
+        values = offsets[..., indices, :]
+        encoding = {
+            "compression": compression, 
+            "count": len(indices), 
+            "default": default, 
+            "scale": None,
+        }
+        if tolerance is not None and values.size:
+            scale = max(float(np.abs(values).max()) / 32767.0, 1e-12)
+            quantized = np.round(values / scale).astype(np.int16)
+            # Error of the dropped vertices and of the quantization
+            error = max(
+                float(movement.max(initial=0.0, where=movement <= tolerance)), 
+                float(np.abs(quantized * np.float32(scale) - values).max()),
+            )
+            if error <= tolerance:
+                values = quantized
+                encoding.update(scale=scale, error=error)
+        block = cls.compress(indices.tobytes() + values.tobytes(), compression)
+        encoding["size"] = len(block)
+        return block, encoding
+
+    @classmethod
+    def write(
+        cls, path, vertex_count, topology_hash, records, compression=None, tolerance=None
+    ):
+        """
+        Writes weight maps and target deltas to a library file
+        :param path: string, path of the library file
+        :param vertex_count: int, number of vertices of the mesh
+        :param topology_hash: string, hash of the mesh's topology
+        :param records: iterable, (name, kind, array) tuples where kind is 
+            'weights', 'deltas' or 'inbetweens', optionally followed by a 
+            dictionary stored in the record's table of contents entry. 
+            Each record is written as soon as it comes, so a generator 
+            only keeps one record in memory
+        :param compression: string, 'zlib' or 'lz4' compresses the records
+        :param tolerance: float, quantizes the records within this error, 
+            see encode
+        :return TargetLibrary: the written library
+        """
+        encoded = compression is not None or tolerance is not None
+        contents = []
+        offset = 0
+        # The table of contents goes first, so the blocks wait in a scratch 
+        # file next to the library until every record is written
+        with tempfile.TemporaryFile(
+            dir=os.path.dirname(os.path.abspath(path))
+        ) as blocks_file:
+            for name, kind, array, *metadata in records:
+                array = np.ascontiguousarray(array, dtype=np.float32)
+                contents.append({
+                    "name": name, 
+                    "kind": kind, 
+                    "offset": offset, 
+                    "shape": list(array.shape),
+                })
+                contents[-1].update(*metadata)
+                if encoded:
+                    data, contents[-1]["encoding"] = cls.encode(
+                        array, 
+                        compression=compression, 
+                        tolerance=tolerance, 
+                        default=DEFAULT_WEIGHT if kind == "weights" else 0.0,
+                    )
+                else:
+                    data = array.tobytes()
+                blocks_file.write(data)
+                blocks_file.write(b"\0" * (-len(data) % cls.alignment))
+                offset += -(-len(data) // cls.alignment) * cls.alignment
+            contents_bytes = json.dumps(contents).encode("utf-8")
+            # Pads the table of contents so the arrays start aligned
+            data_start = struct.calcsize(cls.header_format) + len(contents_bytes)
+            contents_bytes += b" " * (-data_start % cls.alignment)
+            with open(path, "wb") as library_file:
+                library_file.write(struct.pack(
+                    cls.header_format, 
+                    cls.magic, 
+                    cls.version if encoded else 1, 
+                    vertex_count, 
+                    bytes.fromhex(topology_hash), 
+                    len(contents_bytes),
+                ))
+                library_file.write(contents_bytes)
+                blocks_file.seek(0)
+                shutil.copyfileobj(blocks_file, library_file, 1 << 24)
+        return cls(path)
+
+    def names(self, kind=None):
+        """
+        :param kind: string, only lists records of this kind when given
+        :return list: names of the records in the library
+        """
+        return [
+            record["name"] for record in self.records 
+            if kind is None or record["kind"] == kind
+        ]
+
+    def record(self, name, kind):
+        """
+        :param name: string, name of the record
+        :param kind: string, 'weights', 'deltas' or 'inbetweens'
+        :return dictionary: table of contents entry of the record
+        """
+        for record in self.records:
+            if record["name"] == name and record["kind"] == kind:
+                return record
+        raise KeyError(f"No {kind} named '{name}' in '{self.path}'")
+
+    def get(self, name, kind="deltas"):
+        """
+        Gets a record as a memory mapped array, pages are only read 
+            from disk when the values are accessed. Encoded records are 
+            read and decoded now
+        :param name: string, name of the record
+        :param kind: string, 'weights', 'deltas' or 'inbetweens'
+        :return numpy.ndarray: float32 array, read only when memory mapped
+        """
+        record = self.record(name, kind)
+        start = self.data_start + record["offset"]
+        if "encoding" in record:
+            return self.decode(record)
+        size = int(np.prod(record["shape"])) * 4
+        return self._data[start:start + size].view(np.float32).reshape(
+            record["shape"]
+        )
+
+    def decode(self, record):
+        """
+        Decodes an encoded record, see encode
+        :param record: dictionary, table of contents entry of the record
+        :return numpy.ndarray: float32 array
+        """
+        encoding = record["encoding"]
+        start = self.data_start + record["offset"]
+        block = self.decompress(
+            self._data[start:start + encoding["size"]].tobytes(), 
+            encoding["compression"],
+        )
+        count = encoding["count"]
+        indices = np.frombuffer(block, dtype=np.uint32, count=count)
+        shape = record["shape"]
+        # Weight maps are encoded with one value per vertex
+        full_shape = shape if len(shape) > 1 else shape + [1]
+        if encoding["scale"] is None:
+            values = np.frombuffer(block, dtype=np.float32, offset=indices.nbytes)
+        else:
+            values = np.frombuffer(
+                block, dtype=np.int16, offset=indices.nbytes
+            ) * np.float32(encoding["scale"])
+        array = np.full(full_shape, encoding["default"], dtype=np.float32)
+        array[..., indices, :] += values.reshape(
+            full_shape[:-2] + [count, full_shape[-1]]
+        )
+        return array.reshape(shape)
+
+    def matches(self, vertex_count, topology_hash):
+        """
+        :return bool: True if the library was written for this topology
+        """
+        return (self.vertex_count == vertex_count 
+            and self.topology_hash == topology_hash)
+
+
+def bake_target_deltas(scene, blendshape, targets=None):
+    """
+    Bakes targets' full weight shapes to point deltas without duplicating 
+        any geometry, see bake_target_items
+    :param scene: SceneAccess, scene the blendshape is in
+    :param blendshape: string, name of the blendshape
+    :param targets: list, target names to bake, all targets when not given
+    :return dictionary: (vertex_count, 3) float32 deltas keyed by target name
+    """
+    return {
+        target: items[FULL_WEIGHT_ITEM] 
+        for target, items in bake_target_items(
+            scene, blendshape, targets=targets, inbetweens=False
+        ).items()
+    }
+
+
+def bake_target_items(scene, blendshape, targets=None, inbetweens=True):
+    """
+    Bakes targets and their in-betweens to point deltas without 
+        duplicating any geometry. The items of every target are listed in 
+        one pass, stored deltas are read straight from the blendshape and 
+        items that still have geometry connected are evaluated against 
+        the rest points
+    :param scene: SceneAccess, scene the blendshape is in
+    :param blendshape: string, name of the blendshape
+    :param targets: list, target names to bake, all targets when not given
+    :param inbetweens: bool, bakes the in-betweens as well as the full 
+        weight shapes
+    :return dictionary: (vertex_count, 3) float32 deltas keyed by 
+        inputTargetItem index, keyed by target name
+    """
+    vertex_count = scene.vertex_count(scene.blendshape_geometry(blendshape))
+    indices = scene.target_registry(blendshape).indices()
+    if targets is None:
+        targets = list(indices)
+    live_targets = scene.live_targets(blendshape)
+    target_items = scene.target_items(blendshape) if inbetweens else {}
+    rest_points = None
+    baked = {}
+    for target in targets:
+        index = indices[target]
+        baked[target] = {}
+        for item in sorted(set(target_items.get(index, [])) | {FULL_WEIGHT_ITEM}):
+            target_geo = live_targets.get((index, item))
+            if target_geo is None:
+                baked[target][item] = get_target_deltas(
+                    scene, blendshape, index, vertex_count, item=item
+                )
+                continue
+            # Evaluates the rest points once for every live target
+            if rest_points is None:
+                rest_points = scene.rest_points(blendshape)
+            baked[target][item] = (
+                scene.get_points(target_geo) - rest_points
+            ).astype(np.float32)
+    return baked
+
+
+# Targets baked together by baked_target_items, bounding the memory of 
+# dense meshes
+TARGET_BAKE_BATCH_SIZE = 16
+
+
+def baked_target_items(scene, blendshape, targets, batch_size=TARGET_BAKE_BATCH_SIZE):
+    """
+    Bakes targets and their in-betweens a few at a time, so only those 
+        are held in memory, see bake_target_items
+    :param scene: SceneAccess, scene the blendshape is in
+    :param blendshape: string, name of the blendshape
+    :param targets: list, target names to bake
+    :param batch_size: int, number of targets baked together
+    :return generator: (target, items) of every target in order, items 
+        being (vertex_count, 3) float32 deltas keyed by inputTargetItem 
+        index
+    """
+    for position in range(0, len(targets), batch_size):
+        baked_items = bake_target_items(
+            scene, blendshape, targets=targets[position:position + batch_size]
+        )
+        for target in list(baked_items):
+            yield target, baked_items.pop(target)
+
+
+def build_target_geometry(scene, blendshape, deltas, spacing=25):
+    """
+    Creates geometry for baked target deltas, only for the targets given
+    :param scene: SceneAccess, scene the blendshape is in
+    :param blendshape: string, name of the blendshape
+    :param deltas: dictionary, (vertex_count, 3) deltas keyed by target name
+    :param spacing: float, distance between each new geometry along x
+    :return list: new geometry
+    """
+    geo = scene.blendshape_geometry(blendshape)
+    rest_points = scene.rest_points(blendshape)
+    new_shapes = []
+    for index, (target, target_deltas) in enumerate(deltas.items()):
+        new_geo = scene.duplicate(
+            geo, f"{target}_baked", points=rest_points + target_deltas
+        )
+        local_pos = scene.get_translation(new_geo)
+        scene.move(new_geo, [local_pos[0]+(index+1)*spacing, *local_pos[1:3]])
+        new_shapes.append(new_geo)
+    return new_shapes
+
+
+def export_target_library(
+    scene, 
+    path, 
+    blendshape, 
+    targets=None, 
+    deformers=None, 
+    compression=None, 
+    tolerance=None,
+):
+    """
+    Exports a blendshape's target deltas, in-betweens and weight maps to 
+        a library file
+    :param scene: SceneAccess, scene the blendshape is in
+    :param path: string, path of the library file
+    :param blendshape: string, name of the blendshape
+    :param targets: list, target names to export, all targets when not given
+    :param deformers: list, other deformers whose weight maps are exported
+    :param compression: string, 'zlib' or 'lz4' compresses the records
+    :param tolerance: float, quantizes the records within this error
+    :return TargetLibrary: the written library
+    """
+    mesh = scene.blendshape_geometry(blendshape)
+    return TargetLibrary.write(
+        path, 
+        scene.vertex_count(mesh), 
+        mesh_topology_hash(scene, mesh), 
+        target_library_records(scene, blendshape, targets, deformers), 
+        compression=compression, 
+        tolerance=tolerance,
+    )
+
+
+def target_library_records(scene, blendshape, targets=None, deformers=None):
+    """
+    Generates the records of export_target_library, baking a few targets 
+        at a time so only those are held in memory
+    :param scene: SceneAccess, scene the blendshape is in
+    :param blendshape: string, name of the blendshape
+    :param targets: list, target names to export, all targets when not given
+    :param deformers: list, other deformers whose weight maps are exported
+    :return generator: (name, kind, array) records, see TargetLibrary.write
+    """
+    vertex_count = scene.vertex_count(scene.blendshape_geometry(blendshape))
+    indices = scene.target_registry(blendshape).indices()
+    targets = list(indices) if targets is None else list(targets)
+    for target, items in baked_target_items(scene, blendshape, targets):
+        yield target, "deltas", items.pop(FULL_WEIGHT_ITEM)
+        if items:
+            yield (
+                target, 
+                "inbetweens", 
+                np.stack(list(items.values())), 
+                {"items": list(items)},
+            )
+        yield (
+            target, 
+            "weights", 
+            get_deformer_weights(
+                scene, 
+                blendshape, 
+                vertex_count, 
+                index=indices[target], 
+                node_type="blendShape",
+            ),
+        )
+    for deformer in deformers or []:
+        yield deformer, "weights", get_deformer_weights(scene, deformer, vertex_count)
+
+
+def import_target_library(scene, path, blendshape, names=None):
+    """
+    Imports target deltas, in-betweens and weight maps from a library 
+        file, only the requested records are read from disk
+    :param scene: SceneAccess, scene the blendshape is in
+    :param path: string, path of the library file
+    :param blendshape: string, name of the blendshape receiving the targets
+    :param names: list, records to import, everything when not given. 
+        Targets missing from the blendshape are added
+    :return list: names of the imported records
+    """
+    library = TargetLibrary(path)
+    mesh = scene.blendshape_geometry(blendshape)
+    vertex_count = scene.vertex_count(mesh)
+    if not library.matches(vertex_count, mesh_topology_hash(scene, mesh)):
+        scene.error(
+            f"'{path}' was exported from a different topology than '{mesh}'"
+        )
+    registry = scene.target_registry(blendshape)
+    indices = registry.indices()
+    imported = []
+    for name in library.names("deltas"):
+        if names is not None and name not in names:
+            continue
+        if name not in indices:
+            indices[name] = registry.add(name)
+        set_target_deltas(scene, blendshape, indices[name], library.get(name))
+        imported.append(name)
+    for name in library.names("inbetweens"):
+        if name not in imported:
+            continue
+        inbetweens = library.get(name, kind="inbetweens")
+        for item, deltas in zip(library.record(name, "inbetweens")["items"], inbetweens):
+            set_target_deltas(scene, blendshape, indices[name], deltas, item=item)
+    for name in library.names("weights"):
+        if names is not None and name not in names:
+            continue
+        weights = SparseWeights.from_dense(library.get(name, kind="weights"))
+        if name in indices:
+            set_sparse_deformer_weights(
+                scene, 
+                blendshape, 
+                weights, 
+                index=indices[name], 
+                node_type="blendShape",
+            )
+        elif scene.exists(name):
+            set_sparse_deformer_weights(scene, name, weights)
+        else:
+            scene.warning(f"Skipping weights of '{name}', it does not exist")
+            continue
+        if name not in imported:
+            imported.append(name)
+    return imported
+
+
+def triangulate(polygon_counts, polygon_connects):
+    """
+    Splits polygons into fan triangles
+    :param polygon_counts: list, number of vertices of each polygon
+    :param polygon_connects: list, vertex indices of every polygon
+    :return numpy.ndarray: (triangle_count, 3) vertex indices
+    """
+    polygon_counts = np.asarray(polygon_counts, dtype=np.int64)
+    polygon_connects = np.asarray(polygon_connects, dtype=np.int64)
+    polygon_starts = np.concatenate(([0], np.cumsum(polygon_counts)[:-1]))
+    triangle_counts = np.maximum(polygon_counts - 2, 0)
+    # Polygon start and corner of each triangle of the fans
+    starts = np.repeat(polygon_starts, triangle_counts)
+    corners = np.arange(triangle_counts.sum()) - np.repeat(
+        np.cumsum(triangle_counts) - triangle_counts, triangle_counts
+    )
+    return np.column_stack((
+        polygon_connects[starts],
+        polygon_connects[starts + corners + 1],
+        polygon_connects[starts + corners + 2],
+    ))
+
+
+def closest_point_barycentric(points, a, b, c):
+    """
+    Finds the closest point on triangles, for many points at once
+    :param points: numpy.ndarray, (..., 3) points
+    :param a: numpy.ndarray, (..., 3) first corner of each triangle
+    :param b: numpy.ndarray, (..., 3) second corner of each triangle
+    :param c: numpy.ndarray, (..., 3) third corner of each triangle
+    :return numpy.ndarray: (..., 3) barycentric coordinates of the
+        closest points
+    """
+    def dot(x, y):
+        return np.einsum("...i,...i->...", x, y)
+
+    def divide(numerator, denominator):
+        # Degenerate triangles fall back on a corner
+        return numerator / np.where(np.abs(denominator) > 1e-12, denominator, 1.0)
+
+    ab = b - a
+    ac = c - a
+    ap = points - a
+    bp = points - b
+    cp = points - c
+    d1, d2 = dot(ab, ap), dot(ac, ap)
+    d3, d4 = dot(ab, bp), dot(ac, bp)
+    d5, d6 = dot(ab, cp), dot(ac, cp)
+    va = d3 * d6 - d5 * d4
+    vb = d5 * d2 - d1 * d6
+    vc = d1 * d4 - d3 * d2
+    # Regions of the triangle, tested from the last to the first so the
+    # first matching region wins
+    denominator = divide(1.0, va + vb + vc)
+    v = vb * denominator
+    w = vc * denominator
+    coordinates = np.stack((1.0 - v - w, v, w), axis=-1)
+    zeros = np.zeros_like(d1)
+    ones = np.ones_like(d1)
+    edge_bc = divide(d4 - d3, (d4 - d3) + (d5 - d6))
+    edge_ac = divide(d2, d2 - d6)
+    edge_ab = divide(d1, d1 - d3)
+    regions = [
+        (
+            (va <= 0) & (d4 - d3 >= 0) & (d5 - d6 >= 0),
+            (zeros, 1.0 - edge_bc, edge_bc),
+        ),
+        ((vb <= 0) & (d2 >= 0) & (d6 <= 0), (1.0 - edge_ac, zeros, edge_ac)),
+        ((d6 >= 0) & (d5 <= d6), (zeros, zeros, ones)),
+        ((vc <= 0) & (d1 >= 0) & (d3 <= 0), (1.0 - edge_ab, edge_ab, zeros)),
+        ((d3 >= 0) & (d4 <= d3), (zeros, ones, zeros)),
+        ((d1 <= 0) & (d2 <= 0), (ones, zeros, zeros)),
+    ]
+    for mask, region in regions:
+        coordinates = np.where(mask[..., None], np.stack(region, axis=-1), coordinates)
+    return coordinates
+
+
+class UniformGrid:
+    """
+    Spatial index bucketing points into cubic cells, answering nearest
+        point queries for many points at once
+    """
+    def __init__(self, points, points_per_cell=2.0):
+        """
+        :param points: numpy.ndarray, (point_count, 3) indexed points
+        :param points_per_cell: float, average number of points per cell
+            of a surface the cell size is chosen for
+        """
+        self.points = np.asarray(points, dtype=np.float64)
+        self.coarse_grid = None
+        self.cell_bounds = None
+        self.origin = self.points.min(axis=0)
+        extent = np.maximum(self.points.max(axis=0) - self.origin, 1e-9)
+        # Surface points, so the cell count grows with the area
+        area = 2.0 * (extent[0] * extent[1] + extent[1] * extent[2]
+            + extent[0] * extent[2])
+        self.cell_size = max(
+            np.sqrt(area * points_per_cell / max(len(self.points), 1)), 1e-9
+        )
+        self.shape = (extent // self.cell_size).astype(np.int64) + 1
+        keys = self.cell_keys(self.cell_coordinates(self.points))
+        self.order = np.argsort(keys, kind="stable")
+        self.sorted_keys = keys[self.order]
+
+    def cell_coordinates(self, points):
+        """
+        :param points: numpy.ndarray, (count, 3) points
+        :return numpy.ndarray: (count, 3) integer cell coordinates
+        """
+        return np.floor((points - self.origin) / self.cell_size).astype(np.int64)
+
+    def cell_keys(self, coordinates):
+        """
+        :param coordinates: numpy.ndarray, (count, 3) cell coordinates
+        :return numpy.ndarray: linear key of each cell, -1 outside the grid
+        """
+        inside = np.all((coordinates >= 0) & (coordinates < self.shape), axis=1)
+        keys = (coordinates[:, 0] * self.shape[1] + coordinates[:, 1]) * self.shape[2] + coordinates[:, 2]
+        return np.where(inside, keys, -1)
+
+    def closest_in_keys(self, queries, owners, keys):
+        """
+        Finds the closest indexed point of every query among the points of 
+            the cells paired with it
+        :param queries: numpy.ndarray, (count, 3) query points
+        :param owners: numpy.ndarray, sorted query index of every pair
+        :param keys: numpy.ndarray, cell key of every pair, -1 for none
+        :return tuple: index of the closest point, -1 when the cells are 
+            empty, and its distance
+        """
+        firsts = np.searchsorted(self.sorted_keys, keys, side="left")
+        lasts = np.searchsorted(self.sorted_keys, keys, side="right")
+        lasts[keys < 0] = firsts[keys < 0]
+        counts = lasts - firsts
+        point_owners = np.repeat(owners, counts)
+        positions = np.arange(counts.sum()) - np.repeat(
+            np.cumsum(counts) - counts, counts
+        )
+        candidates = self.order[np.repeat(firsts, counts) + positions]
+        differences = self.points[candidates] - queries[point_owners]
+        candidate_distances = np.einsum("ij,ij->i", differences, differences)
+        # Closest candidate of each query, the candidates are grouped by query
+        nearest = np.full(len(queries), -1, dtype=np.int64)
+        distances = np.full(len(queries), np.inf)
+        query_counts = np.bincount(point_owners, minlength=len(queries))
+        found = np.flatnonzero(query_counts)
+        if len(found):
+            distances[found] = np.minimum.reduceat(
+                candidate_distances, (np.cumsum(query_counts) - query_counts)[found]
+            )
+            best = np.flatnonzero(candidate_distances == distances[point_owners])
+            nearest[point_owners[best]] = candidates[best]
+        return nearest, np.sqrt(distances)
+
+    def closest_in_cells(self, queries, offsets):
+        """
+        Finds the closest indexed point of every query among the cells at
+            the given offsets from the query's cell
+        :param queries: numpy.ndarray, (count, 3) query points
+        :param offsets: numpy.ndarray, (offset_count, 3) cell offsets
+        :return tuple: index of the closest point, -1 when the cells are 
+            empty, and its distance
+        """
+        keys = self.cell_keys(
+            (self.cell_coordinates(queries)[:, None, :] + offsets).reshape(-1, 3)
+        )
+        owners = np.repeat(np.arange(len(queries)), len(offsets))
+        return self.closest_in_keys(queries, owners, keys)
+
+    def closest_in_bounds(self, queries, block_size=1 << 18):
+        """
+        Finds the closest indexed point of queries anywhere in space, only
+            measuring the points of cells whose bounding box is no further 
+            than the closest cell's first point
+        :param queries: numpy.ndarray, (count, 3) query points
+        :param block_size: int, query and cell pairs bounded per block
+        :return tuple: index of the closest point and its distance
+        """
+        if self.cell_bounds is None:
+            starts = np.flatnonzero(
+                np.diff(self.sorted_keys, prepend=self.sorted_keys[0] - 1)
+            )
+            cell_points = self.points[self.order]
+            self.cell_bounds = (
+                self.sorted_keys[starts], 
+                np.minimum.reduceat(cell_points, starts), 
+                np.maximum.reduceat(cell_points, starts), 
+                cell_points[starts],
+            )
+        keys, lows, highs, firsts = self.cell_bounds
+        nearest = np.empty(len(queries), dtype=np.int64)
+        distances = np.empty(len(queries), dtype=np.float64)
+        step = max(block_size // len(keys), 1)
+        for start in range(0, len(queries), step):
+            block = queries[start:start + step, None, :]
+            lower = np.linalg.norm(
+                np.maximum(np.maximum(lows - block, block - highs), 0.0), axis=2
+            )
+            upper = np.linalg.norm(firsts - block, axis=2).min(axis=1)
+            owners, cells = np.nonzero(lower <= upper[:, None])
+            nearest[start:start + step], distances[start:start + step] = (
+                self.closest_in_keys(block[:, 0], owners, keys[cells])
+            )
+        return nearest, distances
+
+    def coarse(self):
+        """
+        :return UniformGrid: grid of the same points with about the square
+            root of the point count in each cell, built on first use
+        """
+        if self.coarse_grid is None:
+            self.coarse_grid = UniformGrid(
+                self.points, points_per_cell=max(np.sqrt(len(self.points)), 1.0)
+            )
+        return self.coarse_grid
+
+    def nearest(self, queries, max_distance=None, batch_size=65536):
+        """
+        Finds the closest indexed point of every query among the 27 cells
+            around it. Queries whose closest point could be further than 
+            a cell are resolved on a coarse grid, see closest_in_bounds
+        :param queries: numpy.ndarray, (count, 3) query points
+        :param max_distance: float, queries without a point this close 
+            get -1 and an infinite distance
+        :param batch_size: int, queries handled per vectorized batch
+        :return tuple: index of the closest point and its distance
+        """
+        queries = np.asarray(queries, dtype=np.float64)
+        nearest = np.full(len(queries), -1, dtype=np.int64)
+        distances = np.full(len(queries), np.inf)
+        offsets = np.stack(np.meshgrid(*[[-1, 0, 1]] * 3, indexing="ij"), -1)
+        offsets = offsets.reshape(-1, 3)
+        # Every point is at least as far as the grid's bounding box
+        box_distances = np.linalg.norm(
+            np.maximum(
+                np.maximum(self.origin - queries, queries - self.points.max(axis=0)), 
+                0.0,
+            ), 
+            axis=1,
+        )
+        near = np.flatnonzero(box_distances <= self.cell_size)
+        for start in range(0, len(near), batch_size):
+            batch = near[start:start + batch_size]
+            nearest[batch], distances[batch] = self.closest_in_cells(
+                queries[batch], offsets
+            )
+        # Points outside the 27 cells are at least a cell away
+        searched = np.maximum(box_distances, self.cell_size)
+        unsure = np.flatnonzero(distances > searched)
+        if max_distance is not None:
+            unsure = unsure[searched[unsure] < max_distance]
+        if len(unsure):
+            nearest[unsure], distances[unsure] = self.coarse().closest_in_bounds(
+                queries[unsure]
+            )
+        if max_distance is not None:
+            missing = distances > max_distance
+            nearest[missing] = -1
+            distances[missing] = np.inf
+        return nearest, distances
+
+
+class SurfaceIndex:
+    """
+    Closest point queries against a mesh surface, a uniform grid finds
+        the closest vertex then the triangles around it are projected on
+    """
+    def __init__(self, points, polygon_counts, polygon_connects):
+        """
+        :param points: numpy.ndarray, (vertex_count, 3) points of the mesh
+        :param polygon_counts: list, number of vertices of each polygon
+        :param polygon_connects: list, vertex indices of every polygon
+        """
+        self.points = np.asarray(points, dtype=np.float64)
+        self.triangles = triangulate(polygon_counts, polygon_connects)
+        self.grid = UniformGrid(self.points)
+        # Triangles around each vertex, padded with -1
+        corners = self.triangles.ravel()
+        order = np.argsort(corners, kind="stable")
+        counts = np.bincount(corners, minlength=len(self.points))
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        columns = np.arange(len(corners)) - np.repeat(starts, counts)
+        self.vertex_triangles = np.full(
+            (len(self.points), max(counts.max(initial=0), 1)), -1, dtype=np.int64
+        )
+        self.vertex_triangles[corners[order], columns] = order // 3
+
+    def closest_points(self, queries):
+        """
+        Maps points onto the surface
+        :param queries: numpy.ndarray, (count, 3) query points
+        :return tuple: (count, 3) vertex indices of the triangle holding
+            each closest point and (count, 3) barycentric weights
+        """
+        queries = np.asarray(queries, dtype=np.float64)
+        nearest, _ = self.grid.nearest(queries)
+        candidate_triangles = self.vertex_triangles[nearest]
+        valid = candidate_triangles >= 0
+        corners = self.triangles[np.where(valid, candidate_triangles, 0)]
+        coordinates = closest_point_barycentric(
+            queries[:, None, :],
+            self.points[corners[..., 0]],
+            self.points[corners[..., 1]],
+            self.points[corners[..., 2]],
+        )
+        closest = np.einsum("mkc,mkci->mki", coordinates, self.points[corners])
+        distances = np.where(
+            valid, np.linalg.norm(closest - queries[:, None, :], axis=2), np.inf
+        )
+        best = np.argmin(distances, axis=1)
+        rows = np.arange(len(queries))
+        vertices = corners[rows, best]
+        weights = coordinates[rows, best]
+        # Vertices without any triangle take the closest vertex as it is
+        lonely = ~valid[rows, best]
+        vertices[lonely] = nearest[lonely, None]
+        weights[lonely] = (1.0, 0.0, 0.0)
+        return vertices, weights
+
+
+def points_hash(points):
+    """
+    :param points: numpy.ndarray, (count, 3) points
+    :return string: hexadecimal digest of the points
+    """
+    return hashlib.blake2b(
+        np.ascontiguousarray(points, dtype=np.float64).tobytes(), digest_size=16
+    ).hexdigest()
+
+
+def mesh_correspondence(scene, source_mesh, target_mesh):
+    """
+    Maps every vertex of a target mesh onto the surface of a source mesh
+        of any topology, in their undeformed object space. The source's
+        index and the mapping are cached on the scene until the topology 
+        or points change
+    :param scene: SceneAccess, scene the meshes are in
+    :param source_mesh: string, mesh the values come from
+    :param target_mesh: string, mesh the values go to
+    :return tuple: (target_vertex_count, 3) source vertex indices and
+        (target_vertex_count, 3) barycentric weights
+    """
+    source_points = scene.original_points(source_mesh)
+    target_points = scene.original_points(target_mesh)
+    source_topology = scene.topology(source_mesh)
+    source_key = (
+        source_mesh, hash_topology(*source_topology), points_hash(source_points)
+    )
+    key = source_key + (
+        target_mesh, 
+        mesh_topology_hash(scene, target_mesh), 
+        points_hash(target_points),
+    )
+
+    def build():
+        surface_index = scene.cached(
+            "surface_index", 
+            source_key, 
+            lambda: SurfaceIndex(source_points, *source_topology),
+        )
+        return surface_index.closest_points(target_points)
+
+    return scene.cached("correspondence", key, build)
+
+
+def map_values(values, correspondence):
+    """
+    Interpolates per vertex values through a correspondence
+    :param values: numpy.ndarray, (source_vertex_count, ...) values
+    :param correspondence: tuple, vertex indices and barycentric weights
+    :return numpy.ndarray: (target_vertex_count, ...) values
+    """
+    vertices, weights = correspondence
+    values = np.asarray(values)
+    return np.einsum("mc,mc...->m...", weights, values[vertices]).astype(
+        values.dtype
+    )
+
+
+def transfer_targets_across_meshes(
+    scene, source_blendshape, target_blendshape, targets=None
+):
+    """
+    Transfers target deltas, in-betweens and weight masks between 
+        blendshapes on meshes of different topologies, every target 
+        reusing one correspondence. Targets missing from the target 
+        blendshape are added
+    :param scene: SceneAccess, scene the blendshapes are in
+    :param source_blendshape: string, blendshape the targets come from
+    :param target_blendshape: string, blendshape the targets go to
+    :param targets: list, target names to transfer, all targets when not given
+    :return list: names of the transferred targets
+    """
+    source_mesh = scene.blendshape_geometry(source_blendshape)
+    target_mesh = scene.blendshape_geometry(target_blendshape)
+    correspondence = mesh_correspondence(scene, source_mesh, target_mesh)
+    source_indices = scene.target_registry(source_blendshape).indices()
+    targets = list(source_indices) if targets is None else list(targets)
+    source_vertex_count = scene.vertex_count(source_mesh)
+    registry = scene.target_registry(target_blendshape)
+    for target, items in baked_target_items(scene, source_blendshape, targets):
+        index = registry.index(target)
+        if index is None:
+            index = registry.add(target)
+        for item, deltas in items.items():
+            set_target_deltas(
+                scene,
+                target_blendshape,
+                index,
+                map_values(deltas, correspondence),
+                item=item,
+            )
+        weights = get_deformer_weights(
+            scene,
+            source_blendshape,
+            source_vertex_count,
+            index=source_indices[target],
+            node_type="blendShape",
+        )
+        set_sparse_deformer_weights(
+            scene,
+            target_blendshape,
+            SparseWeights.from_dense(map_values(weights, correspondence)),
+            index=index,
+            node_type="blendShape",
+        )
+    return targets
+
+
+# Axis index of each mirror plane's normal
+SYMMETRY_AXES = {"x": 0, "y": 1, "z": 2}
+
+def symmetry_map(scene, mesh, axis="x", tolerance=1e-3):
+    """
+    Pairs every vertex of a mesh with the vertex on the other side of the
+        mirror plane, in undeformed object space. The map is cached on the
+        scene until the mesh's topology or points change
+    :param scene: SceneAccess, scene the mesh is in
+    :param mesh: string, name of the mesh
+    :param axis: string, 'x', 'y' or 'z', normal of the mirror plane
+    :param tolerance: float, distance under which points are matched,
+        and vertices closer to the plane are on the centre line
+    :return tuple: mirror vertex index of every vertex, -1 when it has no
+        match, and a bool array marking the centre line vertices
+    """
+    points = scene.original_points(mesh)
+    key = (
+        mesh, mesh_topology_hash(scene, mesh), points_hash(points), axis, tolerance
+    )
+
+    def build():
+        mirrored = np.array(points, dtype=np.float64)
+        mirrored[:, SYMMETRY_AXES[axis]] *= -1.0
+        mirror, _ = UniformGrid(points).nearest(mirrored, max_distance=tolerance)
+        centre = np.abs(points[:, SYMMETRY_AXES[axis]]) <= tolerance
+        return mirror, centre
+
+    return scene.cached("symmetry", key, build)
+
+
+def mirror_values(
+    values, symmetry, sides, axis=None, direction=1, flip=False
+):
+    """
+    Mirrors or flips per vertex values, for any number of maps at once
+    :param values: numpy.ndarray, (..., vertex_count) weights or
+        (..., vertex_count, 3) deltas
+    :param symmetry: tuple, mirror indices and centre line mask
+    :param sides: numpy.ndarray, coordinate of each vertex along the axis
+    :param axis: int, component of the deltas negated by the mirror,
+        None for weights
+    :param direction: int, 1 mirrors the positive side onto the negative
+        side, -1 the other way around
+    :param flip: bool, swaps both sides instead of mirroring one
+    :return numpy.ndarray: new values, vertices without a match keep
+        their value
+    """
+    mirror, centre = symmetry
+    values = np.asarray(values)
+    matched = mirror >= 0
+    # Vertices that receive the value of their mirror vertex
+    receive = matched if flip else matched & (np.sign(sides) == -direction) & ~centre
+    vector_axis = values.ndim - 1 if axis is not None else None
+    vertex_axis = values.ndim - 2 if axis is not None else values.ndim - 1
+    source = np.take(values, np.where(matched, mirror, 0), axis=vertex_axis)
+    if axis is not None:
+        source[..., axis] *= -1.0
+    mask = receive if axis is None else receive[:, None]
+    result = np.where(mask, source, values)
+    if axis is not None and not flip:
+        # Centre line vertices don't move across the plane
+        result[..., centre, axis] = 0.0
+    return result.astype(values.dtype)
+
+
+def split_falloff(sides, falloff=1.0):
+    """
+    Smooth left side factor of every vertex, the right side factor is one
+        minus it, so both halves add back up to the whole
+    :param sides: numpy.ndarray, coordinate of each vertex along the axis
+    :param falloff: float, width of the blend across the centre line
+    :return numpy.ndarray: factor of the positive side for each vertex
+    """
+    if falloff <= 0:
+        return (sides > 0).astype(np.float64) + (sides == 0) * 0.5
+    ramp = np.clip((sides + falloff * 0.5) / falloff, 0.0, 1.0)
+    return ramp * ramp * (3.0 - 2.0 * ramp)
+
+
+def symmetry_targets(scene, blendshape, targets=None):
+    """
+    Reads the deltas of several targets and their in-betweens as one 
+        stacked array
+    :param scene: SceneAccess, scene the blendshape is in
+    :param blendshape: string, name of the blendshape
+    :param targets: list, target names, all targets when not given
+    :return tuple: (target name, inputTargetItem index) of every item and 
+        their (item_count, vertex_count, 3) deltas
+    """
+    if targets is None:
+        targets = scene.target_registry(blendshape).names()
+    baked_items = bake_target_items(scene, blendshape, targets=list(targets))
+    keys = [(target, item) for target, items in baked_items.items() for item in items]
+    if not keys:
+        vertex_count = scene.vertex_count(scene.blendshape_geometry(blendshape))
+        return keys, np.zeros((0, vertex_count, 3), dtype=np.float32)
+    return keys, np.stack([baked_items[target].pop(item) for target, item in keys])
+
+
+def mirror_blendshape_targets(
+    scene, blendshape, targets=None, axis="x", direction=1, flip=False
+):
+    """
+    Mirrors or flips targets of a blendshape, every target and in-between 
+        is mirrored by one vectorized operation before they are written back
+    :param scene: SceneAccess, scene the blendshape is in
+    :param blendshape: string, name of the blendshape
+    :param targets: list, target names, all targets when not given
+    :param axis: string, 'x', 'y' or 'z', normal of the mirror plane
+    :param direction: int, 1 mirrors the positive side onto the negative
+        side, -1 the other way around
+    :param flip: bool, swaps both sides instead of mirroring one
+    :return list: names of the mirrored targets
+    """
+    mesh = scene.blendshape_geometry(blendshape)
+    symmetry = symmetry_map(scene, mesh, axis=axis)
+    sides = scene.original_points(mesh)[:, SYMMETRY_AXES[axis]]
+    keys, deltas = symmetry_targets(scene, blendshape, targets=targets)
+    deltas = mirror_values(
+        deltas,
+        symmetry,
+        sides,
+        axis=SYMMETRY_AXES[axis],
+        direction=direction,
+        flip=flip,
+    )
+    registry = scene.target_registry(blendshape)
+    for (target, item), item_deltas in zip(keys, deltas):
+        set_target_deltas(
+            scene, blendshape, registry.index(target), item_deltas, item=item
+        )
+    return list(dict.fromkeys(target for target, _ in keys))
+
+
+def split_blendshape_targets(
+    scene,
+    blendshape,
+    targets=None,
+    axis="x",
+    falloff=1.0,
+    prefixes=("L_", "R_"),
+):
+    """
+    Splits targets of a blendshape, in-betweens included, into a left and 
+        a right target, blended across the centre line. The split targets 
+        are added, or overwritten when they already exist
+    :param scene: SceneAccess, scene the blendshape is in
+    :param blendshape: string, name of the blendshape
+    :param targets: list, target names, all targets when not given
+    :param axis: string, 'x', 'y' or 'z', normal of the mirror plane
+    :param falloff: float, width of the blend across the centre line
+    :param prefixes: tuple, name prefixes of the positive and negative side
+    :return list: names of the new targets
+    """
+    mesh = scene.blendshape_geometry(blendshape)
+    sides = scene.original_points(mesh)[:, SYMMETRY_AXES[axis]]
+    keys, deltas = symmetry_targets(scene, blendshape, targets=targets)
+    factors = split_falloff(sides, falloff=falloff)[None, :, None]
+    registry = scene.target_registry(blendshape)
+    new_targets = []
+    for prefix, side_deltas in zip(
+        prefixes, [deltas * factors, deltas * (1.0 - factors)]
+    ):
+        for (target, item), item_deltas in zip(keys, side_deltas):
+            name = f"{prefix}{target}"
+            index = registry.index(name)
+            if index is None:
+                index = registry.add(name)
+            set_target_deltas(scene, blendshape, index, item_deltas, item=item)
+            if name not in new_targets:
+                new_targets.append(name)
+    return new_targets
+
+
+def mirror_deformer_weights(
+    scene, mesh, deformer, index=0, axis="x", direction=1, flip=False
+):
+    """
+    Mirrors or flips a deformer's weight map
+    :param scene: SceneAccess, scene the deformer is in
+    :param mesh: string, geometry deformed by the deformer
+    :param deformer: string, name of the deformer
+    :param index: int, index of the blendshape target
+    :param axis: string, 'x', 'y' or 'z', normal of the mirror plane
+    :param direction: int, 1 mirrors the positive side onto the negative
+        side, -1 the other way around
+    :param flip: bool, swaps both sides instead of mirroring one
+    :return SparseWeights: new weights, without the default vertices
+    """
+    node_type = scene.node_type(deformer)
+    previous = get_sparse_deformer_weights(
+        scene, deformer, scene.vertex_count(mesh), index=index, node_type=node_type
+    )
+    weights = SparseWeights.from_dense(mirror_values(
+        previous.to_dense(),
+        symmetry_map(scene, mesh, axis=axis),
+        scene.original_points(mesh)[:, SYMMETRY_AXES[axis]],
+        direction=direction,
+        flip=flip,
+    ))
+    set_sparse_deformer_weights(
+        scene, deformer, weights, index=index, node_type=node_type, previous=previous
+    )
+    return weights
+
+
+def blend_skin_matrices(weights, influence_matrices, geom_matrix=None):
+    """
+    Blends the influence matrices into one skinning matrix per vertex
+    :param weights: numpy.ndarray, (vertex_count, influence_count) weights
+    :param influence_matrices: numpy.ndarray, (influence_count, 4, 4) 
+        bindPreMatrix x matrix of each influence
+    :param geom_matrix: numpy.ndarray, (4, 4) skinCluster geomMatrix
+    :return numpy.ndarray: (vertex_count, 4, 4) row vector matrices
+    """
+    skin_matrices = np.einsum("nj,jab->nab", weights, influence_matrices)
+    if geom_matrix is not None:
+        skin_matrices = np.asarray(geom_matrix) @ skin_matrices
+    return skin_matrices
+
+
+def solve_corrective_delta(corrective_points, posed_points, skin_matrices=None):
+    """
+    Solves the delta that moves the posed geometry onto the corrective 
+        once it goes through skinning, for every vertex at once
+    :param corrective_points: numpy.ndarray, (vertex_count, 3) sculpted points
+    :param posed_points: numpy.ndarray, (vertex_count, 3) deformed points 
+        of the base geometry in the same pose
+    :param skin_matrices: numpy.ndarray, (vertex_count, 4, 4) skinning 
+        matrices, the offsets are returned as they are when not given
+    :return numpy.ndarray: (vertex_count, 3) delta before skinning
+    """
+    offsets = np.asarray(corrective_points, dtype=np.float64) - posed_points
+    if skin_matrices is None:
+        return offsets
+    # Only the linear part of the skinning moves a delta
+    linear = np.asarray(skin_matrices)[:, :3, :3]
+    invertible = np.abs(np.linalg.det(linear)) > 1e-10
+    inverse = np.broadcast_to(np.eye(3), linear.shape).copy()
+    inverse[invertible] = np.linalg.inv(linear[invertible])
+    return np.einsum("ni,nij->nj", offsets, inverse)
+
+
+def invert_corrective(scene, corrective, base_geo):
+    """
+    Gets the delta of a corrective sculpted on a posed geometry, 
+        inverting the geometry's skinning when it has any
+    :param scene: SceneAccess, scene the geometry is in
+    :param corrective: string, sculpted corrective geometry
+    :param base_geo: string, deformed base geometry in the same pose
+    :return numpy.ndarray: (vertex_count, 3) delta before skinning
+    """
+    corrective_points = scene.get_points(corrective)
+    posed_points = scene.get_points(base_geo)
+    if corrective_points.shape != posed_points.shape:
+        scene.error(
+            f"'{corrective}' and '{base_geo}' have different vertex counts"
+        )
+    skin_matrices = None
+    skin_cluster = scene.skin_cluster(base_geo)
+    if skin_cluster:
+        weights, influence_indices = scene.skin_weights(skin_cluster, base_geo)
+        skin_matrices = blend_skin_matrices(
+            weights, *scene.influence_matrices(skin_cluster, influence_indices)
+        )
+    return solve_corrective_delta(corrective_points, posed_points, skin_matrices)
+
+
+def is_mayapy():
+    """
+    :return bool: True when running in mayapy rather than the Maya UI
+    """
+    return os.path.basename(sys.executable).lower().startswith("mayapy")
+
+
+def mayapy_executable():
+    """
+    :return string: path of the mayapy interpreter of the running Maya
+    """
+    if is_mayapy():
+        return sys.executable
+    maya_location = os.environ.get(
+        "MAYA_LOCATION", os.path.dirname(os.path.dirname(sys.executable))
+    )
+    return os.path.join(
+        maya_location, "bin", "mayapy.exe" if os.name == "nt" else "mayapy"
+    )
+
+
+# Skin weights shared by every pose, set once in each worker process
+_worker_skin_weights = None
+
+# Posed points below which solve_pose_deltas stays in this process when 
+# the worker count isn't given, starting mayapy workers takes seconds
+POSE_POOL_MIN_POINTS = 5000000
+
+
+def _set_worker_skin_weights(weights):
+    """
+    Process pool initializer storing the skin weights in the worker
+    :param weights: numpy.ndarray, (vertex_count, influence_count) weights
+    """
+    global _worker_skin_weights
+    _worker_skin_weights = weights
+
+
+def solve_pose_delta(pose, weights=None):
+    """
+    Solves the corrective delta of one exported pose
+    :param pose: dictionary, 'corrective_points', 'posed_points', 
+        'influence_matrices' and 'geom_matrix' of the pose
+    :param weights: numpy.ndarray, skin weights, the worker's shared 
+        weights are used when not given
+    :return numpy.ndarray: (vertex_count, 3) delta before skinning
+    """
+    if weights is None:
+        weights = _worker_skin_weights
+    skin_matrices = None
+    if weights is not None:
+        skin_matrices = blend_skin_matrices(
+            weights, pose["influence_matrices"], pose["geom_matrix"]
+        )
+    return solve_corrective_delta(
+        pose["corrective_points"], pose["posed_points"], skin_matrices
+    )
+
+
+def export_pose_data(scene, base_geo, correctives):
+    """
+    Exports everything needed to invert correctives, posing the rig once 
+        per pose
+    :param scene: SceneAccess, scene the geometry is in
+    :param base_geo: string, deformed base geometry
+    :param correctives: dictionary, (corrective geometry, frame) keyed by 
+        target name, the frame being where the corrective was sculpted
+    :return tuple: skin weights (None when the base isn't skinned) and a 
+        dictionary of pose data keyed by target name
+    """
+    skin_cluster = scene.skin_cluster(base_geo)
+    weights = influence_indices = None
+    if skin_cluster:
+        weights, influence_indices = scene.skin_weights(skin_cluster, base_geo)
+    current_frame = scene.current_time()
+    poses = {}
+    try:
+        for target, (corrective, frame) in correctives.items():
+            scene.set_current_time(frame)
+            pose = {
+                "corrective_points": scene.get_points(corrective), 
+                "posed_points": scene.get_points(base_geo), 
+                "influence_matrices": None, 
+                "geom_matrix": None,
+            }
+            if skin_cluster:
+                pose["influence_matrices"], pose["geom_matrix"] = (
+                    scene.influence_matrices(skin_cluster, influence_indices)
+                )
+            poses[target] = pose
+    finally:
+        scene.set_current_time(current_frame)
+    return weights, poses
+
+
+def solve_pose_deltas(weights, poses, workers=None):
+    """
+    Solves the deltas of many poses in a process pool, outside of the 
+        Maya main thread
+    :param weights: numpy.ndarray, skin weights shared by every pose
+    :param poses: dictionary, pose data keyed by target name
+    :param workers: int, number of worker processes, every core when not 
+        given and the poses hold POSE_POOL_MIN_POINTS points or more, 
+        solved in this process when 1 or less
+    :return dictionary: (vertex_count, 3) deltas keyed by target name
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+        point_count = sum(len(pose["posed_points"]) for pose in poses.values())
+        if point_count < POSE_POOL_MIN_POINTS:
+            workers = 1
+    # Workers import this module to reach the solver, which they can't 
+    # when it was exec'd into __main__ from the script editor
+    if __name__ == "__main__" and not getattr(
+        sys.modules["__main__"], "__file__", None
+    ):
+        workers = 1
+    workers = min(workers, len(poses))
+    if workers <= 1:
+        return {
+            target: solve_pose_delta(pose, weights=weights) 
+            for target, pose in poses.items()
+        }
+    # Workers are separate mayapy processes, not copies of the Maya UI
+    context = multiprocessing.get_context("spawn")
+    if cmds is not None:
+        context.set_executable(mayapy_executable())
+    try:
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, 
+            mp_context=context, 
+            initializer=_set_worker_skin_weights, 
+            initargs=(weights,),
+        ) as executor:
+            return dict(zip(poses, executor.map(solve_pose_delta, poses.values())))
+    except concurrent.futures.process.BrokenProcessPool:
+        # Solves in this process rather than failing the whole batch
+        return solve_pose_deltas(weights, poses, workers=1)
+
+
+def batch_invert_correctives(
+    scene, blendshape, base_geo, correctives, workers=None
+):
+    """
+    Inverts many correctives and writes them all into a blendshape
+    :param scene: SceneAccess, scene the geometry is in
+    :param blendshape: string, blendshape receiving the inverted targets
+    :param base_geo: string, deformed base geometry
+    :param correctives: dictionary, (corrective geometry, frame) keyed by 
+        target name, or by (target name, weight) for in-betweens. Targets 
+        missing from the blendshape are added
+    :param workers: int, number of worker processes, see solve_pose_deltas
+    :return dictionary: (vertex_count, 3) deltas with the correctives' keys
+    """
+    weights, poses = export_pose_data(scene, base_geo, correctives)
+    deltas = solve_pose_deltas(weights, poses, workers=workers)
+    # Writes every delta back in one pass
+    registry = scene.target_registry(blendshape)
+    for key, delta in deltas.items():
+        target, weight = key if isinstance(key, tuple) else (key, 1.0)
+        index = registry.index(target)
+        if index is None:
+            index = registry.add(target)
+        set_target_deltas(scene, blendshape, index, delta, item=weight_item(weight))
+    return deltas
+
+
+def bake_blendshape_targets(
+    scene, blendshape, targets=None, spacing=25, progress=False
+):
+    """
+    Bakes shapes into separate geometry
+    :param scene: SceneAccess, scene the blendshape is in
+    :param blendshape: string, name of the blendshape
+    :param targets: list, target names to bake, all targets when not given
+    :param spacing: float, distance between each new geometry along x
+    :param progress: bool, bakes in cancellable chunks of targets while
+        showing the progress
+    :return list: new geometry
+    """
+    return run_chunked(
+        scene,
+        bake_blendshape_targets_task(
+            scene, blendshape, targets=targets, spacing=spacing
+        ),
+        title="Baking shapes" if progress else None,
+    )
+
+
+def bake_blendshape_targets_task(scene, blendshape, targets=None, spacing=25):
+    """
+    Chunked task of bake_blendshape_targets, see run_chunked.
+        Chunks are counted in targets
+    """
+    geo = scene.blendshape_geometry(blendshape)
+    registry = scene.target_registry(blendshape)
+    if not targets:
+        targets = registry.names()
+    # Lists every target's in-betweens in one pass
+    target_items = scene.target_items(blendshape)
+    # Zeros all blendshape targets before baking
+    zero_all_targets = [scene.set_attr(f"{blendshape}.{target}", 0)
+        for target in targets
+    ]
+    new_shapes = []
+    baked_count = 0
+    chunk_size = yield len(targets)
+    while baked_count < len(targets):
+        chunk_targets = targets[baked_count:baked_count + chunk_size]
+        for target in chunk_targets:
+            items = set(target_items.get(registry.index(target), []))
+            # Each in-between is baked at the weight it is reached at
+            for item in sorted(items | {FULL_WEIGHT_ITEM}):
+                scene.set_attr(f"{blendshape}.{target}", item_weight(item))
+                new_geo = scene.duplicate(
+                    geo, f"{inbetween_name(target, item)}_baked"
+                )
+                local_pos = scene.get_translation(new_geo)
+                scene.move(
+                    new_geo, 
+                    [local_pos[0]+(len(new_shapes)+1)*spacing, *local_pos[1:3]],
+                )
+                new_shapes.append(new_geo)
+            scene.set_attr(f"{blendshape}.{target}", 0)
+        baked_count += len(chunk_targets)
+        chunk_size = yield len(chunk_targets)
+
+    scene.info(f"Baked {len(new_shapes)} shapes of {len(targets)} targets")
+    return new_shapes
+
+
+def zero_blendshape_targets(scene, objects=None, snapshot=None):
+    """
+    Zeros out any unlocked or non connected channels in the objects' 
+        blendshape nodes. Each node's weights are read and written in bulk, 
+        connections and locks come from the cached target registry
+    :param scene: SceneAccess, scene the objects are in
+    :param objects: list, deformed objects, every blendshape in the scene 
+        is zeroed when not given
+    :param snapshot: dictionary, filled with the indices and previous 
+        values of the zeroed channels of each blendshape
+    :return list: channels that were zeroed
+    """
+    # Finds every blendshape with one query
+    blendshapes = scene.blendshapes(objects)
+    if not blendshapes:
+        scene.warning("No blendshape nodes found")
+        return []
+    zeroed = []
+    for blendshape in blendshapes:
+        registry = scene.target_registry(blendshape)
+        indices, values = scene.get_target_weights(blendshape)
+        # Only free channels that are not already zero
+        zero_mask = (values != 0) & registry.free_mask(indices.tolist())
+        if not zero_mask.any():
+            continue
+        zero_indices = indices[zero_mask]
+        if snapshot is not None:
+            snapshot[blendshape] = (zero_indices, values[zero_mask])
+        scene.set_target_weights(
+            blendshape, zero_indices, np.zeros(len(zero_indices))
+        )
+        zeroed += [
+            f"{blendshape}.{registry.name(index) or f'weight[{index}]'}" 
+            for index in zero_indices.tolist()
+        ]
+    return zeroed
+
+
+def restore_blendshape_weights(scene, snapshot):
+    """
+    Restores channels zeroed by zero_blendshape_targets. Channels that 
+        were removed, locked or connected since are skipped, like they 
+        are when zeroing
+    :param scene: SceneAccess, scene the blendshapes are in
+    :param snapshot: dictionary, indices and previous values of the 
+        zeroed channels of each blendshape
+    :return int: number of restored channels
+    """
+    restored = 0
+    for blendshape, (indices, values) in snapshot.items():
+        if not scene.exists(blendshape):
+            scene.warning(f"Skipping '{blendshape}', it does not exist")
+            continue
+        registry = scene.target_registry(blendshape)
+        restore_mask = registry.free_mask(indices.tolist()) & np.array(
+            [registry.name(index) is not None for index in indices.tolist()], 
+            dtype=bool,
+        )
+        if not restore_mask.all():
+            scene.warning(
+                f"Skipping {np.count_nonzero(~restore_mask)} channels of "
+                f"'{blendshape}', they were removed, locked or connected"
+            )
+        if not restore_mask.any():
+            continue
+        scene.set_target_weights(
+            blendshape, indices[restore_mask], values[restore_mask]
+        )
+        restored += int(np.count_nonzero(restore_mask))
+    return restored
+
+
+def create_combination_shape(
+    scene, blendshape, driven_shape, look_for="", replace_with="", drivers=None
+):
+    """
+    Hooks up a corrective shape to a combination shape node
+    :param scene: SceneAccess, scene the blendshape is in
+    :param blendshape: string, name of the blendshape
+    :param driven_shape: string, target driven by the combination
+    :param look_for: string, part of the target name replaced to name 
+        the combination shape node
+    :param replace_with: string, replacement of look_for in the node name
+    :param drivers: list, targets driving the combination, the channels 
+        currently equal to 1 when not given
+    :return string: new combination shape node
+    """
+    # Error check
+    [scene.error(f"Object '{object}' does not exist") 
+        for object in [blendshape] 
+        if not scene.exists(object)
+    ]
+    if scene.node_type(blendshape) != "blendShape":
+        scene.error(f"'{blendshape}' is not a blendshape")
+    registry = scene.target_registry(blendshape)
+    if driven_shape not in registry:
+        scene.error("Can't find the combination shape geo in the blendshape node")
+    if drivers is None:
+        # Lists the blendshape attributes
+        blendshape_attributes = registry.names()
+        # Gets all blendshape channels that are equal to 1
+        drivers = [
+            attr 
+            for attr in blendshape_attributes 
+            if attr != driven_shape 
+            and scene.get_attr(f"{blendshape}.{attr}") == 1
+        ]
+    # Creates combination shape node
+    cs_node = scene.create_node(
+        "combinationShape", 
+        driven_shape.replace(look_for, replace_with) if look_for else driven_shape,
+    )
+    # Connects the blendshape channels into the combination shape node
+    [scene.connect(f"{blendshape}.{attr}", f"{cs_node}.inputWeight[{index}]") 
+        for index, attr in enumerate(drivers)
+    ]
+    # Connects the output of the combination shape node into the driven shape
+    scene.connect(f"{cs_node}.outputWeight", f"{blendshape}.{driven_shape}")
+    return cs_node
+
+
+def parse_combination_drivers(name, look_for, known_names, separator="_"):
+    """
+    Splits a combination target's name into the targets driving it, e.g. 
+        'jawOpen_lip_cornerPull_corrective_delta' into 'jawOpen' and 
+        'lip_cornerPull'. Driver names can contain the separator, the 
+        longest known name is matched first
+    :param name: string, name of the combination target
+    :param look_for: string, part of the name marking a combination 
+        target, only matched as whole separated tokens, the last match is 
+        removed
+    :param known_names: set, names of the blendshape's targets
+    :param separator: string, separator between driver names
+    :return list: driver names, None if the name isn't a combination of 
+        at least two known targets
+    """
+    look_for_tokens = [token for token in look_for.split(separator) if token]
+    if not look_for_tokens:
+        return None
+    tokens = [token for token in name.split(separator) if token]
+    # Driver names can contain look_for, e.g. 'topics' with 'cs', so only 
+    # the whole tokens are removed, starting from the end of the name
+    size = len(look_for_tokens)
+    for start in range(len(tokens) - size, -1, -1):
+        if tokens[start:start + size] == look_for_tokens:
+            del tokens[start:start + size]
+            break
+    else:
+        return None
+    drivers = []
+    position = 0
+    while position < len(tokens):
+        # Longest run of tokens forming a known target name
+        for end in range(len(tokens), position, -1):
+            candidate = separator.join(tokens[position:end])
+            if candidate in known_names and candidate != name:
+                drivers.append(candidate)
+                position = end
+                break
+        else:
+            return None
+    return drivers if len(drivers) > 1 else None
+
+
+def batch_create_combination_shapes(
+    scene, blendshape, look_for, replace_with="", separator="_"
+):
+    """
+    Hooks up every combination target of a blendshape from its name, 
+        without reading or changing the current pose
+    :param scene: SceneAccess, scene the blendshape is in
+    :param blendshape: string, name of the blendshape
+    :param look_for: string, part of a target name marking a combination 
+        target, replaced to name its combination shape node
+    :param replace_with: string, replacement of look_for in the node name
+    :param separator: string, separator between driver names
+    :return dictionary: new combination shape node keyed by driven target
+    """
+    if not look_for:
+        scene.error("Batch hookup needs a 'Look for' naming rule")
+    registry = scene.target_registry(blendshape)
+    known_names = set(registry.names())
+    created = {}
+    skipped = []
+    for driven_shape in registry.names():
+        drivers = parse_combination_drivers(
+            driven_shape, look_for, known_names, separator=separator
+        )
+        if drivers is None:
+            continue
+        # Targets that are already driven are left alone
+        if registry.is_connected(driven_shape) or registry.is_locked(driven_shape):
+            skipped.append(driven_shape)
+            continue
+        created[driven_shape] = create_combination_shape(
+            scene, 
+            blendshape, 
+            driven_shape, 
+            look_for=look_for, 
+            replace_with=replace_with, 
+            drivers=drivers,
+        )
+    if skipped:
+        scene.warning(
+            f"Skipped {len(skipped)} combinations that are already connected "
+            f"or locked: {', '.join(skipped)}"
+        )
+    return created
+
+
+# Combination methods of the combinationShape node, as reductions over
+# the driver weights
+COMBINATION_METHODS = {0: np.prod, 1: np.min}
+
+
+class CombinationEvaluator:
+    """
+    In-memory model of a blendshape's combination shape network. The 
+        weight, combination and delta graph is read from the scene once, 
+        then whole batches of poses are evaluated with matrix operations 
+        without touching the scene
+    """
+    def __init__(self, scene, blendshape):
+        """
+        :param scene: SceneAccess, scene the blendshape is in
+        :param blendshape: string, name of the blendshape
+        """
+        self.scene = scene
+        self.blendshape = blendshape
+        self.registry = scene.target_registry(blendshape)
+        # Columns of the weight matrix, the targets then any plug from 
+        # another node driving a combination
+        self.names = self.registry.names()
+        self.target_count = len(self.names)
+        self.columns = {name: column for column, name in enumerate(self.names)}
+        self.combinations = {}
+        for name in list(self.names):
+            source = scene.incoming_connection(f"{blendshape}.{name}")
+            if source is None:
+                continue
+            node, _, attribute = source.partition(".")
+            if attribute != "outputWeight" or scene.node_type(node) != "combinationShape":
+                continue
+            method = 0
+            if scene.has_attribute(node, "combinationMethod"):
+                method = int(scene.get_attr(f"{node}.combinationMethod"))
+            self.combinations[self.columns[name]] = (
+                [self._column(plug) for plug in scene.combination_inputs(node)],
+                method,
+            )
+        # Every other column is set by the poses
+        self.inputs = [
+            column 
+            for column in range(len(self.names)) 
+            if column not in self.combinations
+        ]
+        self.input_names = [self.names[column] for column in self.inputs]
+        self.stages, self.cycles = self._stages()
+        self.deltas = None
+
+    def _column(self, plug):
+        node, _, attribute = plug.partition(".")
+        if node == self.blendshape:
+            if attribute.startswith(("weight[", "w[")):
+                attribute = self.registry.name(
+                    int(attribute[attribute.index("[") + 1:-1])
+                ) or attribute
+            if attribute in self.columns:
+                return self.columns[attribute]
+        if plug not in self.columns:
+            self.columns[plug] = len(self.names)
+            self.names.append(plug)
+        return self.columns[plug]
+
+    def _stages(self):
+        """
+        Sorts the combinations so every driver is evaluated before the 
+            combinations it drives, grouped to evaluate together
+        :return tuple: (output columns, (count, driver count) driver 
+            columns, method) stages and the names of the combinations in 
+            a dependency cycle
+        """
+        levels = {column: 0 for column in range(len(self.names))}
+        for column in self.combinations:
+            del levels[column]
+        remaining = dict(self.combinations)
+        while remaining:
+            ready = {
+                column: 1 + max([levels[driver] for driver in drivers] or [0])
+                for column, (drivers, method) in remaining.items()
+                if all(driver in levels for driver in drivers)
+            }
+            if not ready:
+                break
+            levels.update(ready)
+            for column in ready:
+                del remaining[column]
+        groups = {}
+        for column, (drivers, method) in self.combinations.items():
+            if column in remaining:
+                continue
+            key = (levels[column], len(drivers), method)
+            groups.setdefault(key, ([], []))
+            groups[key][0].append(column)
+            groups[key][1].append(drivers)
+        stages = [
+            (
+                np.array(outputs, dtype=np.int64), 
+                np.array(drivers, dtype=np.int64).reshape(len(outputs), key[1]), 
+                key[2],
+            )
+            for key, (outputs, drivers) in sorted(groups.items())
+        ]
+        return stages, [self.names[column] for column in sorted(remaining)]
+
+    def pose_matrix(self, poses):
+        """
+        :param poses: list, dictionaries of input weights keyed by target 
+            name, missing inputs are 0. Or a (pose_count, input_count) 
+            array ordered as input_names
+        :return numpy.ndarray: (pose_count, input_count) input weights
+        """
+        if isinstance(poses, np.ndarray):
+            if poses.ndim != 2 or poses.shape[1] != len(self.inputs):
+                self.scene.error(
+                    f"Poses need {len(self.inputs)} input weights each"
+                )
+            return poses.astype(np.float64)
+        input_positions = {name: position for position, name in enumerate(self.input_names)}
+        matrix = np.zeros((len(poses), len(self.inputs)))
+        for row, pose in enumerate(poses):
+            for name, weight in pose.items():
+                if name not in input_positions:
+                    self.scene.error(
+                        f"'{name}' is not an input of {self.blendshape}"
+                    )
+                matrix[row, input_positions[name]] = weight
+        return matrix
+
+    def combination_poses(self):
+        """
+        Builds one pose per combination, with the inputs it ultimately 
+            depends on at 1
+        :return tuple: combination names and their (combination_count, 
+            input_count) poses
+        """
+        input_positions = {column: position for position, column in enumerate(self.inputs)}
+        columns = sorted(self.combinations)
+        poses = np.zeros((len(columns), len(self.inputs)))
+        for row, column in enumerate(columns):
+            pending = [column]
+            visited = set()
+            while pending:
+                current = pending.pop()
+                if current in visited:
+                    continue
+                visited.add(current)
+                if current in input_positions:
+                    poses[row, input_positions[current]] = 1.0
+                else:
+                    pending.extend(self.combinations[current][0])
+        return [self.names[column] for column in columns], poses
+
+    def weights(self, poses):
+        """
+        Evaluates the weight of every target for a batch of poses
+        :param poses: list or numpy.ndarray, see pose_matrix
+        :return numpy.ndarray: (pose_count, target_count) target weights, 
+            in the order of names
+        """
+        inputs = self.pose_matrix(poses)
+        weights = np.zeros((len(inputs), len(self.names)))
+        weights[:, self.inputs] = inputs
+        for outputs, drivers, method in self.stages:
+            weights[:, outputs] = COMBINATION_METHODS.get(method, np.prod)(
+                weights[:, drivers], axis=2
+            )
+        return weights[:, :self.target_count]
+
+    def load_deltas(self):
+        """
+        Reads the rest points, the envelope and the deltas of every target 
+            item, in-betweens included, scaled by the target's weight mask, 
+            the first time points are evaluated
+        """
+        if self.deltas is not None:
+            return
+        mesh = self.scene.blendshape_geometry(self.blendshape)
+        vertex_count = self.scene.vertex_count(mesh)
+        indices = self.registry.indices()
+        baked = bake_target_items(
+            self.scene, self.blendshape, targets=self.names[:self.target_count]
+        )
+        rows = []
+        # Targets with only a full weight shape scale it by their weight, 
+        # the others keep the item weights and rows to interpolate between
+        self.plain_rows = []
+        self.plain_columns = []
+        self.inbetween_items = []
+        for column, name in enumerate(self.names[:self.target_count]):
+            mask = get_deformer_weights(
+                self.scene, 
+                self.blendshape, 
+                vertex_count, 
+                index=indices[name], 
+                node_type="blendShape",
+            )
+            items = baked.pop(name)
+            if len(items) == 1:
+                self.plain_rows.append(len(rows))
+                self.plain_columns.append(column)
+            else:
+                # The shape at weight 0 has no delta so it has no row
+                weights = [0.0] + [item_weight(item) for item in items]
+                item_rows = [-1] + list(range(len(rows), len(rows) + len(items)))
+                order = np.argsort(weights, kind="stable")
+                self.inbetween_items.append((
+                    column, 
+                    np.array(weights)[order], 
+                    np.array(item_rows)[order],
+                ))
+            for item_deltas in items.values():
+                rows.append((item_deltas * mask[:, None]).ravel())
+        self.deltas = np.array(rows, dtype=np.float32).reshape(
+            len(rows), vertex_count * 3
+        )
+        self.rest_points = self.scene.rest_points(self.blendshape)
+        self.envelope = self.scene.get_attr(f"{self.blendshape}.envelope")
+
+    def item_coefficients(self, weights):
+        """
+        Turns target weights into the coefficient of each delta row, 
+            in-betweens interpolate between the items on each side of the 
+            weight like the blendshape does
+        :param weights: numpy.ndarray, (pose_count, target_count) weights
+        :return numpy.ndarray: (pose_count, row_count) coefficients
+        """
+        coefficients = np.zeros((len(weights), len(self.deltas)))
+        coefficients[:, self.plain_rows] = weights[:, self.plain_columns]
+        poses = np.arange(len(weights))
+        for column, item_weights, item_rows in self.inbetween_items:
+            weight = weights[:, column]
+            segment = np.clip(
+                np.searchsorted(item_weights, weight), 1, len(item_weights) - 1
+            )
+            low_weight = item_weights[segment - 1]
+            blend = (weight - low_weight) / (item_weights[segment] - low_weight)
+            for rows, factors in (
+                (item_rows[segment - 1], 1.0 - blend), 
+                (item_rows[segment], blend), 
+            ):
+                # Row -1 is the shape at weight 0
+                valid = rows >= 0
+                coefficients[poses[valid], rows[valid]] += factors[valid]
+        return coefficients
+
+    def points(self, poses):
+        """
+        Evaluates the deformed points for a batch of poses
+        :param poses: list or numpy.ndarray, see pose_matrix
+        :return numpy.ndarray: (pose_count, vertex_count, 3) points
+        """
+        self.load_deltas()
+        coefficients = self.item_coefficients(self.weights(poses))
+        offsets = (coefficients @ self.deltas).reshape(
+            -1, len(self.rest_points), 3
+        )
+        return self.rest_points + self.envelope * offsets
+
+    def input_sets(self):
+        """
+        :return dictionary: inputs each combination ultimately depends on, 
+            keyed by combination name
+        """
+        names, poses = self.combination_poses()
+        return {
+            name: frozenset(np.flatnonzero(pose).tolist()) 
+            for name, pose in zip(names, poses)
+        }
+
+    def conflicts(self):
+        """
+        Finds combinations that can't evaluate or that always fire 
+            together
+        :return dictionary: 'cycles', combinations driven by themselves, 
+            and 'duplicates', groups of combinations depending on the 
+            same inputs
+        """
+        by_drivers = {}
+        for name, inputs in self.input_sets().items():
+            method = self.combinations[self.columns[name]][1]
+            by_drivers.setdefault((inputs, method), []).append(name)
+        return {
+            "cycles": list(self.cycles),
+            "duplicates": [
+                sorted(names) for names in by_drivers.values() if len(names) > 1
+            ],
+        }
+
+    def firing(self, poses, threshold=1e-3):
+        """
+        Measures which combinations fire over a batch of poses, and which
+            fire on top of a combination of a subset of their drivers
+        :param poses: list or numpy.ndarray, see pose_matrix
+        :param threshold: float, weight above which a combination fires
+        :return dictionary: 'counts', poses each combination fires in, and 
+            'double_firing', (combination, nested combination, poses) of 
+            every pair firing together
+        """
+        columns = sorted(self.combinations)
+        fired = self.weights(poses)[:, columns] > threshold
+        counts = fired.sum(axis=0)
+        # Poses shared by every pair of combinations
+        shared = fired.T.astype(np.int64) @ fired.astype(np.int64)
+        input_sets = self.input_sets()
+        driver_sets = [input_sets[self.names[column]] for column in columns]
+        double_firing = []
+        for first, second in zip(*np.nonzero(np.triu(shared, 1))):
+            if driver_sets[first] <= driver_sets[second]:
+                nested, combination = first, second
+            elif driver_sets[second] <= driver_sets[first]:
+                nested, combination = second, first
+            else:
+                continue
+            double_firing.append((
+                self.names[columns[combination]], 
+                self.names[columns[nested]], 
+                int(shared[first, second]),
+            ))
+        return {
+            "counts": {
+                self.names[column]: int(count) 
+                for column, count in zip(columns, counts)
+            },
+            "double_firing": double_firing,
+        }
+
+
+def check_combinations(scene, blendshape, poses=None, threshold=1e-3):
+    """
+    Evaluates a blendshape's combination network offline and reports the 
+        combinations that conflict or fire on top of each other
+    :param scene: SceneAccess, scene the blendshape is in
+    :param blendshape: string, name of the blendshape
+    :param poses: list or numpy.ndarray, poses to evaluate, see 
+        CombinationEvaluator.pose_matrix. One pose per combination with 
+        its drivers at 1 when not given
+    :param threshold: float, weight above which a combination fires
+    :return dictionary: conflicts, firing counts and double firing pairs, 
+        with the evaluation speed
+    """
+    evaluator = CombinationEvaluator(scene, blendshape)
+    if poses is None:
+        _, poses = evaluator.combination_poses()
+    start = time.perf_counter()
+    firing = evaluator.firing(poses, threshold=threshold)
+    seconds = time.perf_counter() - start
+    pose_count = len(evaluator.pose_matrix(poses))
+    report = evaluator.conflicts()
+    report.update(firing)
+    report["poses"] = pose_count
+    report["poses_per_second"] = pose_count / seconds if seconds else None
+    return report
+
+
+def bake_current_poses(scene, objects):
+    """
+    Bakes the current pose of objects into new geometry without history, 
+        all of them with a single duplicate
+    :param scene: SceneAccess, scene the objects are in
+    :param objects: list, deformed objects
+    :return list: new geometry
+    """
+    return scene.bake_geometries(
+        objects, [f"{object}_baked" for object in objects]
+    )
+
+
+# Transform attributes kept by clean_objects
+MAIN_ATTRIBUTES = [
+    'visibility', 
+    'translateX', 
+    'translateY', 
+    'translateZ', 
+    'rotateX', 
+    'rotateY', 
+    'rotateZ', 
+    'scaleX', 
+    'scaleY', 
+    'scaleZ'
+]
+
+
+def clean_objects(scene, objects):
+    """
+    Unlocks main attrs and deletes any unimportant attrs, with one command 
+        per attribute for the whole list of objects
+    :param scene: SceneAccess, scene the objects are in
+    :param objects: list, objects to clean
+    :return dictionary: deleted attributes keyed by object
+    """
+    if not objects:
+        return {}
+    removed = {
+        object: [attr for attr in attrs if attr not in MAIN_ATTRIBUTES]
+        for object, attrs in scene.user_attributes(objects).items()
+    }
+    # Groups the objects by attribute so each attribute is deleted at once
+    objects_by_attr = {}
+    for object, attrs in removed.items():
+        for attr in attrs:
+            objects_by_attr.setdefault(attr, []).append(object)
+    for attr, attr_objects in objects_by_attr.items():
+        scene.delete_attributes(attr_objects, attr)
+    # Sets the main attrs to unlocked and keyable
+    for attr in MAIN_ATTRIBUTES:
+        scene.set_attribute_states(objects, attr, lock=False, keyable=True)
+    return removed
+
+
+class CommandRecorder:
+    """
+    Stands in for the cmds or mel module while instrumentation is enabled, 
+        timing every command call
+    """
+    def __init__(self, module, prefix, instrumentation):
+        """
+        :param module: module, the real cmds or mel module
+        :param prefix: string, prefix of the recorded command names
+        :param instrumentation: Instrumentation, receives every call
+        """
+        self._module = module
+        self._prefix = prefix
+        self._instrumentation = instrumentation
+
+    def __getattr__(self, name):
+        attribute = getattr(self._module, name)
+        if not callable(attribute):
+            return attribute
+        command = f"{self._prefix}.{name}"
+        record = self._instrumentation.record
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return attribute(*args, **kwargs)
+            finally:
+                record(command, time.perf_counter() - start)
+        # Later lookups of the command skip __getattr__
+        setattr(self, name, timed)
+        return timed
+
+
+class OperationRecord:
+    """
+    Commands made by one tool operation and the operations it ran
+    """
+    def __init__(self, name):
+        """
+        :param name: string, name of the operation
+        """
+        self.name = name
+        self.seconds = 0.0
+        # Calls, cumulative seconds and max seconds of each command
+        self.commands = {}
+        self.children = []
+
+    def to_dict(self):
+        """
+        :return dictionary: json serializable record
+        """
+        return {
+            "operation": self.name, 
+            "seconds": self.seconds, 
+            "commands": {
+                command: {"calls": calls, "seconds": total, "max_seconds": longest}
+                for command, (calls, total, longest) in self.commands.items()
+            }, 
+            "children": [child.to_dict() for child in self.children],
+        }
+
+
+class Instrumentation:
+    """
+    Records the cmds and mel calls made by each tool operation
+    """
+    def __init__(self, json_path=None, profile_path=None):
+        """
+        :param json_path: string, file the report is written to when disabled
+        :param profile_path: string, file cProfile stats of the top level 
+            operations are written to when disabled, no profiling when not given
+        """
+        self.json_path = json_path
+        self.profile_path = profile_path
+        self.profile = None
+        if profile_path:
+            import cProfile
+            self.profile = cProfile.Profile()
+        self.operations = []
+        self.stack = []
+        # Commands called outside of any tool operation
+        self.outside = OperationRecord("(outside operations)")
+
+    def record(self, command, seconds):
+        """
+        Adds a command call to the running operation
+        :param command: string, name of the command
+        :param seconds: float, time the call took
+        """
+        operation = self.stack[-1] if self.stack else self.outside
+        stats = operation.commands.get(command)
+        if stats is None:
+            operation.commands[command] = [1, seconds, seconds]
+        else:
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+
+    def run(self, name, func, *args, **kwargs):
+        """
+        Runs a tool operation, nesting it under the running operation
+        :param name: string, name of the operation
+        :param func: function, the operation
+        :return: whatever the operation returns
+        """
+        operation = OperationRecord(name)
+        top_level = not self.stack
+        (self.operations if top_level else self.stack[-1].children).append(
+            operation
+        )
+        self.stack.append(operation)
+        if top_level and self.profile:
+            self.profile.enable()
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            operation.seconds = time.perf_counter() - start
+            self.stack.pop()
+            if top_level and self.profile:
+                self.profile.disable()
+
+    def report(self):
+        """
+        :return dictionary: json serializable record of every operation
+        """
+        operations = self.operations
+        if self.outside.commands:
+            operations = operations + [self.outside]
+        return {"operations": [operation.to_dict() for operation in operations]}
+
+    def summary(self):
+        """
+        Formats the recorded operations as a table, slowest commands first
+        :return string: the table
+        """
+        lines = [
+            f"{'Operation / command':<48}{'Calls':>8}{'Total ms':>12}{'Max ms':>10}"
+        ]
+
+        def add_operation(operation, depth):
+            indent = "  " * depth
+            lines.append(
+                f"{indent + operation.name:<48}{'':>8}"
+                f"{operation.seconds * 1000:>12.2f}{'':>10}"
+            )
+            for command, (calls, total, longest) in sorted(
+                operation.commands.items(), key=lambda item: -item[1][1]
+            ):
+                lines.append(
+                    f"{indent + '  ' + command:<48}{calls:>8}"
+                    f"{total * 1000:>12.2f}{longest * 1000:>10.2f}"
+                )
+            for child in operation.children:
+                add_operation(child, depth + 1)
+
+        for operation in self.operations:
+            add_operation(operation, 0)
+        if self.outside.commands:
+            add_operation(self.outside, 0)
+        return "\n".join(lines)
+
+
+# Running instrumentation, None when disabled
+_instrumentation = None
+
+
+def instrumented(func):
+    """
+    Decorator recording a tool operation while instrumentation is enabled, 
+        it only costs a global lookup when disabled
+    """
+    def wrapper(*args, **kwargs):
+        if _instrumentation is None:
+            return func(*args, **kwargs)
+        return _instrumentation.run(func.__name__, func, *args, **kwargs)
+    wrapper.__name__ = func.__name__
+    wrapper.__doc__ = func.__doc__
+    return wrapper
+
+
+def atomic(evaluation=None):
+    """
+    Decorator running a tool operation in its scene's execution context, 
+        so it is one undo step without viewport refreshes
+    :param evaluation: string, 'dg' or 'pause', see 
+        SceneAccess.execution_context
+    """
+    def decorator(func):
+        def wrapper(self, *args, **kwargs):
+            try:
+                with self.scene.execution_context(
+                    func.__name__, evaluation=evaluation
+                ):
+                    return func(self, *args, **kwargs)
+            except OperationCancelled as cancelled:
+                self.scene.warning(f"{cancelled}, the changes were rolled back")
+                return None
+        wrapper.__name__ = func.__name__
+        wrapper.__doc__ = func.__doc__
+        return wrapper
+    return decorator
+
+
+def enable_instrumentation(json_path=None, profile_path=None):
+    """
+    Starts recording every cmds and mel call made by the tool's operations
+    :param json_path: string, file the report is written to when disabled
+    :param profile_path: string, file cProfile stats are written to when 
+        disabled
+    :return Instrumentation: the running instrumentation
+    """
+    global _instrumentation, cmds, mel
+    if _instrumentation is not None:
+        return _instrumentation
+    _instrumentation = Instrumentation(json_path=json_path, profile_path=profile_path)
+    # Every command goes through the module globals, so swapping them 
+    # catches the calls of the UI and of MayaScene alike
+    _instrumentation.modules = (cmds, mel)
+    cmds = CommandRecorder(cmds, "cmds", _instrumentation)
+    mel = CommandRecorder(mel, "mel", _instrumentation)
+    return _instrumentation
+
+
+def disable_instrumentation():
+    """
+    Stops recording, prints the summary table to the script editor and 
+        writes the json report and cProfile stats when asked for
+    :return dictionary: json serializable record of every operation
+    """
+    global _instrumentation, cmds, mel
+    instrumentation = _instrumentation
+    if instrumentation is None:
+        return None
+    cmds, mel = instrumentation.modules
+    _instrumentation = None
+    MGlobal.displayInfo(instrumentation.summary())
+    report = instrumentation.report()
+    if instrumentation.json_path:
+        with open(instrumentation.json_path, "w") as report_file:
+            json.dump(report, report_file, indent=2)
+    if instrumentation.profile:
+        instrumentation.profile.dump_stats(instrumentation.profile_path)
+    return report
 
 
 class blendShapeManagerTool:
@@ -10,6 +4808,13 @@ class blendShapeManagerTool:
         self.window_name = "adams_blendshape_manager_tool_ui"
         self.window_title = "Adam's Blendshape Manager Tool v1.0"
         self.window_width = 385
+        # Every operation goes through the scene access layer
+        self.scene = MayaScene()
+        # Deformers are only queried once the option menus are opened
+        self.deformer_cache = None
+        self.deformer_menu_geo = None
+        # Channel values before the last zero
+        self.zero_snapshot = {}
         # Call UI
         self.user_interface()
 
@@ -25,6 +4830,9 @@ class blendShapeManagerTool:
             height=450, 
             sizeable=False,
         )
+        # Removes the scene callbacks whenever the window is closed or 
+        # replaced
+        cmds.scriptJob(uiDeleted=[main_ui_window, self.scene.close], runOnce=True)
         main_layout = cmds.columnLayout(adjustableColumn=True)
         # Button layout for general functions
         general_layout = cmds.frameLayout(label="General")
@@ -89,6 +4897,64 @@ class blendShapeManagerTool:
             label="Batch Bake Shapes", 
             command=self.bake_shapes,
         )
+        # Bakes all shapes of a blendshape node as data button
+        data_bake_shapes_button = cmds.button(
+            "data_bake_shapes_button", 
+            label="Data Bake", 
+            command=self.data_bake_shapes, 
+            annotation="Bakes every target of the selected blendshape to a "
+            "library file without duplicating geometry. Geometry is only "
+            "built for the selected channels",
+        )
+        # Exports the selected blendshape's targets and masks to a file button
+        export_library_button = cmds.button(
+            "export_library_button", 
+            label="Export Shapes", 
+            command=self.export_shapes, 
+            annotation="Exports the selected blendshape's targets (or the "
+            "selected channels) and their weight masks to a library file",
+        )
+        # Imports targets and masks from a file button
+        import_library_button = cmds.button(
+            "import_library_button", 
+            label="Import Shapes", 
+            command=self.import_shapes, 
+            annotation="Imports a library file onto the selected blendshape. "
+            "Only the selected channels are imported if any are selected",
+        )
+        # Zeros every blendshape channel in the scene button
+        zero_scene_shapes_button = cmds.button(
+            "zero_scene_blendshape_weights_button", 
+            label="Zero All Shapes", 
+            command=self.zero_scene_blendshape_weights, 
+            annotation="Zeros every free blendshape channel in the scene. "
+            "Connected or locked channels are skipped",
+        )
+        # Restores the last zeroed channels button
+        restore_shapes_button = cmds.button(
+            "restore_blendshape_weights_button", 
+            label="Restore Shapes", 
+            command=self.restore_blendshape_weights, 
+            annotation="Restores the channels zeroed by the last Zero Shapes "
+            "or Zero All Shapes",
+        )
+        # Starts and stops recording the commands each operation makes button
+        profile_button = cmds.button(
+            "profile_operations_button", 
+            label="Profile", 
+            command=self.toggle_profiling, 
+            annotation="Records the Maya commands made by every operation, " 
+            "press again to print the report in the script editor",
+        )
+        # Prints the weight maps and targets written since last time button
+        changes_button = cmds.button(
+            "show_changes_button", 
+            label="What Changed", 
+            command=self.show_changes, 
+            annotation="Prints the weight maps and targets the tool changed "
+            "since the last time, and how many writes were skipped because "
+            "nothing changed",
+        )
         # Hookup corrective shape layout section
         cmds.setParent(main_layout)
         cmds.separator(style="none", height=15)
@@ -123,12 +4989,43 @@ class blendShapeManagerTool:
             label="Replace with", text="cs"
         )
         cmds.separator(style="none")
+        # Separator between the driver names of a combination target
+        self.comb_shape_separator_field = cmds.textFieldGrp(
+            label="Driver separator", text="_"
+        )
+        cmds.separator(style="none")
 
         cmds.setParent(corrective_shapes_layout)
         # Hookup correctives button
         hookup_corrective_button = cmds.button(
             label="Hookup Corrective", command=self.hookup_combination_shape
         )
+        # Hooks up every combination target from its name button
+        batch_hookup_button = cmds.button(
+            label="Batch Hookup Correctives", 
+            command=self.batch_hookup_combination_shapes, 
+            annotation="Hooks up every target of the blendshape node whose "
+            "name contains 'Look for', driven by the targets named in the "
+            "rest of its name, e.g. jawOpen_lipCornerPull_corrective_delta",
+        )
+        # Inverts every selected corrective into the blendshape node button
+        batch_invert_button = cmds.button(
+            label="Batch Invert Correctives", 
+            command=self.batch_invert_shapes, 
+            annotation="Inverts every selected corrective against the base geo "
+            "and writes them into the blendshape node. Each corrective is "
+            "inverted at the frame in its 'poseFrame' attribute, or the "
+            "current frame. Correctives with 'poseTarget' and 'poseWeight' "
+            "attributes become in-betweens of that target",
+        )
+        # Checks the combination network without evaluating the scene button
+        check_combinations_button = cmds.button(
+            label="Check Combinations", 
+            command=self.check_combination_shapes, 
+            annotation="Evaluates the blendshape node's combination shapes "
+            "in memory and reports the ones depending on the same targets, "
+            "firing on top of each other or driven in a cycle",
+        )
         cmds.setParent(main_layout)
         cmds.separator(style="none", height=15)
         # Deformer weights sections
@@ -138,33 +5035,136 @@ class blendShapeManagerTool:
             self, label="Base geo:", add_button=True
         ) 
         cmds.setParent(blendshape_weights_layout)
+        # Mesh of the target deformer, can have another topology
+        self.transfer_target_geo_field = self.txt_grp(
+            self, label="Target geo:", add_button=True
+        )
+        cmds.setParent(blendshape_weights_layout)
         cmds.rowColumnLayout(numberOfColumns=2, columnWidth=[(1,275),(2,100)])
-        filter_deformers = ["----"]
-        all_deformers = [filter_deformers + cmds.ls(type=deformer_name) 
-            for deformer_name in ["blendShape", "wire", "cluster", "deltaMush", "jiggle"] 
-            if cmds.ls(type=deformer_name)
-        ][0]
+        # Menus start empty and fill the first time they are opened
         self.source_blendshape_option = self.option_menu_grp(
-            label="Source Deformer: ", 
-            items=all_deformers
+            label="Source Deformer: ", items=["----"]
         )
         self.source_blendshape_index_option = cmds.intField(minValue=0)
         
         # Choose a target blendshape deformer
         self.target_blendshape_option = self.option_menu_grp(
-            label="Target Deformer: ", items=all_deformers
+            label="Target Deformer: ", items=["----"]
         )
         self.target_blendshape_index_option = cmds.intField(minValue=0)
+        [
+            cmds.optionMenu(
+                f"{option_menu}|OptionMenu", 
+                edit=True, 
+                beforeShowPopup=lambda *args: self.fill_deformer_menus(),
+            ) 
+            for option_menu in [
+                self.source_blendshape_option, self.target_blendshape_option
+            ]
+        ]
 
         cmds.setParent(blendshape_weights_layout)
+        # Queries the scene's deformers again button
+        refresh_deformers_button = cmds.button(
+            label="Refresh Deformers", 
+            command=lambda *args: self.fill_deformer_menus(refresh=True), 
+            annotation="Lists the scene's deformers again, only the "
+            "deformers on the base geo are listed when it is set",
+        )
         # Copy weights method
         self.copy_method_option = self.option_menu_grp(
-            label="Method:", items=["Copy Weights", "Inverse Mask"]
+            label="Method:", items=list(WEIGHT_METHODS) + ["Expression"]
+        )
+        # Chain of weight operations used by the expression method
+        self.weight_expression_field = cmds.textFieldGrp(
+            label="Expression:", 
+            text="inverse; clamp 0 1", 
+            annotation="Operations run in order on the source deformer's "
+            "weights, separated by ';'. Available: copy, inverse, "
+            "multiply <map|value>, add <map|value>, clamp <low> <high>, "
+            "remap <old min> <old max> <new min> <new max>. "
+            "Maps are written as deformer[index], e.g. blendShape1[2]",
         )
         # Transfer weights button
         transfer_deformer_weights_button = cmds.button(
             label="Transfer", command=self.copy_and_inverse_blendshape_weights
         )
+        # Transfer every target between blendshapes button
+        transfer_targets_button = cmds.button(
+            label="Transfer Targets", 
+            command=self.transfer_blendshape_targets, 
+            annotation="Transfers every target and mask of the source "
+            "blendshape onto the target blendshape, matching the vertices "
+            "by closest point so the meshes can have different topologies",
+        )
+        cmds.setParent(main_layout)
+        cmds.separator(style="none", height=15)
+        # Symmetry section
+        symmetry_layout = cmds.frameLayout("Symmetry")
+        self.symmetry_axis_option = self.option_menu_grp(
+            label="Mirror Axis:", items=["x", "y", "z"]
+        )
+        self.symmetry_direction_option = self.option_menu_grp(
+            label="Direction:", items=["+ to -", "- to +"]
+        )
+        self.split_falloff_field = cmds.floatFieldGrp(
+            label="Split Falloff:", 
+            value1=1.0, 
+            annotation="Width of the blend across the centre line when "
+            "splitting targets into left and right",
+        )
+        cmds.rowColumnLayout(
+            numberOfColumns=3, 
+            columnWidth=[(i, self.window_width/3) for i in range(1, 4)],
+        )
+        # Mirrors the selected blendshape's targets button
+        mirror_targets_button = cmds.button(
+            label="Mirror Targets", 
+            command=lambda *args: self.mirror_targets(flip=False), 
+            annotation="Mirrors the selected channels, or every target of "
+            "the selected blendshape, across the mirror axis",
+        )
+        # Flips the selected blendshape's targets button
+        flip_targets_button = cmds.button(
+            label="Flip Targets", 
+            command=lambda *args: self.mirror_targets(flip=True), 
+            annotation="Swaps both sides of the selected channels, or of "
+            "every target of the selected blendshape",
+        )
+        # Splits the selected blendshape's targets button
+        split_targets_button = cmds.button(
+            label="Split Targets", 
+            command=self.split_targets, 
+            annotation="Splits the selected channels, or every target of the "
+            "selected blendshape, into L_ and R_ targets",
+        )
+        # Mirrors the source deformer's weights button
+        mirror_weights_button = cmds.button(
+            label="Mirror Weights", 
+            command=lambda *args: self.mirror_weights(flip=False), 
+            annotation="Mirrors the source deformer's weights on the base geo",
+        )
+        # Flips the source deformer's weights button
+        flip_weights_button = cmds.button(
+            label="Flip Weights", 
+            command=lambda *args: self.mirror_weights(flip=True), 
+            annotation="Flips the source deformer's weights on the base geo",
+        )
+        cmds.setParent(main_layout)
+        cmds.separator(style="none", height=15)
+        # Target library storage section
+        library_layout = cmds.frameLayout("Target Library")
+        self.library_compression_option = self.option_menu_grp(
+            label="Compression:", items=["None", "zlib", "lz4"]
+        )
+        self.library_tolerance_field = cmds.floatFieldGrp(
+            label="Tolerance:", 
+            value1=0.0, 
+            precision=6, 
+            annotation="Largest error allowed when Data Bake and Export "
+            "Shapes quantize the stored records to 16 bits, 0 keeps them "
+            "exact",
+        )
         cmds.setParent(main_layout)
         cmds.showWindow(self.window_name)
     
@@ -208,6 +5208,73 @@ class blendShapeManagerTool:
         [cmds.menuItem(label=item) for item in items]
         return option_menu_group
     
+    def deformer_menu_items(self, refresh=False):
+        """
+        Lists the deformers offered by the option menus from one cached 
+            scene query, filtered to the deformers on the base and target geo
+        :param refresh: bool, queries the scene again
+        :return list: option menu items
+        """
+        if refresh or self.deformer_cache is None:
+            self.deformer_cache = self.scene.list_nodes(WEIGHTED_DEFORMER_TYPES)
+        meshes = [
+            mesh 
+            for mesh in self.transfer_meshes() 
+            if mesh and self.scene.exists(mesh)
+        ]
+        if not meshes:
+            return ["----"] + self.deformer_cache
+        mesh_deformers = set()
+        for mesh in meshes:
+            mesh_deformers.update(self.scene.deformers(mesh))
+        return ["----"] + [
+            deformer 
+            for deformer in self.deformer_cache 
+            if deformer in mesh_deformers
+        ]
+
+    def transfer_meshes(self):
+        """
+        :return tuple: base geo and target geo of the weight transfer, the 
+            target geo is the base geo when left empty
+        """
+        mesh = cmds.textFieldGrp(
+            self.inverse_bs_base_geo_field, query=True, text=True
+        )
+        target_mesh = cmds.textFieldGrp(
+            self.transfer_target_geo_field, query=True, text=True
+        )
+        return mesh, target_mesh or mesh
+
+    def fill_deformer_menus(self, refresh=False):
+        """
+        Fills the source and target deformer menus, only when they were 
+            never filled, the base or target geo changed or a refresh is 
+            asked for
+        :param refresh: bool, queries the scene again
+        """
+        mesh = self.transfer_meshes()
+        if not refresh and mesh == self.deformer_menu_geo:
+            return
+        items = self.deformer_menu_items(refresh=refresh)
+        for option_menu in [
+            self.source_blendshape_option, self.target_blendshape_option
+        ]:
+            # Keeps the current choice when it is still listed
+            current = cmds.optionMenuGrp(option_menu, query=True, value=True)
+            old_items = cmds.optionMenuGrp(
+                option_menu, query=True, itemListLong=True
+            )
+            if old_items:
+                cmds.deleteUI(old_items)
+            [
+                cmds.menuItem(label=item, parent=f"{option_menu}|OptionMenu") 
+                for item in items
+            ]
+            if current in items:
+                cmds.optionMenuGrp(option_menu, edit=True, value=current)
+        self.deformer_menu_geo = mesh
+
     @create_separators
     def txt_grp(self, *args, **kwargs):
         """
@@ -235,80 +5302,203 @@ class blendShapeManagerTool:
             cmds.setParent('..')
         return txt_field_grp
     
+    @instrumented
+    @atomic()
     def copy_and_inverse_blendshape_weights(self, *args):
         """
-        Transfers blendshape mask weights
-        :return dictionary: new mask weights
+        Transfers blendshape mask weights
+        :return SparseWeights: new mask weights, without the default vertices
+        """
+        # Gets UI results
+        # Base geo that is used to get all the vertex weight values and 
+        # the geo the target deformer is on
+        mesh, target_mesh = self.transfer_meshes()
+        # Source deformer
+        source_blendshape = cmds.optionMenuGrp(
+            self.source_blendshape_option, query=True, value=True
+        )
+        # Source Deformer Index (Only looked at if source deformer is a blendshape)
+        source_index = cmds.intField(
+            self.source_blendshape_index_option, query=True, value=True
+        )
+        # Target deformer
+        target_blendshape = cmds.optionMenuGrp(
+            self.target_blendshape_option, query=True, value=True
+        )
+         # Target Deformer Index (Only looked at if target deformer is a blendshape)
+        target_index = cmds.intField(
+            self.target_blendshape_index_option, query=True, value=True
+        )
+        # Method in which the weights are copied over
+        weight_method = cmds.optionMenuGrp(
+            self.copy_method_option, query=True, value=True
+        )
+        if source_blendshape == "----" or target_blendshape == "----":
+            return
+        # Chain of operations typed in by the user
+        steps = None
+        if weight_method == "Expression":
+            steps = parse_weight_expression(
+                cmds.textFieldGrp(
+                    self.weight_expression_field, query=True, text=True
+                )
+            )
+        # Transfers the whole weight map in bulk
+        new_weights = transfer_deformer_weights(
+            self.scene, 
+            mesh, 
+            source_blendshape, 
+            source_index, 
+            target_blendshape, 
+            target_index,
+            method=weight_method,
+            steps=steps,
+            progress=True,
+            target_mesh=target_mesh,
+        )
+        # Display message confirming that the weights were transfered
+        # Target names of the logical indices, empty for other deformers
+        source_attr = target_attr = ""
+        if self.scene.node_type(source_blendshape) == "blendShape":
+            source_attr = self.scene.target_registry(source_blendshape).name(
+                source_index
+            ) or ""
+        if self.scene.node_type(target_blendshape) == "blendShape":
+            target_attr = self.scene.target_registry(target_blendshape).name(
+                target_index
+            ) or ""
+        # Maya command message to show results
+        MGlobal.displayInfo(f"{source_blendshape} {source_attr} was transfered to "
+            f"{target_blendshape} {target_attr} using {weight_method}".replace("  ", " ")
+        )
+    
+        return new_weights
+
+    @instrumented
+    @atomic()
+    def transfer_blendshape_targets(self, *args):
+        """
+        Transfers every target of the source blendshape onto the target 
+            blendshape, across meshes of any topology
+        :return list: names of the transferred targets
+        """
+        source_blendshape = cmds.optionMenuGrp(
+            self.source_blendshape_option, query=True, value=True
+        )
+        target_blendshape = cmds.optionMenuGrp(
+            self.target_blendshape_option, query=True, value=True
+        )
+        if source_blendshape == "----" or target_blendshape == "----":
+            return
+        for blendshape in [source_blendshape, target_blendshape]:
+            if self.scene.node_type(blendshape) != "blendShape":
+                cmds.error(f"'{blendshape}' is not a blendshape")
+        targets = transfer_targets_across_meshes(
+            self.scene, source_blendshape, target_blendshape
+        )
+        MGlobal.displayInfo(
+            f"{len(targets)} targets of {source_blendshape} were transfered "
+            f"to {target_blendshape}"
+        )
+        return targets
+
+    def symmetry_options(self):
+        """
+        :return tuple: mirror axis and direction chosen in the UI
+        """
+        axis = cmds.optionMenuGrp(
+            self.symmetry_axis_option, query=True, value=True
+        )
+        direction = cmds.optionMenuGrp(
+            self.symmetry_direction_option, query=True, value=True
+        )
+        return axis, 1 if direction == "+ to -" else -1
+
+    @instrumented
+    @atomic()
+    def mirror_targets(self, flip=False):
+        """
+        Mirrors or flips the selected channels, or every target, of the 
+            selected blendshape
+        :param flip: bool, swaps both sides instead of mirroring one
+        :return list: names of the mirrored targets
         """
-        # Gets UI results
-        # Base geo that is used to get all the vertex weight values
-        mesh = cmds.textFieldGrp(
-            self.inverse_bs_base_geo_field, query=True, text=True
+        selection = cmds.ls(selection=True, type="blendShape")
+        if not selection:
+            cmds.error("No blendshape selected")
+        axis, direction = self.symmetry_options()
+        targets = mirror_blendshape_targets(
+            self.scene, 
+            selection[0], 
+            targets=selected_channels() or None, 
+            axis=axis, 
+            direction=direction, 
+            flip=flip,
         )
-        # Source deformer
-        source_blendshape = cmds.optionMenuGrp(
-            self.source_blendshape_option, query=True, value=True
+        MGlobal.displayInfo(
+            f"{'Flipped' if flip else 'Mirrored'} {len(targets)} targets "
+            f"of {selection[0]}"
         )
-        # Source Deformer Index (Only looked at if source deformer is a blendshape)
-        source_index = cmds.intField(
-            self.source_blendshape_index_option, query=True, value=True
+        return targets
+
+    @instrumented
+    @atomic()
+    def split_targets(self, *args):
+        """
+        Splits the selected channels, or every target, of the selected 
+            blendshape into left and right targets
+        :return list: names of the new targets
+        """
+        selection = cmds.ls(selection=True, type="blendShape")
+        if not selection:
+            cmds.error("No blendshape selected")
+        axis, _ = self.symmetry_options()
+        falloff = cmds.floatFieldGrp(
+            self.split_falloff_field, query=True, value1=True
         )
-        # Target deformer
-        target_blendshape = cmds.optionMenuGrp(
-            self.target_blendshape_option, query=True, value=True
+        new_targets = split_blendshape_targets(
+            self.scene, 
+            selection[0], 
+            targets=selected_channels() or None, 
+            axis=axis, 
+            falloff=falloff,
         )
-         # Target Deformer Index (Only looked at if target deformer is a blendshape)
-        target_index = cmds.intField(
-            self.target_blendshape_index_option, query=True, value=True
+        MGlobal.displayInfo(
+            f"Split {len(new_targets) // 2} targets of {selection[0]}"
         )
-        # Method in which the weights are copied over
-        weight_method = cmds.optionMenuGrp(
-            self.copy_method_option, query=True, value=True
+        return new_targets
+
+    @instrumented
+    @atomic()
+    def mirror_weights(self, flip=False):
+        """
+        Mirrors or flips the source deformer's weights on the base geo
+        :param flip: bool, swaps both sides instead of mirroring one
+        :return SparseWeights: new weights, without the default vertices
+        """
+        mesh, _ = self.transfer_meshes()
+        deformer = cmds.optionMenuGrp(
+            self.source_blendshape_option, query=True, value=True
         )
-        # List of base geo verts
-        vertices = cmds.ls(f"{mesh}.vtx[*]", flatten=True)
-        if source_blendshape == "----" or target_blendshape == "----":
+        index = cmds.intField(
+            self.source_blendshape_index_option, query=True, value=True
+        )
+        if deformer == "----" or not mesh:
             return
-        
-        # Creates dictionary to store mask weights
-        weights_mask_dict = {}
-        for index, vertex in enumerate(vertices):
-            source_attribute = self.attribute_name(
-                source_blendshape, vertex=index, index=source_index
-            )
-            target_attribute = self.attribute_name(
-                target_blendshape, vertex=index, index=target_index
-            )
-            # Gets the current vertex's blendshape weights
-            current_value = cmds.getAttr(source_attribute)
-            # Determines the new value
-            if weight_method == "Inverse Mask":
-                new_value = 1 - current_value
-            else:
-                new_value = current_value
-            # Adds the current vertex weights to the weights_mask_dict dictionary
-            weights_mask_dict[index] = new_value 
-            # Sets the current vertex as the new value   
-            cmds.setAttr(target_attribute, new_value)
-        # Display message confirming that the weights were transfered
-        try: 
-            source_attr = cmds.listAttr(
-                f"{source_blendshape}.w", multi=True
-            )[source_index]
-        except ValueError:
-            source_attr = ""
-        try:
-            target_attr = cmds.listAttr(
-                f"{target_blendshape}.w", multi=True
-            )[target_index]
-        except ValueError:
-            target_attr = ""   
-        # Maya command message to show results
-        MGlobal.displayInfo(f"{source_blendshape} {source_attr} was transfered to "
-            f"{target_blendshape} {target_attr} using {weight_method}".replace("  ", " ")
+        axis, direction = self.symmetry_options()
+        weights = mirror_deformer_weights(
+            self.scene, 
+            mesh, 
+            deformer, 
+            index=index, 
+            axis=axis, 
+            direction=direction, 
+            flip=flip,
         )
-    
-        return weights_mask_dict
+        MGlobal.displayInfo(
+            f"{'Flipped' if flip else 'Mirrored'} the weights of {deformer}"
+        )
+        return weights
     
     def attribute_name(self, your_deformer, vertex, index):
         """
@@ -320,12 +5510,11 @@ class blendShapeManagerTool:
         opperate on (only applicable when the deformer type is a blendshape)
         :return string: Name of the attribute
         """
-        if cmds.nodeType(your_deformer) == "blendShape":
-            return (f"{your_deformer}.inputTarget[0]."
-                   f"inputTargetGroup[{index}].targetWeights[{vertex}]")
-        else:
-            return (f"{your_deformer}.weightList[0].weights[{vertex}]")
+        attribute = self.scene.weights_attribute(your_deformer, index=index)
+        return f"{attribute}[{vertex}]"
     
+    @instrumented
+    @atomic(evaluation="dg")
     def bake_shapes(self, *args):
         """
         Bakes shapes into separate geometry
@@ -333,43 +5522,139 @@ class blendShapeManagerTool:
         selection = cmds.ls(selection=True, type="blendShape")
         if not selection:
             cmds.error("Nothing selected")
-        
-        blendshape = selection[0]
-        # Search for the base geometry through the blendshape's connections 
-        geo = cmds.listConnections(f"{blendshape}.outputGeometry")[0]
-        
-        # While loop to find the base geo through any extra deformers in the input list
-        while cmds.nodeType(geo) != "transform":
-            geo = cmds.listConnections(
-                f"{geo}.outputGeometry"
-            )[0]
         # Gets any selected channels in the blendshape node
-        selected_targets = dash.getAllSelectedChannels()
+        return bake_blendshape_targets(
+            self.scene, selection[0], targets=selected_channels(), progress=True
+        )
+    
+    def library_options(self):
+        """
+        :return dict: compression and tolerance chosen in the UI for 
+            export_target_library
+        """
+        compression = cmds.optionMenuGrp(
+            self.library_compression_option, query=True, value=True
+        )
+        tolerance = cmds.floatFieldGrp(
+            self.library_tolerance_field, query=True, value1=True
+        )
+        return {
+            "compression": None if compression == "None" else compression, 
+            "tolerance": tolerance or None,
+        }
 
-        if not selected_targets:
-            targets = cmds.listAttr(f"{blendshape}.w", multi=True)
-        else:
-            targets = selected_targets
-        # Zeros all blendshape targets before baking
-        zero_all_targets = [cmds.setAttr(f"{blendshape}.{target}", 0) 
-            for target in targets
-        ]
-        new_shapes = []
-        for index, target in enumerate(targets):
-            cmds.setAttr(f"{blendshape}.{target}", 1)
-            new_geo = cmds.duplicate(geo, name=f"{target}_baked")[0]
-            local_pos = cmds.xform(
-                new_geo, query=True, translation=True, worldSpace=False
-            )
-            cmds.move(
-                local_pos[0]+(index+1)*25, *local_pos[1:3], new_geo
-            ) 
-            cmds.setAttr(f"{blendshape}.{target}", 0)
-            new_shapes.append(new_geo)
-        
-        MGlobal.displayInfo(f"Baked {len(new_shapes)}/{len(targets)} shapes")
+    @instrumented
+    def data_bake_shapes(self, *args):
+        """
+        Bakes every target of the selected blendshape to a library file, 
+            only building geometry for the selected channels
+        :return list: new geometry of the selected channels
+        """
+        selection = cmds.ls(selection=True, type="blendShape")
+        if not selection:
+            cmds.error("Nothing selected")
+        # Asks for the file before the scene's refresh and evaluation stop
+        path = cmds.fileDialog2(
+            fileFilter="Target Library (*.bstl)", fileMode=0, dialogStyle=2
+        )
+        if not path:
+            return
+        return self.data_bake_to_library(selection[0], path[0])
+
+    @atomic(evaluation="dg")
+    def data_bake_to_library(self, blendshape, path):
+        """
+        Bakes every target of a blendshape to a library file, see 
+            data_bake_shapes
+        :param blendshape: string, name of the blendshape
+        :param path: string, path of the library file
+        :return list: new geometry of the selected channels
+        """
+        library = export_target_library(
+            self.scene, path, blendshape, **self.library_options()
+        )
+        # Builds geometry only for the channels the artist asked to see
+        selected_targets = selected_channels() or []
+        deltas = {}
+        inbetweens = library.names("inbetweens")
+        for target in selected_targets:
+            deltas[target] = library.get(target)
+            if target not in inbetweens:
+                continue
+            items = library.record(target, "inbetweens")["items"]
+            for item, item_deltas in zip(
+                items, library.get(target, kind="inbetweens")
+            ):
+                deltas[inbetween_name(target, item)] = item_deltas
+        new_shapes = build_target_geometry(self.scene, blendshape, deltas)
+        MGlobal.displayInfo(
+            f"Baked {len(library.names('deltas'))} shapes to {path}, "
+            f"built {len(new_shapes)} shapes"
+        )
         return new_shapes
-    
+
+    @instrumented
+    def export_shapes(self, *args):
+        """
+        Exports the selected blendshape's targets and weight masks to 
+            a library file
+        :return string: path of the library file
+        """
+        selection = cmds.ls(selection=True, type="blendShape")
+        if not selection:
+            cmds.error("No blendshape selected")
+        path = cmds.fileDialog2(
+            fileFilter="Target Library (*.bstl)", fileMode=0, dialogStyle=2
+        )
+        if not path:
+            return
+        # Exports the selected channels, or every target
+        targets = selected_channels() or None
+        library = export_target_library(
+            self.scene, 
+            path[0], 
+            selection[0], 
+            targets=targets, 
+            **self.library_options(),
+        )
+        MGlobal.displayInfo(
+            f"Exported {len(library.names('deltas'))} shapes to {path[0]}"
+        )
+        return path[0]
+
+    @instrumented
+    def import_shapes(self, *args):
+        """
+        Imports targets and weight masks from a library file onto the 
+            selected blendshape
+        :return list: names of the imported records
+        """
+        selection = cmds.ls(selection=True, type="blendShape")
+        if not selection:
+            cmds.error("No blendshape selected")
+        # Asks for the file before the undo chunk opens
+        path = cmds.fileDialog2(
+            fileFilter="Target Library (*.bstl)", fileMode=1, dialogStyle=2
+        )
+        if not path:
+            return
+        return self.import_library(selection[0], path[0])
+
+    @atomic()
+    def import_library(self, blendshape, path):
+        """
+        Imports a library file onto a blendshape, see import_shapes
+        :param blendshape: string, name of the blendshape
+        :param path: string, path of the library file
+        :return list: names of the imported records
+        """
+        # Imports the selected channels, or every record
+        names = selected_channels() or None
+        imported = import_target_library(self.scene, path, blendshape, names=names)
+        MGlobal.displayInfo(f"Imported {len(imported)} shapes from {path}")
+        return imported
+
+    @instrumented
     def get_blendshape_channel_index(self, *args):
         """
         Prints out the index of a selected blendshape channel
@@ -380,17 +5665,14 @@ class blendShapeManagerTool:
         if not selected_blendshape:
             cmds.error("No blendshape selected")
         # Gets the selected channel
-        selected_channel = dash.getAllSelectedChannels()
+        selected_channel = selected_channels()
         if not selected_channel:
             cmds.error("No channel selected")
-        # Lists all the blendshape channels
-        all_blendshape_attrs = cmds.listAttr(
-            f"{selected_blendshape[0]}.w", multi=True
+        # Logical index of the channel, not its position in the channel list
+        index = self.scene.target_registry(selected_blendshape[0]).index(
+            selected_channel[0]
         )
-        # Checks if the selected channel is within the blendshape's attributes
-        if selected_channel[0] in all_blendshape_attrs:
-            index = all_blendshape_attrs.index(selected_channel[0])
-        
+        if index is not None:
             MGlobal.displayInfo(f"{selected_channel[0]}: {index}")
             return index
     
@@ -419,10 +5701,13 @@ class blendShapeManagerTool:
         else:
             cmds.textFieldGrp(element, edit=True, text=selected[0])
     
+    @instrumented
+    @atomic()
     def hookup_combination_shape(self, *args):
         """
         Hooks up a corrective shape based on the active blendshape 
             channels on the blendshape node
+        :return string: new combination shape node
         """
         # Gets all UI results
         blendshape = cmds.textFieldGrp(
@@ -437,95 +5722,173 @@ class blendShapeManagerTool:
         replace_with = cmds.textFieldGrp(
             self.comb_shape_replace_field, query=True, text=True
         )
-        # Lists the blendshape attributes
-        blendshape_attributes = cmds.listAttr(f"{blendshape}.w", multi=True)
-        if cmds.attributeQuery(driven_shape, node=blendshape, exists=True) is False:
-            cmds.error("Can't find the combination shape geo in the blendshape node")
-            return
-        # Error check
-        [cmds.error(f"Object '{object}' does not exist") 
-            for object in [blendshape, driven_shape] 
-            if not cmds.objExists(object)
-        ]
-        if cmds.nodeType(blendshape) != "blendShape":
-            cmds.error(f"'{blendshape}' is not a blendshape")
-        # Gets all blendshape channels that are equal to 1
-        active_attrs = [
-            attr 
-            for attr in blendshape_attributes 
-            if cmds.getAttr(f"{blendshape}.{attr}") == 1
-        ]
-        # Creates combination shape node
-        cs_node = cmds.createNode(
-            "combinationShape", name=driven_shape.replace(look_for, replace_with)
+        return create_combination_shape(
+            self.scene, 
+            blendshape, 
+            driven_shape, 
+            look_for=look_for, 
+            replace_with=replace_with,
         )
-        # Connects the blendshape channels into the combination shape node
-        [cmds.connectAttr(f"{blendshape}.{attr}", f"{cs_node}.inputWeight[{index}]") 
-            for index, attr in enumerate(active_attrs)
-        ]
-        # Connects the output of the combination shape node into the driven shape
-        cmds.connectAttr(f"{cs_node}.outputWeight", f"{blendshape}.{driven_shape}")
     
+    @instrumented
+    @atomic(evaluation="dg")
+    def batch_hookup_combination_shapes(self, *args):
+        """
+        Hooks up every combination target of the blendshape node from 
+            the naming rules
+        :return dictionary: new combination shape node keyed by driven target
+        """
+        # Gets all UI results
+        blendshape = cmds.textFieldGrp(
+            self.blendshape_node_field, query=True, text=True
+        )
+        look_for = cmds.textFieldGrp(
+            self.comb_shape_look_for_field, query=True, text=True
+        )
+        replace_with = cmds.textFieldGrp(
+            self.comb_shape_replace_field, query=True, text=True
+        )
+        separator = cmds.textFieldGrp(
+            self.comb_shape_separator_field, query=True, text=True
+        )
+        if not self.scene.exists(blendshape):
+            cmds.error(f"Object '{blendshape}' does not exist")
+        created = batch_create_combination_shapes(
+            self.scene, 
+            blendshape, 
+            look_for, 
+            replace_with=replace_with, 
+            separator=separator or "_",
+        )
+        MGlobal.displayInfo(f"Hooked up {len(created)} combination shapes")
+        return created
+
+    @instrumented
+    def check_combination_shapes(self, *args):
+        """
+        Reports the conflicting and double firing combination shapes of 
+            the blendshape node
+        :return dictionary: the report of check_combinations
+        """
+        blendshape = cmds.textFieldGrp(
+            self.blendshape_node_field, query=True, text=True
+        )
+        if not self.scene.exists(blendshape):
+            cmds.error(f"Object '{blendshape}' does not exist")
+        report = check_combinations(self.scene, blendshape)
+        for names in report["duplicates"]:
+            cmds.warning(f"Combinations of the same targets: {', '.join(names)}")
+        for combination, nested, poses in report["double_firing"]:
+            cmds.warning(f"{combination} fires on top of {nested}")
+        if report["cycles"]:
+            cmds.warning(
+                f"Combinations driven in a cycle: {', '.join(report['cycles'])}"
+            )
+        MGlobal.displayInfo(
+            f"Checked {len(report['counts'])} combination shapes, "
+            f"{len(report['duplicates'])} duplicates, "
+            f"{len(report['double_firing'])} double firing pairs, "
+            f"{len(report['cycles'])} cycles"
+        )
+        return report
+
+    @instrumented
+    @atomic()
     def bake_current_pose(self, *args):
         """
         Bakes the current pose of the selected objects and cleans it
+        :return list: new geometry
         """
-        selection = cmds.ls(selection=True)
-        for object in selection:
-            object_shapes = cmds.listRelatives(object, shapes=True)
-            [    
-                object_shapes.remove(node) 
-                for node in object_shapes 
-                if node[-4:] == "Orig"
-            ]
-            object_instance = cmds.instance(object_shapes)
-            cmds.duplicate(object_instance, name=f"{object}_baked")
-            cmds.delete(object_instance)
+        new_geos = bake_current_poses(self.scene, cmds.ls(selection=True))
+        self.report_cleaned(clean_objects(self.scene, new_geos))
+        return new_geos
             
+    @instrumented
+    @atomic()
     def clean_object(self, *args):
         """
         Unlocks main attrs and deletes any unimportant attrs
+        :return dictionary: deleted attributes keyed by object
         """
-        selection = cmds.ls(selection=True)
-        # All main attributes
-        main_attrs = [
-            'visibility', 
-            'translateX', 
-            'translateY', 
-            'translateZ', 
-            'rotateX', 
-            'rotateY', 
-            'rotateZ', 
-            'scaleX', 
-            'scaleY', 
-            'scaleZ'
-        ]
-        # Deletes any other attributes than the main attrs and sets the main attrs to unlocked
-        for object in selection:
-            other_attrs = cmds.listAttr(object, keyable=True)
-            if other_attrs:
-                [
-                    cmds.deleteAttr(f"{object}.{attr}") 
-                    for attr in other_attrs 
-                    if attr not in main_attrs
-                ]
-                
-            [
-                cmds.setAttr(f"{object}.{attr}", lock=False, keyable=True) 
-                for attr in main_attrs
-            ]
+        removed = clean_objects(self.scene, cmds.ls(selection=True))
+        self.report_cleaned(removed)
+        return removed
+
+    def report_cleaned(self, removed):
+        """
+        Prints the attributes deleted from each object
+        :param removed: dictionary, deleted attributes keyed by object
+        """
+        for object, attrs in removed.items():
+            if attrs:
+                MGlobal.displayInfo(f"{object}: removed {', '.join(attrs)}")
+        MGlobal.displayInfo(
+            f"Cleaned {len(removed)} objects, removed "
+            f"{sum(len(attrs) for attrs in removed.values())} attributes"
+        )
         
+    @instrumented
+    @atomic()
+    def batch_invert_shapes(self, *args):
+        """
+        Inverts every selected corrective against the base geo and writes 
+            them into the blendshape node as targets named after them. 
+            Correctives with a 'poseWeight' attribute are written as an 
+            in-between of the target in their 'poseTarget' attribute
+        :return dictionary: (vertex_count, 3) deltas keyed by target name, 
+            or by (target name, weight) for in-betweens
+        """
+        base_geo = cmds.textFieldGrp(self.base_geo_field, query=True, text=True)
+        blendshape = cmds.textFieldGrp(
+            self.blendshape_node_field, query=True, text=True
+        )
+        [cmds.error(f"Object '{object}' does not exist") 
+            for object in [base_geo, blendshape] 
+            if not cmds.objExists(object)
+        ]
+        selection = cmds.ls(selection=True)
+        if not selection:
+            cmds.error("No correctives selected")
+        current_frame = cmds.currentTime(query=True)
+        # Each corrective is inverted at the frame it was sculpted on
+        correctives = {}
+        for corrective in selection:
+            key = corrective
+            # In-betweens name the target and weight they are inverted into
+            if cmds.attributeQuery("poseWeight", node=corrective, exists=True):
+                target = corrective
+                if cmds.attributeQuery("poseTarget", node=corrective, exists=True):
+                    target = cmds.getAttr(f"{corrective}.poseTarget") or corrective
+                key = (target, cmds.getAttr(f"{corrective}.poseWeight"))
+            correctives[key] = (
+                corrective, 
+                cmds.getAttr(f"{corrective}.poseFrame") 
+                if cmds.attributeQuery("poseFrame", node=corrective, exists=True) 
+                else current_frame,
+            )
+        # Solved in this process unless the batch is big enough for a pool
+        deltas = batch_invert_correctives(
+            self.scene, blendshape, base_geo, correctives
+        )
+        MGlobal.displayInfo(f"Inverted {len(deltas)} correctives into {blendshape}")
+        return deltas
+
+    @instrumented
     def invert_shape_skinned(self, *args):
         """
         Inverts just skinned geo, will not work with blendshapes or other deformers
+        :return numpy.ndarray: (vertex_count, 3) delta before skinning
         """
         try:
             corrective_shape_geo, base_skinned_geo = cmds.ls(selection=True)
         except ValueError as v:
             cmds.error(f"Select corrective shape and the base geo (in pose), {v}")
-        # Runs the invert shape maya command
-        cmds.invertShape()
+        if not self.scene.skin_cluster(base_skinned_geo):
+            cmds.error(f"'{base_skinned_geo}' is not skinned")
+        return self.get_delta()
     
+    @instrumented
+    @atomic()
     def zero_blendshape_weights(self, *args):
         """
         Zeros out any unlocked or non connected channels in an 
@@ -534,86 +5897,812 @@ class blendShapeManagerTool:
         selection = cmds.ls(selection=True)
         if not selection:
             cmds.warning("Nothing selected")
-        for object in selection:
-            # Gets any deformers on the current object
-            object_deformers = cmds.findDeformers(object)
-            if not object_deformers:
-                cmds.warning(f"'{object}' does not contain any blendshape nodes")
-                continue
-            # Filters out the blendshape nodes
-            object_blendshapes = [
-                node 
-                for node in object_deformers 
-                if cmds.nodeType(node) == "blendShape"
-            ]
-            if not object_blendshapes:
-                cmds.warning(f"'{object}' does not contain any blendshape nodes")
-                continue
-            # For each blendshape node, checks to see what channels are avalible to zero out
-            for object_blendshape in object_blendshapes:
-                blendshape_weights = cmds.listAttr(f"{object_blendshape}.w", multi=True)
-                weights_to_zero = [
-                    weight 
-                    for weight in blendshape_weights 
-                    if cmds.getAttr(f"{object_blendshape}.{weight}") != 0
-                ]
-                
-                for weight in weights_to_zero:
-                    first_connection = cmds.listConnections(
-                        f"{object_blendshape}.{weight}", 
-                        source=True, 
-                        destination=False, 
-                        plugs=True, 
-                        skipConversionNodes=True,
-                    )
-                    if first_connection is None:
-                        cmds.setAttr(f"{object_blendshape}.{weight}", 0)
-                        continue
+            return []
+        # Keeps the previous values so they can be restored
+        self.zero_snapshot = {}
+        return zero_blendshape_targets(
+            self.scene, selection, snapshot=self.zero_snapshot
+        )
+
+    @instrumented
+    @atomic()
+    def zero_scene_blendshape_weights(self, *args):
+        """
+        Zeros out any unlocked or non connected channels of every 
+            blendshape node in the scene
+        :return list: channels that were zeroed
+        """
+        self.zero_snapshot = {}
+        zeroed = zero_blendshape_targets(self.scene, snapshot=self.zero_snapshot)
+        MGlobal.displayInfo(f"Zeroed {len(zeroed)} channels")
+        return zeroed
+
+    @instrumented
+    @atomic()
+    def restore_blendshape_weights(self, *args):
+        """
+        Restores the channels zeroed by the last zero
+        :return int: number of restored channels
+        """
+        restored = restore_blendshape_weights(self.scene, self.zero_snapshot)
+        self.zero_snapshot = {}
+        MGlobal.displayInfo(f"Restored {restored} channels")
+        return restored
+
+    def toggle_profiling(self, *args):
+        """
+        Starts recording the commands made by the tool's operations, or 
+            stops and prints the report to the script editor
+        :return dictionary: report of the recorded operations when stopping
+        """
+        if _instrumentation is None:
+            cmds.button(
+                "profile_operations_button", edit=True, label="Stop Profile"
+            )
+            enable_instrumentation()
+            return None
+        report = disable_instrumentation()
+        cmds.button("profile_operations_button", edit=True, label="Profile")
+        return report
+
+    def show_changes(self, *args):
+        """
+        Prints the weight maps and targets written since the last report
+        :return dictionary: report of SyncSnapshots.report
+        """
+        report = self.scene.sync_snapshots().report()
+        for change in report["changed"]:
+            name = change["node"]
+            if self.scene.exists(name) and self.scene.node_type(name) == "blendShape":
+                name = f"{name}.{self.scene.target_registry(name).name(change['index'])}"
+            MGlobal.displayInfo(
+                f"{name} {change['kind']}: {change['vertices']} vertices"
+            )
+        MGlobal.displayInfo(
+            f"{len(report['changed']) + report['dropped']} changed, "
+            f"{report['unchanged']} unchanged"
+        )
+        return report
 
+    @instrumented
+    @atomic()
     def get_delta(self, *args):
         """
         Gets the delta (difference) of the corrective shape and base deformed geometry 
             (deformers + skinned geo)
+        :return numpy.ndarray: (vertex_count, 3) delta before skinning, 
+            ready to be written into a target
         """
         try:
             corrective_shape_geo, base_geo = cmds.ls(selection=True)
         except ValueError as v:
             cmds.error(f"Select corrective shape and the base geo (in pose), {v}")
-        # Finds any deformers on the geo
-        base_geo_deformers = cmds.findDeformers(base_geo)
-        # Sets all their envolopes to zero
-        [
-            cmds.setAttr(f"{deformer_node}.envelope", 0) 
-            for deformer_node in base_geo_deformers
-        ]
-        # Creates new base geo
-        duplicated_base_geo = cmds.duplicate(base_geo, name="test")[0]
-        # Creates temporary blendshape to create the delta
-        temporary_blendshape = cmds.blendShape(
-            corrective_shape_geo, base_geo, duplicated_base_geo
-        )[0]
-        # Turn back on all the deformers
-        [
-            cmds.setAttr(f"{deformer_node}.envelope", 1) 
-            for deformer_node in base_geo_deformers
-        ]
-        # Set the temporary blendshape attrs accordingly 
-        cmds.setAttr(f"{temporary_blendshape}.{corrective_shape_geo}", 1)
-        cmds.setAttr(f"{temporary_blendshape}.{base_geo}", -1)
+        # Solves the delta in memory, without touching the scene
+        delta = invert_corrective(self.scene, corrective_shape_geo, base_geo)
         # Bake new delta geo
-        baked_delta = cmds.duplicate(
-            duplicated_base_geo, name=f"{corrective_shape_geo}_inverted_shape"
+        baked_delta = self.scene.duplicate(
+            base_geo, 
+            f"{corrective_shape_geo}_inverted_shape", 
+            points=self.scene.original_points(base_geo) + delta,
         )
-        # Delete unimportant nodes
-        cmds.delete(duplicated_base_geo, temporary_blendshape)
         # Parent under the world
         try:
             cmds.parent(baked_delta, world=True)
         except RuntimeError:
             pass
         # Clean the new delta shape
-        cmds.select(baked_delta)
-        self.clean_object()
+        clean_objects(self.scene, [baked_delta])
+        return delta
+
+
+class CountingScene:
+    """
+    Wraps a scene and counts the scene commands an operation makes
+    """
+    def __init__(self, scene):
+        """
+        :param scene: SceneAccess, scene the calls are forwarded to
+        """
+        self.scene = scene
+        self.calls = {}
+        self._target_registries = {}
+        self._sync_snapshots = None
+        self._mesh_caches = {}
+
+    # Built against the wrapper, so the queries they make are counted too
+    target_registry = SceneAccess.target_registry
+    sync_snapshots = SceneAccess.sync_snapshots
+    cached = SceneAccess.cached
+    close = SceneAccess.close
+
+    def __getattr__(self, name):
+        attribute = getattr(self.scene, name)
+        if not callable(attribute):
+            return attribute
+
+        def counted(*args, **kwargs):
+            self.calls[name] = self.calls.get(name, 0) + 1
+            return attribute(*args, **kwargs)
+        return counted
+
+    def call_count(self):
+        """
+        :return int: total number of scene commands made
+        """
+        return sum(self.calls.values())
+
+
+def grid_topology(rows, columns):
+    """
+    Builds the quad topology of a flat grid
+    :param rows: int, number of vertex rows
+    :param columns: int, number of vertex columns
+    :return tuple: polygon vertex counts and polygon vertex indices
+    """
+    corners = (
+        np.arange(rows - 1)[:, None] * columns + np.arange(columns - 1)
+    ).ravel()
+    polygon_connects = np.column_stack(
+        (corners, corners + 1, corners + columns + 1, corners + columns)
+    ).ravel()
+    return np.full(len(corners), 4, dtype=np.int32), polygon_connects
+
+
+def synthetic_scene(vertex_count, target_count, coverage=0.01, seed=0):
+    """
+    Builds an in-memory scene with a grid mesh, a blendshape full of 
+        sparse targets and a cluster, the way a face rig would look
+    :param vertex_count: int, approximate number of vertices of the mesh
+    :param target_count: int, number of blendshape targets
+    :param coverage: float, fraction of the vertices each target moves
+    :param seed: int, seed of the random deltas
+    :return MemoryScene: the scene, with 'body', 'body_bs' and 'body_cluster'
+    """
+    random = np.random.default_rng(seed)
+    side = max(2, int(round(np.sqrt(vertex_count))))
+    rows, columns = np.divmod(np.arange(side * side), side)
+    points = np.column_stack(
+        (columns, np.zeros(side * side), rows)
+    ).astype(np.float64)
+    scene = MemoryScene()
+    scene.create_mesh("body", points, *grid_topology(side, side))
+    scene.create_deformer("blendShape", "body_bs", "body")
+    scene.create_deformer("cluster", "body_cluster", "body")
+    moved_count = max(1, int(len(points) * coverage))
+    for target in range(target_count):
+        index = scene.add_target("body_bs", f"target_{target}")
+        # Each target moves one region of the mesh
+        first = random.integers(0, len(points) - moved_count + 1)
+        scene.set_target_points(
+            "body_bs", 
+            index, 
+            np.arange(first, first + moved_count), 
+            random.normal(scale=0.1, size=(moved_count, 3)),
+        )
+    # Painted mask on the first target
+    scene.set_weight_range(
+        "body_bs", 0, 0, random.random(len(points) // 2), node_type="blendShape"
+    )
+    return scene
+
+
+def _benchmark_transfer(scene):
+    return transfer_deformer_weights(
+        scene, "body", "body_bs", 0, "body_cluster", 0, method="Inverse Mask"
+    )
+
+
+def _benchmark_bake(scene):
+    return bake_blendshape_targets(scene, "body_bs")
+
+
+def _setup_zero(scene):
+    for target in scene.target_indices("body_bs"):
+        scene.set_attr(f"body_bs.{target}", 0.5)
+
+
+def _benchmark_zero(scene):
+    return zero_blendshape_targets(scene, ["body"])
+
+
+def _setup_hookup(scene):
+    for target in list(scene.target_indices("body_bs"))[:2]:
+        scene.set_attr(f"body_bs.{target}", 1)
+
+
+def _benchmark_hookup(scene):
+    return create_combination_shape(
+        scene, "body_bs", scene.target_registry("body_bs").names()[-1]
+    )
+
+
+# Operation run by each benchmark, keyed by the UI method it stands for
+BENCHMARK_OPERATIONS = {
+    "copy_and_inverse_blendshape_weights": _benchmark_transfer,
+    "bake_shapes": _benchmark_bake,
+    "zero_blendshape_weights": _benchmark_zero,
+    "hookup_combination_shape": _benchmark_hookup,
+}
+
+# Scene preparation of the benchmarks that need more than the synthetic 
+# scene, done before the measurement starts
+BENCHMARK_SETUPS = {
+    "zero_blendshape_weights": _setup_zero,
+    "hookup_combination_shape": _setup_hookup,
+}
+
+
+def benchmark_operation(operation, vertex_count, target_count, repeat=1):
+    """
+    Runs one operation end to end on fresh synthetic scenes
+    :param operation: string, key of BENCHMARK_OPERATIONS
+    :param vertex_count: int, approximate number of vertices of the mesh
+    :param target_count: int, number of blendshape targets
+    :param repeat: int, number of runs, the fastest one is kept
+    :return dictionary: wall time, peak memory and scene command calls
+    """
+    import tracemalloc
+    result = None
+    for run in range(repeat):
+        # Builds the scene outside of the measurement
+        scene = synthetic_scene(vertex_count, target_count)
+        if operation in BENCHMARK_SETUPS:
+            BENCHMARK_SETUPS[operation](scene)
+        scene = CountingScene(scene)
+        tracemalloc.start()
+        start = time.perf_counter()
+        BENCHMARK_OPERATIONS[operation](scene)
+        seconds = time.perf_counter() - start
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        if result is None or seconds < result["seconds"]:
+            result = {
+                "operation": operation, 
+                "vertices": scene.scene.vertex_count("body"), 
+                "targets": target_count, 
+                "seconds": seconds, 
+                "peak_bytes": peak_bytes, 
+                "calls": scene.call_count(), 
+                "calls_by_command": dict(scene.calls),
+            }
+    return result
+
+
+def run_benchmarks(
+    vertex_counts=(1000, 10000, 100000, 1000000), 
+    target_counts=(10, 100, 1000), 
+    operations=None, 
+    repeat=1, 
+    max_baked_points=100000000,
+):
+    """
+    Benchmarks operations across mesh sizes and target counts
+    :param vertex_counts: list, approximate mesh sizes
+    :param target_counts: list, numbers of blendshape targets
+    :param operations: list, keys of BENCHMARK_OPERATIONS, all when not given
+    :param repeat: int, number of runs of each case, the fastest one is kept
+    :param max_baked_points: int, bake cases building this many points or 
+        more are skipped, every target becomes a whole mesh in memory
+    :return dictionary: json serializable results of every case
+    """
+    results = []
+    for operation in operations or BENCHMARK_OPERATIONS:
+        for vertex_count in vertex_counts:
+            for target_count in target_counts:
+                if (operation == "bake_shapes" 
+                    and vertex_count * target_count >= max_baked_points):
+                    results.append({
+                        "operation": operation, 
+                        "vertices": vertex_count, 
+                        "targets": target_count, 
+                        "skipped": "too many baked points",
+                    })
+                    continue
+                results.append(benchmark_operation(
+                    operation, vertex_count, target_count, repeat=repeat
+                ))
+    return {
+        "python": sys.version.split()[0], 
+        "numpy": np.__version__, 
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"), 
+        "results": results,
+    }
+
+
+def compare_benchmarks(results, baseline):
+    """
+    Compares benchmark results with an earlier run
+    :param results: dictionary, results of run_benchmarks
+    :param baseline: dictionary, earlier results of run_benchmarks
+    :return list: time, memory and call ratios of the cases both runs share
+    """
+    def key(result):
+        return result["operation"], result["vertices"], result["targets"]
+
+    baseline_results = {
+        key(result): result 
+        for result in baseline["results"] 
+        if "skipped" not in result
+    }
+    comparison = []
+    for result in results["results"]:
+        if "skipped" in result or key(result) not in baseline_results:
+            continue
+        previous = baseline_results[key(result)]
+        comparison.append({
+            "operation": result["operation"], 
+            "vertices": result["vertices"], 
+            "targets": result["targets"], 
+            "time_ratio": result["seconds"] / max(previous["seconds"], 1e-9), 
+            "memory_ratio": result["peak_bytes"] / max(previous["peak_bytes"], 1), 
+            "calls_ratio": result["calls"] / max(previous["calls"], 1),
+        })
+    return comparison
+
+
+def build_parser():
+    """
+    Builds the command line interface used to run the tool headless
+    :return argparse.ArgumentParser: the parser
+    """
+    parser = argparse.ArgumentParser(
+        prog="blendshape_manager_tool", 
+        description="Runs blendshape manager operations on scene files in mayapy",
+    )
+    parser.add_argument(
+        "--scene", 
+        dest="scenes", 
+        action="append", 
+        default=[], 
+        help="scene file to process, can be given several times",
+    )
+    parser.add_argument(
+        "--scene-list", help="text file listing one scene file per line"
+    )
+    parser.add_argument(
+        "--workers", 
+        type=int, 
+        default=1, 
+        help="number of mayapy processes the scenes are spread across",
+    )
+    parser.add_argument(
+        "--save", action="store_true", help="saves each scene after the operation"
+    )
+    parser.add_argument(
+        "--report", help="writes the json timing report to this file"
+    )
+    operations = parser.add_subparsers(dest="operation", required=True)
+    # Batch bake
+    bake = operations.add_parser("bake", help="bakes blendshape targets")
+    bake.add_argument("--blendshape", required=True)
+    bake.add_argument("--targets", nargs="+")
+    bake.add_argument(
+        "--library", 
+        help="writes the targets to this library file instead of building "
+        "geometry, '{scene}' is replaced by the scene name",
+    )
+    bake.add_argument(
+        "--compression", 
+        choices=["zlib", "lz4"], 
+        help="compresses the library records",
+    )
+    bake.add_argument(
+        "--tolerance", 
+        type=float, 
+        help="stores the library records sparse and quantized to 16 bits "
+        "within this error",
+    )
+    # Weight transfer
+    transfer = operations.add_parser("transfer", help="transfers deformer weights")
+    transfer.add_argument("--mesh", required=True)
+    transfer.add_argument("--source", required=True)
+    transfer.add_argument("--source-index", type=int, default=0)
+    transfer.add_argument("--target", required=True)
+    transfer.add_argument("--target-index", type=int, default=0)
+    transfer.add_argument(
+        "--method", default="Copy Weights", choices=list(WEIGHT_METHODS)
+    )
+    transfer.add_argument(
+        "--expression", help="chain of weight operations, overrides --method"
+    )
+    transfer.add_argument(
+        "--target-mesh", 
+        help="mesh of the target deformer when it's not --mesh, the weights "
+        "are mapped by closest point so the topologies can differ",
+    )
+    transfer.add_argument(
+        "--targets", 
+        action="store_true", 
+        help="transfers every target and mask of the source blendshape "
+        "onto the target blendshape instead of one weight map",
+    )
+    # Zero shapes
+    zero = operations.add_parser("zero", help="zeros free blendshape channels")
+    zero.add_argument(
+        "--objects", nargs="+", help="every blendshape is zeroed when not given"
+    )
+    # Hookup correctives
+    hookup = operations.add_parser("hookup", help="hooks up a combination shape")
+    hookup.add_argument("--blendshape", required=True)
+    hookup.add_argument(
+        "--driven", 
+        help="target to hook up, every combination target is hooked up "
+        "from its name when not given",
+    )
+    hookup.add_argument("--drivers", nargs="+")
+    hookup.add_argument("--separator", default="_")
+    hookup.add_argument("--look-for", default="corrective_delta")
+    hookup.add_argument("--replace-with", default="cs")
+    # Offline combination evaluation
+    evaluate = operations.add_parser(
+        "evaluate", help="checks a combination network without evaluating the scene"
+    )
+    evaluate.add_argument("--blendshape", required=True)
+    evaluate.add_argument(
+        "--poses", 
+        help="json file of poses, each a dictionary of target weights. One "
+        "pose per combination with its drivers at 1 when not given",
+    )
+    evaluate.add_argument("--threshold", type=float, default=1e-3)
+    evaluate.add_argument(
+        "--points", help="writes the evaluated points of the poses to this .npy file"
+    )
+    # Symmetry
+    mirror = operations.add_parser(
+        "mirror", help="mirrors, flips or splits blendshape targets"
+    )
+    mirror.add_argument("--blendshape", required=True)
+    mirror.add_argument("--targets", nargs="+")
+    mirror.add_argument("--axis", default="x", choices=list(SYMMETRY_AXES))
+    mirror.add_argument(
+        "--direction", 
+        type=int, 
+        default=1, 
+        choices=[1, -1], 
+        help="1 mirrors the positive side onto the negative side",
+    )
+    mode = mirror.add_mutually_exclusive_group()
+    mode.add_argument("--flip", action="store_true")
+    mode.add_argument(
+        "--split", action="store_true", help="splits into L_ and R_ targets"
+    )
+    mirror.add_argument("--falloff", type=float, default=1.0)
+    # Inversion
+    invert = operations.add_parser("invert", help="inverts correctives")
+    invert.add_argument("--blendshape", required=True)
+    invert.add_argument("--base", required=True)
+    invert.add_argument(
+        "--correctives", 
+        nargs="+", 
+        required=True, 
+        help="corrective geometry, as 'name' or 'name@frame', followed by "
+        "'=target:weight' to invert it into an in-between of another target",
+    )
+    invert.add_argument(
+        "--pose-workers", type=int, default=1, help="processes solving the poses"
+    )
+    # Benchmarks
+    benchmark = operations.add_parser(
+        "benchmark", help="benchmarks the operations on in-memory scenes"
+    )
+    benchmark.add_argument(
+        "--vertices", nargs="+", type=int, default=[1000, 10000, 100000, 1000000]
+    )
+    benchmark.add_argument("--targets", nargs="+", type=int, default=[10, 100, 1000])
+    benchmark.add_argument(
+        "--operations", nargs="+", choices=list(BENCHMARK_OPERATIONS)
+    )
+    benchmark.add_argument("--repeat", type=int, default=1)
+    benchmark.add_argument("--output", help="writes the json results to this file")
+    benchmark.add_argument("--baseline", help="json results to compare against")
+    # Kept so an operation's command line can be rebuilt for other processes
+    parser.operation_parsers = operations.choices
+    return parser
+
+
+def operation_command_line(parser, arguments):
+    """
+    Rebuilds the command line of the parsed operation from its arguments,
+        rather than slicing the original command line
+    :param parser: argparse.ArgumentParser, parser from build_parser
+    :param arguments: argparse.Namespace, parsed command line
+    :return list: operation name followed by its options
+    """
+    command_line = [arguments.operation]
+    for action in parser.operation_parsers[arguments.operation]._actions:
+        if not action.option_strings or action.dest == "help":
+            continue
+        value = getattr(arguments, action.dest)
+        if value is None or value is False:
+            continue
+        option = action.option_strings[-1]
+        if value is True:
+            command_line.append(option)
+        elif isinstance(value, list):
+            command_line += [option] + [str(item) for item in value]
+        else:
+            # Joined so values starting with '-' aren't read as options
+            command_line.append(f"{option}={value}")
+    return command_line
+
+
+def run_benchmark_command(arguments):
+    """
+    Runs the benchmark suite from the command line
+    :param arguments: argparse.Namespace, parsed command line
+    :return int: exit code
+    """
+    results = run_benchmarks(
+        vertex_counts=arguments.vertices, 
+        target_counts=arguments.targets, 
+        operations=arguments.operations, 
+        repeat=arguments.repeat,
+    )
+    if arguments.baseline:
+        with open(arguments.baseline) as baseline_file:
+            results["comparison"] = compare_benchmarks(
+                results, json.load(baseline_file)
+            )
+    results_json = json.dumps(results, indent=2)
+    if arguments.output:
+        with open(arguments.output, "w") as output_file:
+            output_file.write(results_json)
+    print(results_json)
+    return 0
+
+
+def run_operation(arguments, scene_path, scene=None):
+    """
+    Runs the operation given on the command line in the open scene
+    :param arguments: argparse.Namespace, parsed command line
+    :param scene_path: string, path of the open scene
+    :param scene: SceneAccess, scene the operation runs in, Maya when not given
+    :return: json serializable summary of the result
+    """
+    if scene is None:
+        scene = MayaScene()
+    with scene.execution_context(arguments.operation):
+        return _run_operation(arguments, scene_path, scene)
+
+
+def _run_operation(arguments, scene_path, scene):
+    """
+    Dispatches the command line operation, see run_operation
+    """
+    if arguments.operation == "bake":
+        if arguments.library:
+            scene_name = os.path.splitext(os.path.basename(scene_path))[0]
+            library = export_target_library(
+                scene, 
+                arguments.library.replace("{scene}", scene_name), 
+                arguments.blendshape, 
+                targets=arguments.targets, 
+                compression=arguments.compression, 
+                tolerance=arguments.tolerance,
+            )
+            return {"library": library.path, "targets": library.names("deltas")}
+        return bake_blendshape_targets(
+            scene, arguments.blendshape, targets=arguments.targets
+        )
+    if arguments.operation == "transfer":
+        if arguments.targets:
+            return transfer_targets_across_meshes(
+                scene, arguments.source, arguments.target
+            )
+        steps = None
+        if arguments.expression:
+            steps = parse_weight_expression(arguments.expression)
+        weights = transfer_deformer_weights(
+            scene, 
+            arguments.mesh, 
+            arguments.source, 
+            arguments.source_index, 
+            arguments.target, 
+            arguments.target_index, 
+            method=arguments.method, 
+            steps=steps,
+            target_mesh=arguments.target_mesh,
+        )
+        return {"vertices": weights.size, "non_default": len(weights)}
+    if arguments.operation == "zero":
+        return zero_blendshape_targets(scene, arguments.objects)
+    if arguments.operation == "hookup":
+        if not arguments.driven:
+            return batch_create_combination_shapes(
+                scene, 
+                arguments.blendshape, 
+                arguments.look_for, 
+                replace_with=arguments.replace_with, 
+                separator=arguments.separator,
+            )
+        return create_combination_shape(
+            scene, 
+            arguments.blendshape, 
+            arguments.driven, 
+            look_for=arguments.look_for, 
+            replace_with=arguments.replace_with, 
+            drivers=arguments.drivers,
+        )
+    if arguments.operation == "evaluate":
+        poses = None
+        if arguments.poses:
+            with open(arguments.poses) as poses_file:
+                poses = json.load(poses_file)
+        report = check_combinations(
+            scene, arguments.blendshape, poses=poses, threshold=arguments.threshold
+        )
+        if arguments.points:
+            evaluator = CombinationEvaluator(scene, arguments.blendshape)
+            if poses is None:
+                _, poses = evaluator.combination_poses()
+            np.save(arguments.points, evaluator.points(poses))
+        return report
+    if arguments.operation == "mirror":
+        if arguments.split:
+            return split_blendshape_targets(
+                scene, 
+                arguments.blendshape, 
+                targets=arguments.targets, 
+                axis=arguments.axis, 
+                falloff=arguments.falloff,
+            )
+        return mirror_blendshape_targets(
+            scene, 
+            arguments.blendshape, 
+            targets=arguments.targets, 
+            axis=arguments.axis, 
+            direction=arguments.direction, 
+            flip=arguments.flip,
+        )
+    if arguments.operation == "invert":
+        correctives = {}
+        for corrective in arguments.correctives:
+            corrective, _, inbetween = corrective.partition("=")
+            name, _, frame = corrective.partition("@")
+            key = name
+            if inbetween:
+                target, _, weight = inbetween.partition(":")
+                key = (target, float(weight or 1.0))
+            correctives[key] = (
+                name, float(frame) if frame else scene.current_time()
+            )
+        deltas = batch_invert_correctives(
+            scene, 
+            arguments.blendshape, 
+            arguments.base, 
+            correctives, 
+            workers=arguments.pose_workers,
+        )
+        # In-betweens are reported the way they are given, 'target:weight'
+        return [
+            key if isinstance(key, str) else f"{key[0]}:{key[1]:g}" 
+            for key in deltas
+        ]
+
+
+def run_scenes(arguments):
+    """
+    Opens, processes and optionally saves each scene in this process
+    :param arguments: argparse.Namespace, parsed command line
+    :return list: timing report of each scene
+    """
+    import maya.standalone
+    maya.standalone.initialize(name="python")
+    reports = []
+    for scene in arguments.scenes:
+        report = {"scene": scene, "operation": arguments.operation}
+        start = time.perf_counter()
+        try:
+            cmds.file(scene, open=True, force=True)
+            report["open_seconds"] = time.perf_counter() - start
+            operation_start = time.perf_counter()
+            report["result"] = run_operation(arguments, scene)
+            report["operation_seconds"] = time.perf_counter() - operation_start
+            if arguments.save:
+                save_start = time.perf_counter()
+                cmds.file(save=True, force=True)
+                report["save_seconds"] = time.perf_counter() - save_start
+        except Exception as error:
+            report["error"] = str(error)
+        report["seconds"] = time.perf_counter() - start
+        reports.append(report)
+    return reports
+
+
+def fan_out_scenes(arguments, operation_argv):
+    """
+    Processes each scene in its own mayapy process, running at most 
+        arguments.workers processes at once
+    :param arguments: argparse.Namespace, parsed command line
+    :param operation_argv: list, command line of the operation itself
+    :return list: timing report of each scene
+    """
+    def run_scene_process(scene):
+        with tempfile.TemporaryDirectory() as report_directory:
+            report_path = os.path.join(report_directory, "report.json")
+            command = [
+                mayapy_executable(), 
+                "-m", 
+                "blendshape_manager_tool", 
+                "--scene", 
+                scene, 
+                "--report", 
+                report_path,
+            ]
+            if arguments.save:
+                command.append("--save")
+            completed = subprocess.run(
+                command + operation_argv, 
+                capture_output=True, 
+                text=True, 
+                env=environment,
+            )
+            if not os.path.exists(report_path):
+                return [{
+                    "scene": scene, 
+                    "operation": arguments.operation, 
+                    "error": completed.stderr.strip()[-2000:],
+                }]
+            with open(report_path) as report_file:
+                return json.load(report_file)["scenes"]
+
+    # Makes sure the mayapy processes can import this module
+    environment = dict(os.environ)
+    environment["PYTHONPATH"] = os.pathsep.join(filter(None, [
+        os.path.dirname(os.path.abspath(__file__)), 
+        environment.get("PYTHONPATH"),
+    ]))
+    # Threads only wait on the mayapy processes
+    with concurrent.futures.ThreadPoolExecutor(arguments.workers) as executor:
+        return [
+            report 
+            for reports in executor.map(run_scene_process, arguments.scenes) 
+            for report in reports
+        ]
+
+
+def main(argv=None):
+    """
+    Command line entry point, e.g. 
+        mayapy -m blendshape_manager_tool --scene a.mb --scene b.mb 
+        --workers 2 bake --blendshape face_bs --library /tmp/{scene}.bstl
+    :param argv: list, command line arguments, sys.argv when not given
+    :return int: exit code, 1 if any scene failed
+    """
+    if argv is None:
+        argv = sys.argv[1:]
+    parser = build_parser()
+    arguments = parser.parse_args(argv)
+    # Benchmarks run on in-memory scenes, no scene files involved
+    if arguments.operation == "benchmark":
+        return run_benchmark_command(arguments)
+    if arguments.scene_list:
+        with open(arguments.scene_list) as scene_list:
+            arguments.scenes += [line.strip() for line in scene_list if line.strip()]
+    if not arguments.scenes:
+        parser.error("no scenes given, use --scene or --scene-list")
+    start = time.perf_counter()
+    if arguments.workers > 1 and len(arguments.scenes) > 1:
+        reports = fan_out_scenes(
+            arguments, operation_command_line(parser, arguments)
+        )
+    else:
+        reports = run_scenes(arguments)
+    report = {
+        "operation": arguments.operation, 
+        "workers": arguments.workers, 
+        "seconds": time.perf_counter() - start, 
+        "scenes": reports,
+    }
+    report_json = json.dumps(report, indent=2, default=str)
+    if arguments.report:
+        with open(arguments.report, "w") as report_file:
+            report_file.write(report_json)
+    print(report_json)
+    return int(any("error" in scene_report for scene_report in reports))
+
 
 if __name__ == "__main__":
+    if is_mayapy() or cmds is None:
+        sys.exit(main())
     blendShapeManagerTool()
\ No newline at end of file
@@ -0,0 +1,348 @@
+"""
+Regression tests of the tool's hot paths, run against MemoryScene so they 
+    need neither Maya nor scene files
+"""
+import numpy as np
+import pytest
+
+import blendshape_manager_tool as tool
+
+
+def grid_scene(side=21, offset=0.0):
+    """
+    :param side: int, number of vertex rows and columns
+    :param offset: float, distance the grid is moved along x
+    :return MemoryScene: scene with a 'face' grid, centred on x = 0 when 
+        not offset, and a 'face_bs' blendshape
+    """
+    rows, columns = np.divmod(np.arange(side * side), side)
+    points = np.column_stack(
+        (columns - (side - 1) / 2.0 + offset, np.zeros(side * side), rows)
+    ).astype(np.float64)
+    scene = tool.MemoryScene()
+    scene.create_mesh("face", points, *tool.grid_topology(side, side))
+    scene.create_deformer("blendShape", "face_bs", "face")
+    return scene
+
+
+# Closest points
+def test_barycentric_inside_triangle():
+    a, b, c = np.eye(3)
+    point = 0.2 * a + 0.3 * b + 0.5 * c
+    coordinates = tool.closest_point_barycentric(point, a, b, c)
+    assert np.allclose(coordinates, (0.2, 0.3, 0.5))
+
+
+@pytest.mark.parametrize("point, expected", [
+    # Beyond a corner, on an edge and above the face
+    ((-1.0, -1.0, 0.0), (1.0, 0.0, 0.0)),
+    ((0.5, -1.0, 0.0), (0.5, 0.5, 0.0)),
+    ((0.25, 0.25, 3.0), (0.5, 0.25, 0.25)),
+])
+def test_barycentric_outside_triangle(point, expected):
+    a = np.array((0.0, 0.0, 0.0))
+    b = np.array((1.0, 0.0, 0.0))
+    c = np.array((0.0, 1.0, 0.0))
+    coordinates = tool.closest_point_barycentric(np.array(point), a, b, c)
+    assert np.allclose(coordinates, expected)
+
+
+@pytest.mark.parametrize("offset", [0.0, 0.3, 3.0, 500.0])
+def test_grid_nearest_matches_brute_force(offset):
+    random = np.random.default_rng(0)
+    points = random.normal(size=(2000, 3)) * (1.0, 1.0, 0.1)
+    queries = random.normal(size=(300, 3)) + (offset, 0.0, 0.0)
+    nearest, distances = tool.UniformGrid(points).nearest(queries)
+    brute = np.linalg.norm(queries[:, None] - points[None], axis=2)
+    assert np.allclose(distances, brute.min(axis=1))
+    assert np.allclose(brute[np.arange(len(queries)), nearest], distances)
+
+
+def test_grid_nearest_max_distance():
+    points = np.random.default_rng(0).normal(size=(1000, 3))
+    queries = np.concatenate((points[:10] + 1e-5, points[:10] + 100.0))
+    nearest, distances = tool.UniformGrid(points).nearest(
+        queries, max_distance=1e-3
+    )
+    assert (nearest[:10] == np.arange(10)).all()
+    assert (nearest[10:] == -1).all() and np.isinf(distances[10:]).all()
+
+
+def test_surface_index_closest_points():
+    scene = grid_scene(side=11)
+    points = scene.original_points("face")
+    index = tool.SurfaceIndex(points, *scene.topology("face"))
+    # Points above the grid project straight down onto it
+    queries = np.random.default_rng(0).uniform((-4, 0.5, 1), (4, 2, 9), (200, 3))
+    vertices, weights = index.closest_points(queries)
+    closest = np.einsum("mc,mci->mi", weights, points[vertices])
+    assert np.allclose(weights.sum(axis=1), 1.0)
+    assert np.allclose(closest, queries * (1, 0, 1))
+
+
+# Library encoding
+def test_library_quantized_within_tolerance(tmp_path):
+    random = np.random.default_rng(0)
+    deltas = np.zeros((2, 5000, 3), dtype=np.float32)
+    deltas[:, 100:400] = random.normal(scale=0.5, size=(2, 300, 3))
+    weights = np.ones(5000, dtype=np.float32)
+    weights[:50] = random.random(50)
+    library = tool.TargetLibrary.write(
+        str(tmp_path / "shapes.bstl"), 
+        5000, 
+        "00" * 16, 
+        [("smile", "deltas", deltas), ("smile", "weights", weights)], 
+        compression="zlib", 
+        tolerance=1e-4,
+    )
+    encoding = library.record("smile", "deltas")["encoding"]
+    assert encoding["count"] == 300 and encoding["scale"] is not None
+    assert np.abs(library.get("smile") - deltas).max() <= 1e-4
+    assert np.abs(library.get("smile", kind="weights") - weights).max() <= 1e-4
+
+
+def test_library_keeps_float32_over_tolerance(tmp_path):
+    deltas = np.zeros((1000, 3), dtype=np.float32)
+    deltas[0] = 1000.0
+    deltas[1] = 1e-3
+    library = tool.TargetLibrary.write(
+        str(tmp_path / "shapes.bstl"), 
+        1000, 
+        "00" * 16, 
+        [("smile", "deltas", deltas)], 
+        tolerance=1e-6,
+    )
+    # 16 bits can't hold both magnitudes, the values stay exact
+    assert library.record("smile", "deltas")["encoding"]["scale"] is None
+    assert np.array_equal(library.get("smile"), deltas)
+
+
+def test_library_without_encoding_is_version_1(tmp_path):
+    path = str(tmp_path / "shapes.bstl")
+    deltas = np.arange(30, dtype=np.float32).reshape(10, 3)
+    library = tool.TargetLibrary.write(
+        path, 10, "00" * 16, iter([("smile", "deltas", deltas)])
+    )
+    with open(path, "rb") as library_file:
+        assert library_file.read(8) == b"BSTL\x01\x00\x00\x00"
+    assert isinstance(library.get("smile"), np.memmap)
+    assert np.array_equal(library.get("smile"), deltas)
+
+
+# Symmetry
+def test_symmetry_map_pairs_mirrored_vertices():
+    scene = grid_scene()
+    points = scene.original_points("face")
+    mirror, centre = tool.symmetry_map(scene, "face")
+    assert np.array_equal(points[mirror], points * (-1, 1, 1))
+    assert np.array_equal(centre, points[:, 0] == 0)
+
+
+def test_symmetry_map_without_matches():
+    scene = grid_scene(offset=500.0)
+    mirror, centre = tool.symmetry_map(scene, "face")
+    assert (mirror == -1).all() and not centre.any()
+
+
+def test_symmetry_maps_are_cached_per_scene():
+    scene = grid_scene()
+    symmetry = tool.symmetry_map(scene, "face")
+    assert tool.symmetry_map(scene, "face") is symmetry
+    # Another scene's mesh of the same name doesn't reuse the map
+    mirror, _ = tool.symmetry_map(grid_scene(offset=500.0), "face")
+    assert (mirror == -1).all()
+    scene.set_points("face", scene.original_points("face") + (500.0, 0.0, 0.0))
+    mirror, _ = tool.symmetry_map(scene, "face")
+    assert (mirror == -1).all()
+
+
+def test_mirror_and_split_targets():
+    scene = grid_scene()
+    points = scene.original_points("face")
+    left = points[:, 0] > 0
+    deltas = np.where(left[:, None], (1.0, 2.0, 3.0), 0.0)
+    index = scene.add_target("face_bs", "smile")
+    scene.set_target_points("face_bs", index, np.arange(len(points)), deltas)
+    tool.mirror_blendshape_targets(scene, "face_bs")
+    mirrored = tool.get_target_deltas(scene, "face_bs", index, len(points))
+    assert np.allclose(mirrored[points[:, 0] < 0], (-1.0, 2.0, 3.0))
+    assert np.allclose(mirrored[left], (1.0, 2.0, 3.0))
+    tool.split_blendshape_targets(scene, "face_bs", targets=["smile"])
+    registry = scene.target_registry("face_bs")
+    halves = [
+        tool.get_target_deltas(scene, "face_bs", registry.index(name), len(points))
+        for name in ("L_smile", "R_smile")
+    ]
+    assert np.allclose(halves[0] + halves[1], mirrored)
+
+
+# Sync snapshots
+def test_sync_snapshots_only_write_changes():
+    scene = grid_scene()
+    scene.create_deformer("cluster", "face_cluster", "face")
+    vertex_count = scene.vertex_count("face")
+    written = []
+    set_weight_range = scene.set_weight_range
+
+    def counted(deformer, index, first, weights, **kwargs):
+        written.append(len(weights))
+        return set_weight_range(deformer, index, first, weights, **kwargs)
+
+    scene.set_weight_range = counted
+    weights = np.random.default_rng(0).random(vertex_count)
+    tool.set_sparse_deformer_weights(
+        scene, "face_cluster", tool.SparseWeights.from_dense(weights)
+    )
+    assert sum(written) == vertex_count
+    # Writing the same weights again pushes nothing
+    written.clear()
+    tool.set_sparse_deformer_weights(
+        scene, "face_cluster", tool.SparseWeights.from_dense(weights)
+    )
+    assert sum(written) == 0
+    # Only the edited run goes out
+    weights[10:20] = 0.5
+    tool.set_sparse_deformer_weights(
+        scene, "face_cluster", tool.SparseWeights.from_dense(weights)
+    )
+    assert sum(written) == 10
+    # An edit made outside the tool drops the snapshot
+    set_weight_range("face_cluster", 0, 0, np.zeros(5), node_type="cluster")
+    written.clear()
+    tool.set_sparse_deformer_weights(
+        scene, "face_cluster", tool.SparseWeights.from_dense(weights)
+    )
+    assert sum(written) > 0
+    assert np.allclose(
+        tool.get_deformer_weights(scene, "face_cluster", vertex_count), weights
+    )
+
+
+def test_sync_snapshots_skip_unchanged_targets():
+    scene = grid_scene()
+    vertex_count = scene.vertex_count("face")
+    index = scene.add_target("face_bs", "smile")
+    deltas = np.zeros((vertex_count, 3))
+    deltas[:30] = 1.0
+    assert tool.set_target_deltas(scene, "face_bs", index, deltas)
+    assert not tool.set_target_deltas(scene, "face_bs", index, deltas)
+    report = scene.sync_snapshots().report()
+    assert len(report["changed"]) == 1 and report["unchanged"] == 1
+
+
+def test_sync_snapshots_cap_changes(monkeypatch):
+    monkeypatch.setattr(tool, "SYNC_CHANGES_LIMIT", 2)
+    scene = grid_scene()
+    vertex_count = scene.vertex_count("face")
+    index = scene.add_target("face_bs", "smile")
+    deltas = np.zeros((vertex_count, 3))
+    for vertex in range(4):
+        deltas[vertex] = 1.0
+        tool.set_target_deltas(scene, "face_bs", index, deltas)
+    tool.set_target_deltas(scene, "face_bs", index, deltas)
+    report = scene.sync_snapshots().report()
+    assert [change["vertices"] for change in report["changed"]] == [3, 4]
+    assert report["dropped"] == 2 and report["unchanged"] == 1
+    assert scene.sync_snapshots().report()["changed"] == []
+
+
+def test_close_removes_watchers():
+    scene = grid_scene()
+    vertex_count = scene.vertex_count("face")
+    index = scene.add_target("face_bs", "smile")
+    registry = scene.target_registry("face_bs")
+    tool.set_target_deltas(scene, "face_bs", index, np.ones((vertex_count, 3)))
+    assert scene.watchers["face_bs"]
+    scene.close()
+    assert not scene.watchers["face_bs"]
+    assert scene.target_registry("face_bs") is not registry
+    assert scene.sync_snapshots().report()["changed"] == []
+
+
+# Zeroing
+def test_restore_skips_channels_connected_since_zeroing():
+    scene = grid_scene()
+    for name in ["a", "b", "c"]:
+        scene.add_target("face_bs", name)
+    scene.set_target_weights("face_bs", np.arange(3), [0.5, 0.6, 0.7])
+    snapshot = {}
+    tool.zero_blendshape_targets(scene, snapshot=snapshot)
+    scene.create_node("network", "driver")
+    scene.connect("driver.output", "face_bs.b")
+    assert tool.restore_blendshape_weights(scene, snapshot) == 2
+    _, values = scene.get_target_weights("face_bs")
+    assert np.allclose(values, [0.5, 0.0, 0.7])
+
+
+# In-betweens
+def test_cli_invert_plain_and_inbetween_targets():
+    scene = grid_scene()
+    points = scene.original_points("face")
+    topology = tool.grid_topology(21, 21)
+    scene.create_mesh("fix", points + (0.0, 1.0, 0.0), *topology)
+    scene.create_mesh("fix_half", points + (0.0, 0.25, 0.0), *topology)
+    arguments = tool.build_parser().parse_args([
+        "invert", 
+        "--blendshape", "face_bs", 
+        "--base", "face", 
+        "--correctives", "fix", "fix_half=fix:0.5",
+    ])
+    result = tool.run_operation(arguments, "face.ma", scene=scene)
+    assert result == ["fix", "fix:0.5"]
+    index = scene.target_registry("face_bs").index("fix")
+    assert scene.target_items("face_bs")[index] == [5500, 6000]
+    half = tool.get_target_deltas(scene, "face_bs", index, len(points), item=5500)
+    assert np.allclose(half, (0.0, 0.25, 0.0))
+
+
+def test_combination_evaluator_interpolates_inbetweens():
+    scene = grid_scene()
+    vertices = np.arange(21 * 21)
+    rng = np.random.default_rng(2)
+    for name in ["jawOpen", "smile", "jawOpen_smile_cd"]:
+        index = scene.add_target("face_bs", name)
+        scene.set_target_points("face_bs", index, vertices, rng.normal(size=(441, 3)))
+    jaw_open = scene.target_registry("face_bs").index("jawOpen")
+    scene.set_target_points(
+        "face_bs", jaw_open, vertices, np.full((441, 3), (0.0, -3.0, 0.0))
+    )
+    scene.set_target_points(
+        "face_bs", jaw_open, vertices, np.zeros((441, 3)), item=5500
+    )
+    scene.set_target_points(
+        "face_bs", jaw_open, vertices, rng.normal(size=(441, 3)), item=4700
+    )
+    tool.create_combination_shape(
+        scene, "face_bs", "jawOpen_smile_cd", drivers=["jawOpen", "smile"]
+    )
+    evaluator = tool.CombinationEvaluator(scene, "face_bs")
+    poses = [
+        {"jawOpen": jaw, "smile": 0.8} 
+        for jaw in [0.0, 0.25, 0.5, 0.75, 1.0, 1.2, -0.1, -0.5]
+    ]
+    points = evaluator.points(poses)
+    weights = evaluator.weights(poses)
+    for pose_points, pose_weights in zip(points, weights):
+        scene.set_target_weights("face_bs", np.arange(3), pose_weights)
+        assert np.allclose(pose_points, scene.get_points("face"), atol=1e-5)
+    # The in-between at 0.5 cancels the full weight shape
+    scene.set_target_weights("face_bs", np.arange(3), [0.5, 0.0, 0.0])
+    half = evaluator.points([{"jawOpen": 0.5, "smile": 0.0}])[0]
+    assert np.allclose(half, scene.original_points("face"))
+    assert np.allclose(half, scene.get_points("face"))
+
+
+# Combination names
+@pytest.mark.parametrize("name, look_for, expected", [
+    ("jawOpen_lip_cornerPull_corrective_delta", "corrective_delta", ["jawOpen", "lip_cornerPull"]),
+    # look_for inside a driver name, leading and as a separated suffix
+    ("topics_jawOpen_cs", "cs", ["topics", "jawOpen"]),
+    ("cs_topics_jawOpen", "cs", ["topics", "jawOpen"]),
+    ("topics_jawOpen_cs", "_cs", ["topics", "jawOpen"]),
+    ("topics_jawOpen", "cs", None),
+    ("topics_jawOpencs", "cs", None),
+])
+def test_parse_combination_drivers(name, look_for, expected):
+    known_names = {"jawOpen", "lip_cornerPull", "topics", "lip"}
+    drivers = tool.parse_combination_drivers(name, look_for, known_names)
+    assert drivers == expected